@@ -1,8 +1,132 @@
-from typing import List, Dict
-import openai 
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Tuple, Generator, Iterator
+import openai
 import json
+import time
+from .cache import ResponseCache
 from .database import ShopDatabase
+from .event_log import EventLog, feedback_event, read_events, turn_event
+from .metrics import Metrics
+from .records import to_json
 from .rl_optimizer import RLOptimizer
+from .session import Session, SessionStore, DEFAULT_SESSION_ID
+from .router import IntentRouter, Speculation
+from .streaming import StreamedMessage
+from .templates import FastPathRenderer
+from .text_index import name_key, name_keys
+
+# Functions exposed to the model for every completion call
+FUNCTIONS = [
+    {
+        "name": "get_product_info",
+        "description": "Get detailed product information",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "product_name": {"type": "string", "description": "Product name"}
+            },
+            "required": ["product_name"]
+        }
+    },
+    {
+        "name": "get_order_info",
+        "description": "Get order information",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "order_id": {"type": "string", "description": "Order ID"}
+            },
+            "required": ["order_id"]
+        }
+    },
+    {
+        "name": "get_logistics_info",
+        "description": "Get logistics information",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "tracking_number": {"type": "string", "description": "Tracking number"},
+                "latest_only": {"type": "boolean", "description": "Only the most recent tracking event"},
+                "since_last_call": {
+                    "type": "boolean",
+                    "description": "Only tracking events added since this parcel was last looked up in the conversation"
+                }
+            },
+            "required": ["tracking_number"]
+        }
+    },
+    {
+        "name": "search_products",
+        "description": "Search products",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "category": {"type": "string", "description": "Product category"},
+                "price_range": {
+                    "type": "array",
+                    "items": {"type": "number"},
+                    "description": "Price range [min_price, max_price]"
+                },
+                "brand": {"type": "string", "description": "Brand"},
+                "limit": {"type": "integer", "description": "Maximum number of results"},
+                "sort_by": {
+                    "type": "string",
+                    "enum": ["price", "rating", "review_count"],
+                    "description": "Sort order: cheapest first, or highest rating / most reviews first"
+                },
+                "min_rating": {"type": "number", "description": "Minimum product rating"},
+                "in_stock": {"type": "boolean", "description": "Only products in stock"}
+            }
+        }
+    },
+    {
+        "name": "get_user_orders",
+        "description": "List the user's orders, newest first",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "status": {"type": "string", "description": "Only orders with this status, e.g. Pending Payment or Shipped"},
+                "start_time": {"type": "string", "description": "Earliest order time, YYYY-MM-DD"},
+                "end_time": {"type": "string", "description": "Latest order time, YYYY-MM-DD"},
+                "limit": {"type": "integer", "description": "Maximum number of orders"}
+            }
+        }
+    },
+    {
+        "name": "get_cart_summary",
+        "description": "Get the number of items, subtotal and per-brand/category subtotals of the user's cart",
+        "parameters": {"type": "object", "properties": {}}
+    },
+    {
+        "name": "get_best_coupon",
+        "description": "Find which of the user's coupons saves the most on their current cart, and the final price",
+        "parameters": {"type": "object", "properties": {}}
+    },
+    {
+        "name": "find_products",
+        "description": "Find products by approximate name or keywords, e.g. when the exact product name is unknown",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "query": {"type": "string", "description": "Product name, partial name or keywords"},
+                "limit": {"type": "integer", "description": "Maximum number of results"}
+            },
+            "required": ["query"]
+        }
+    }
+]
+
+# Tools that receive the conversation's Session as a "session" argument
+SESSION_TOOLS = frozenset({"get_logistics_info"})
+
+# Tools reading one user's data; their "user_id" is always the conversation's user, never the model's choice
+USER_TOOLS = frozenset({"get_user_orders", "get_cart_summary", "get_best_coupon"})
+
+# Fuzzy matches get_product_info checks for a product whose name differs from the query only in spacing and case
+PRODUCT_MATCH_CANDIDATES = 5
+
+# Tool definitions for the chat completions API, which allows several calls per response
+TOOLS = [{"type": "function", "function": function} for function in FUNCTIONS]
 
 class ShopServiceAgent:
     """
@@ -10,18 +134,62 @@ class ShopServiceAgent:
     Handles user queries about products, orders, and logistics using OpenAI's GPT model.
     """
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, model: str = "gpt-3.5-turbo", api_base: str = None,
+                 session_store: SessionStore = None, response_cache: ResponseCache = None,
+                 max_tool_steps: int = 3, tool_workers: int = 8, fast_path: FastPathRenderer = None,
+                 router: IntentRouter = None, db=None, rl_optimizer: RLOptimizer = None,
+                 event_log: EventLog = None, metrics: Metrics = None):
         """
         Initialize the agent with OpenAI API key and setup the database connection.
         
         Args:
             api_key (str): OpenAI API key for authentication
+            model (str, optional): Chat completion model name
+            api_base (str, optional): Alternative API endpoint, e.g. a local stub server
+            session_store (SessionStore, optional): Store holding per-session conversation state
+            response_cache (ResponseCache, optional): Cache consulted before every completion call
+            max_tool_steps (int, optional): Maximum number of tool-calling rounds per turn
+            tool_workers (int, optional): Number of threads used to run tool calls concurrently
+            fast_path (FastPathRenderer, optional): Templates answering simple lookups without the model
+            router (IntentRouter, optional): Pre-router starting likely lookups before the model asks
+            db (optional): Shop data store, e.g. a SQLiteShopDatabase; defaults to the in-memory ShopDatabase
+            rl_optimizer (RLOptimizer, optional): Response strategy learner, e.g. one restored from a snapshot
+            event_log (EventLog, optional): Durable log of turns and feedback, for replay and session recovery
+            metrics (Metrics, optional): Latency, tool and token metrics; a fresh registry by default
         """
         self.api_key = api_key
         openai.api_key = api_key
-        self.conversation_history = []  # Stores the conversation context
-        self.db = ShopDatabase()  # Initialize database connection
-        self.rl_optimizer = RLOptimizer()  # Initialize RL optimizer
+        self.model = model
+        self.api_base = api_base
+        self.sessions = session_store if session_store is not None else SessionStore()  # Conversation state per session
+        self.response_cache = response_cache
+        self.max_tool_steps = max_tool_steps
+        self.tool_executor = ThreadPoolExecutor(max_workers=tool_workers, thread_name_prefix="agent-tool")
+        self.fast_path = fast_path if fast_path is not None else FastPathRenderer()
+        self.router = router if router is not None else IntentRouter()
+        self.db = db if db is not None else ShopDatabase()  # Initialize database connection
+        self.rl_optimizer = rl_optimizer if rl_optimizer is not None else RLOptimizer()  # Initialize RL optimizer
+        self.event_log = event_log
+        self.metrics = metrics if metrics is not None else Metrics()  # Per-stage latency, tool and token metrics
+        
+        # Map function names to actual functions
+        self.function_mapping = {
+            "get_product_info": self.get_product_info,
+            "get_order_info": self.get_order_info,
+            "get_logistics_info": self.get_logistics_info,
+            "search_products": self.search_products,
+            "get_user_orders": self.get_user_orders,
+            "get_cart_summary": self.get_cart_summary,
+            "get_best_coupon": self.get_best_coupon,
+            "find_products": self.find_products
+        }
+        
+    @property
+    def conversation_history(self) -> List[Dict]:
+        """
+        Conversation history of the default session.
+        """
+        return self.sessions.get(DEFAULT_SESSION_ID).conversation_history
         
     def get_product_info(self, product_name: str) -> Dict:
         """
@@ -31,9 +199,19 @@ class ShopServiceAgent:
             product_name (str): Name of the product to query
             
         Returns:
-            Dict: Product information including price, stock, specs, etc.
+            Dict: Product information including price, stock, specs, etc.; for a name that only differs
+                in spacing, case or a missing brand, the product's information with its name under
+                "matched_product"; empty if there is no such product, for find_products to offer candidates
         """
-        return self.db.get_product_info(product_name)
+        info = self.db.get_product_info(product_name)
+        if not info:
+            # Resolve names like "iphone15 pro" or "mate 60" here rather than in another model round-trip,
+            # but never swap in a different product such as iPhone 15 for "iPhone 14"
+            key = name_key(product_name)
+            for match in self.db.find_products(product_name, limit=PRODUCT_MATCH_CANDIDATES):
+                if key in name_keys(match["product_name"], match.get("brand")):
+                    return {"matched_product": match["product_name"], **self.db.get_product_info(match["product_name"])}
+        return info
     
     def get_order_info(self, order_id: str) -> Dict:
         """
@@ -46,173 +224,444 @@ class ShopServiceAgent:
             Dict: Order information including status, tracking number, etc.
         """
         return self.db.get_order_info(order_id)
+        
+    def get_user_orders(self, user_id: str, status: str = None, start_time: str = None, end_time: str = None,
+                        limit: int = 10) -> List[Dict]:
+        """
+        Get a user's orders from the user/status/time indexes.
+        Called as a tool, user_id is the conversation's session ID (see USER_TOOLS).
+        
+        Args:
+            user_id (str): User ID
+            status (str, optional): Only orders with this status
+            start_time (str, optional): Earliest order time
+            end_time (str, optional): Latest order time; a bare date covers the whole day
+            limit (int, optional): Maximum number of orders returned, newest first
+            
+        Returns:
+            List[Dict]: Orders with their order IDs
+        """
+        return self.db.get_user_orders(user_id, status=status, start_time=start_time, end_time=end_time, limit=limit)
+        
+    def get_cart_summary(self, user_id: str) -> Dict:
+        """
+        Get the running totals of the user's cart.
+        Called as a tool, user_id is the conversation's session ID (see USER_TOOLS).
+        
+        Args:
+            user_id (str): User ID
+            
+        Returns:
+            Dict: Number of lines, item count, subtotal and per-brand/category subtotals
+        """
+        return self.db.get_cart_summary(user_id)
+        
+    def get_best_coupon(self, user_id: str) -> Dict:
+        """
+        Evaluate the user's coupons against their cart.
+        Called as a tool, user_id is the conversation's session ID (see USER_TOOLS).
+        
+        Args:
+            user_id (str): User ID
+            
+        Returns:
+            Dict: Best coupon and discount, subtotal, final price, and why other coupons do not apply
+        """
+        return self.db.get_best_coupon(user_id)
     
-    def get_logistics_info(self, tracking_number: str) -> List:
+    def get_logistics_info(self, tracking_number: str, latest_only: bool = False, since_last_call: bool = False,
+                           session: Session = None) -> List:
         """
         Get logistics tracking information.
         
         Args:
             tracking_number (str): Shipping tracking number
+            latest_only (bool, optional): Return only the most recent event
+            since_last_call (bool, optional): Return only events added since the session last looked up this parcel
+            session (Session, optional): Conversation remembering where its last lookup of each parcel ended
             
         Returns:
             List: List of logistics status updates
         """
+        if session is not None:
+            # Every lookup moves the session's cursor, so the next delta starts after what was just seen
+            key = ("get_logistics_info", tracking_number)
+            cursor = session.cursors.get(key, 0) if since_last_call else 0
+            events, session.cursors[key] = self.db.get_logistics_updates(tracking_number, cursor)
+            return events[-1:] if latest_only else events
+        if latest_only:
+            latest = self.db.get_latest_logistics(tracking_number)
+            return [latest] if latest else []
         return self.db.get_logistics_info(tracking_number)
     
-    def search_products(self, category: str = None, price_range: tuple = None) -> List[Dict]:
+    def search_products(self, category: str = None, price_range: tuple = None, brand: str = None,
+                        limit: int = 10, sort_by: str = "price", min_rating: float = None,
+                        in_stock: bool = False) -> List[Dict]:
         """
-        Search products by category and price range.
+        Search products by category, brand, price range, rating and stock.
         
         Args:
             category (str, optional): Product category to filter
             price_range (tuple, optional): Price range tuple (min_price, max_price)
+            brand (str, optional): Brand to filter
+            limit (int, optional): Maximum number of products returned
+            sort_by (str, optional): "price" (cheapest first), "rating" or "review_count" (highest first)
+            min_rating (float, optional): Minimum product rating
+            in_stock (bool, optional): Only products with stock left
             
         Returns:
             List[Dict]: List of matching products
         """
-        return self.db.search_products(category, price_range)
+        return self.db.search_products(category, price_range, brand=brand, limit=limit, sort_by=sort_by,
+                                       min_rating=min_rating, in_stock=in_stock)
+                                       
+    def find_products(self, query: str, limit: int = 5) -> List[Dict]:
+        """
+        Find products by approximate name or keywords.
+        
+        Args:
+            query (str): Product name, partial name or keywords
+            limit (int, optional): Maximum number of products returned
+            
+        Returns:
+            List[Dict]: Best matching products with their match score
+        """
+        return self.db.find_products(query, limit=limit)
 
-    def think(self, user_input: str) -> str:
+    def think(self, user_input: str, session_id: str = DEFAULT_SESSION_ID) -> str:
         """
         Process user input and generate appropriate response using GPT model.
         
         Args:
             user_input (str): User's question or command
+            session_id (str, optional): Session or user ID of the conversation
             
         Returns:
             str: Assistant's response
         """
-        # Add user input to conversation history
-        self.conversation_history.append({"role": "user", "content": user_input})
-        
-        # Get current state from conversation history
-        current_state = self.rl_optimizer.get_state_features(self.conversation_history)
-        
-        # Get best response type based on learned Q-values
-        best_response_type = self.rl_optimizer.get_best_response_type(current_state)
-        
-        # Modify system prompt based on learned response type
-        system_prompt = self._get_optimized_prompt(best_response_type)
-        
-        # Define available functions for the model
-        functions = [
-            {
-                "name": "get_product_info",
-                "description": "Get detailed product information",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "product_name": {"type": "string", "description": "Product name"}
-                    },
-                    "required": ["product_name"]
-                }
-            },
-            {
-                "name": "get_order_info",
-                "description": "Get order information",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "order_id": {"type": "string", "description": "Order ID"}
-                    },
-                    "required": ["order_id"]
-                }
-            },
-            {
-                "name": "get_logistics_info",
-                "description": "Get logistics information",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "tracking_number": {"type": "string", "description": "Tracking number"}
-                    },
-                    "required": ["tracking_number"]
-                }
-            },
-            {
-                "name": "search_products",
-                "description": "Search products",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "category": {"type": "string", "description": "Product category"},
-                        "price_range": {
-                            "type": "array",
-                            "items": {"type": "number"},
-                            "description": "Price range [min_price, max_price]"
-                        }
-                    }
-                }
-            }
-        ]
-        
-        # Prepare messages for API call
-        messages = [
-            {"role": "system", "content": system_prompt},
-            *self.conversation_history
-        ]
-        
-        # Make initial API call
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=messages,
-            functions=functions,
-            function_call="auto"
-        )
-        
-        response_message = response.choices[0].message
-        
-        # Handle function calls if any
-        if response_message.get("function_call"):
-            function_name = response_message["function_call"]["name"]
-            function_args = json.loads(response_message["function_call"]["arguments"])
+        turn = self._turn(self.sessions.get(session_id), user_input)
+        request = next(turn)
+        while True:
+            if request[0] == "completion":
+                result = self._chat_completion(*request[1:])
+            elif request[0] == "tools":
+                result = self._run_tools(*request[1:])
+            else:
+                result = None
+            try:
+                request = turn.send(result)
+            except StopIteration as finished:
+                return finished.value
+                
+    def think_stream(self, user_input: str, session_id: str = DEFAULT_SESSION_ID) -> Iterator[str]:
+        """
+        Process user input like think, yielding the response text as it is generated.
+        
+        Args:
+            user_input (str): User's question or command
+            session_id (str, optional): Session or user ID of the conversation
             
-            # Map function names to actual functions
-            function_mapping = {
-                "get_product_info": self.get_product_info,
-                "get_order_info": self.get_order_info,
-                "get_logistics_info": self.get_logistics_info,
-                "search_products": self.search_products
-            }
+        Yields:
+            str: Pieces of the assistant's response
+        """
+        turn = self._turn(self.sessions.get(session_id), user_input)
+        request = next(turn)
+        while True:
+            if request[0] == "completion":
+                streamed = StreamedMessage()
+                yield from self._stream_completion(streamed, *request[1:])
+                result = streamed.to_message()
+            elif request[0] == "tools":
+                result = self._run_tools(*request[1:])
+            else:
+                yield request[1]
+                result = None
+            try:
+                request = turn.send(result)
+            except StopIteration:
+                return
+                
+    def _turn(self, session: Session, user_input: str) -> Generator[Tuple, object, str]:
+        """
+        Conversation logic of one turn, independent of how completions and tools are run.
+        Yields ("completion", messages, tools, tool_choice) and ("tools", tool_calls, speculation, session)
+        requests, receiving the response message or tool messages for each, plus a ("reply", text)
+        notice when the response was rendered without the model. Returns the assistant response.
+        """
+        turn_start = time.perf_counter_ns()
+        current_state, response_type, messages = self._begin_turn(session, user_input)
+        turn_messages = [messages[-1]]  # Messages of this turn, for the event log
+        
+        # Start lookups for recognised order IDs and tracking numbers before the model asks for them
+        speculation = self.router.speculate(user_input, current_state, self.tool_executor, self._call_tool,
+                                            session, SESSION_TOOLS)
+        if speculation is not None and self.router.mode == "inject":
+            # Show the results to the model up front so it can answer in one call
+            tool_calls = speculation.tool_calls()
+            tool_messages = yield from self._timed("tools", ("tools", tool_calls, speculation, session))
+            messages = self._record_tool_step(
+                session, messages, {"role": "assistant", "content": None, "tool_calls": tool_calls}, tool_messages
+            )
+            turn_messages += messages[-len(tool_messages) - 1:]
+        
+        # Let the model call tools until it answers or the step budget runs out
+        for step in range(self.max_tool_steps):
+            stage = "first_completion" if step == 0 else "followup_completion"
+            response_message = yield from self._timed(stage, ("completion", messages, TOOLS, "auto"))
+            tool_calls = response_message.get("tool_calls")
+            if not tool_calls:
+                assistant_response = response_message["content"]
+                break
+        
+            tool_messages = yield from self._timed("tools", ("tools", tool_calls, speculation, session))
+            messages = self._record_tool_step(session, messages, response_message, tool_messages)
+            turn_messages += messages[-len(tool_messages) - 1:]
             
-            # Execute the function
-            function_response = function_mapping[function_name](**function_args)
+            # Plain status lookups are answered from a template, skipping the follow-up completion
+            assistant_response = self.fast_path.render(tool_calls, tool_messages, response_type, user_input,
+                                                       current_state)
+            if assistant_response is not None:
+                yield ("reply", assistant_response)
+                break
+        else:
+            # Step budget exhausted, ask for an answer from the collected tool results
+            request = ("completion", messages, TOOLS, "none")
+            response_message = yield from self._timed("followup_completion", request)
+            assistant_response = response_message["content"]
             
-            # Add function response to conversation history
-            self.conversation_history.append({
-                "role": "function",
-                "name": function_name,
-                "content": json.dumps(function_response, ensure_ascii=False)
-            })
+        if speculation is not None:
+            speculation.finish()
+        
+        # RL bookkeeping runs once the final response is complete, also when streaming
+        with self.metrics.span("rl_bookkeeping"):
+            self._finish_turn(session, current_state, assistant_response, response_type, turn_messages)
+        self.metrics.observe("turn", time.perf_counter_ns() - turn_start)
+        return assistant_response
+        
+    def _timed(self, stage: str, request: Tuple) -> Generator[Tuple, object, object]:
+        """
+        Yield a request of _turn and record how long the driver took to answer it.
+        """
+        start = time.perf_counter_ns()
+        result = yield request
+        self.metrics.observe(stage, time.perf_counter_ns() - start)
+        return result
+        
+    def _begin_turn(self, session: Session, user_input: str) -> Tuple[str, str, List[Dict]]:
+        """
+        Record the user input and prepare the messages for the first completion call.
+        
+        Args:
+            session (Session): Session of the conversation
+            user_input (str): User's question or command
+            
+        Returns:
+            Tuple[str, str, List[Dict]]: Current RL state, chosen response type and messages for the API call
+        """
+        # Add user input to conversation history
+        session.append({"role": "user", "content": user_input})
+        
+        with self.metrics.span("state_extraction"):
+            # The current state only depends on the latest user message, so track it as messages arrive
+            current_state = session.rl_state = self.rl_optimizer.get_message_state(user_input)
+        
+            # Get best response type based on learned Q-values
+            best_response_type = self.rl_optimizer.get_best_response_type(current_state)
+        
+        with self.metrics.span("prompt"):
+            # Modify system prompt based on learned response type
+            system_prompt = self._get_optimized_prompt(best_response_type)
+        
+            # Prepare messages for API call, keeping the history within its token budget
+            messages = session.window.render(system_prompt)
+        return current_state, best_response_type, messages
+        
+    def _chat_completion(self, messages: List[Dict], tools: List[Dict] = None, tool_choice: str = "auto") -> Dict:
+        """
+        Get the model's response message, serving it from the response cache when possible.
+        
+        Args:
+            messages (List[Dict]): Messages sent to the model
+            tools (List[Dict], optional): Tools the model may call
+            tool_choice (str, optional): Whether the model may call tools ("auto" or "none")
             
-            # Make second API call with function response
-            second_response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=messages + [
-                    response_message,
-                    {
-                        "role": "function",
-                        "name": function_name,
-                        "content": json.dumps(function_response, ensure_ascii=False)
+        Returns:
+            Dict: Assistant message with content and optional tool calls
+        """
+        cache_key = self._cache_key(messages, tools, tool_choice)
+        if cache_key is not None:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                self.metrics.record_completion(cached=True)
+                return cached
+                
+        response = openai.ChatCompletion.create(**self._completion_kwargs(messages, tools, tool_choice))
+        self.metrics.record_completion(response.get("usage"))
+        response_message = self._to_message(response.choices[0].message)
+        
+        if cache_key is not None:
+            self.response_cache.set(cache_key, response_message)
+        return response_message
+        
+    def _stream_completion(self, streamed: StreamedMessage, messages: List[Dict], tools: List[Dict] = None,
+                           tool_choice: str = "auto") -> Iterator[str]:
+        """
+        Stream the model's response, yielding content text as it arrives.
+        The complete message, including tool calls assembled from their fragments, is collected in streamed.
+        """
+        cache_key = self._cache_key(messages, tools, tool_choice)
+        if cache_key is not None:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                self.metrics.record_completion(cached=True)
+                streamed.set_message(cached)
+                if cached["content"]:
+                    yield cached["content"]
+                return
+                
+        # Streamed responses do not report token usage
+        self.metrics.record_completion()
+        response = openai.ChatCompletion.create(stream=True, **self._completion_kwargs(messages, tools, tool_choice))
+        for chunk in response:
+            if chunk["choices"]:
+                text = streamed.add_delta(chunk["choices"][0]["delta"])
+                if text:
+                    yield text
+                    
+        if cache_key is not None:
+            self.response_cache.set(cache_key, streamed.to_message())
+        
+    def _cache_key(self, messages: List[Dict], tools: List[Dict] = None, tool_choice: str = "auto") -> str:
+        """
+        Get the response cache key of a completion request, or None without a cache.
+        """
+        if self.response_cache is None:
+            return None
+        return self.response_cache.make_key(self.model, messages, tools, tool_choice)
+        
+    @staticmethod
+    def _to_message(response_message) -> Dict:
+        """
+        Convert an API response message into a plain, JSON-serialisable dict.
+        """
+        message = {"role": "assistant", "content": response_message.get("content")}
+        tool_calls = response_message.get("tool_calls")
+        if tool_calls:
+            message["tool_calls"] = [
+                {
+                    "id": tool_call["id"],
+                    "type": "function",
+                    "function": {
+                        "name": tool_call["function"]["name"],
+                        "arguments": tool_call["function"]["arguments"]
                     }
-                ]
-            )
-            assistant_response = second_response.choices[0].message.content
+                }
+                for tool_call in tool_calls
+            ]
+        return message
+        
+    def _completion_kwargs(self, messages: List[Dict], tools: List[Dict] = None, tool_choice: str = "auto") -> Dict:
+        """
+        Build keyword arguments for a chat completion call.
+        """
+        kwargs = {"model": self.model, "messages": messages}
+        if tools:
+            kwargs["tools"] = tools
+            kwargs["tool_choice"] = tool_choice
+        if self.api_base:
+            kwargs["api_base"] = self.api_base
+        return kwargs
+        
+    def _run_tools(self, tool_calls: List[Dict], speculation: Speculation = None,
+                   session: Session = None) -> List[Dict]:
+        """
+        Run the tools requested by the model concurrently.
+        
+        Args:
+            tool_calls (List[Dict]): Tool calls with ID, function name and JSON-encoded arguments
+            speculation (Speculation, optional): Lookups already started for this turn
+            session (Session, optional): Conversation the tools run for
             
-        else:
-            assistant_response = response_message.content
+        Returns:
+            List[Dict]: Tool messages to send back to the model
+        """
+        futures = [self._tool_future(tool_call, speculation, session) for tool_call in tool_calls]
+        return [self._tool_message(tool_call, future.result()) for tool_call, future in zip(tool_calls, futures)]
+        
+    def _tool_future(self, tool_call: Dict, speculation: Speculation = None, session: Session = None) -> Future:
+        """
+        Get the pending result of a tool call, reusing a speculative lookup when one matches.
+        """
+        function_name = tool_call["function"]["name"]
+        function_args = json.loads(tool_call["function"]["arguments"])
+        future = speculation.claim(function_name, function_args) if speculation is not None else None
+        if future is None:
+            future = self.tool_executor.submit(self._call_tool, function_name, function_args, session)
+        return future
+            
+    def _call_tool(self, function_name: str, function_args: Dict, session: Session = None):
+        """
+        Execute a function requested by the model.
+        """
+        if function_name in SESSION_TOOLS:
+            function_args = {**function_args, "session": session}
+        elif function_name in USER_TOOLS:
+            if session is None:
+                return {"error": "This lookup needs a signed-in user"}
+            function_args = {**function_args, "user_id": session.session_id}
+        start, failed = time.perf_counter_ns(), True
+        try:
+            result = self.function_mapping[function_name](**function_args)
+            failed = False
+            return result
+        finally:
+            self.metrics.observe_tool(function_name, time.perf_counter_ns() - start, failed)
+            
+    @staticmethod
+    def _tool_message(tool_call: Dict, function_response) -> Dict:
+        """
+        Build the tool message carrying a function's result back to the model.
+        """
+        return {
+            "role": "tool",
+            "tool_call_id": tool_call["id"],
+            "name": tool_call["function"]["name"],
+            # Database records become plain dicts only here, when they are serialised for the model
+            "content": json.dumps(function_response, ensure_ascii=False, default=to_json)
+        }
+        
+    def _record_tool_step(self, session: Session, messages: List[Dict], response_message: Dict,
+                          tool_messages: List[Dict]) -> List[Dict]:
+        """
+        Add a tool-calling round to the conversation history.
+        
+        Returns:
+            List[Dict]: Messages for the next completion call
+        """
+        session.append(response_message)
+        for tool_message in tool_messages:
+            session.append(tool_message)
+        return messages + [response_message, *tool_messages]
             
+    def _finish_turn(self, session: Session, current_state: str, assistant_response: str,
+                     response_type: str = None, turn_messages: List[Dict] = None):
+        """
+        Record the assistant response and the RL state-action pair of this turn.
+        """
         # Add assistant's response to conversation history
-        self.conversation_history.append({"role": "assistant", "content": assistant_response})
+        assistant_message = {"role": "assistant", "content": assistant_response}
+        session.append(assistant_message)
         
         # Extract features from response
         action = self.rl_optimizer.get_action_features(assistant_response)
         
         # Store state and action for later update
-        self.rl_optimizer.state_history.append(current_state)
-        self.rl_optimizer.action_history.append(action)
+        session.state_history.append(current_state)
+        session.action_history.append(action)
         
-        return assistant_response
+        if self.event_log is not None:
+            self.event_log.append(turn_event(session.session_id, current_state, response_type, action,
+                                             [*(turn_messages or []), assistant_message]))
         
     def _get_optimized_prompt(self, response_type: str) -> str:
         """
@@ -241,22 +690,51 @@ class ShopServiceAgent:
             
         return base_prompt
         
-    def provide_feedback(self, user_feedback: str):
+    def provide_feedback(self, user_feedback: str, session_id: str = DEFAULT_SESSION_ID):
         """
         Process user feedback and update RL model.
         """
-        if not self.rl_optimizer.state_history:
+        session = self.sessions.peek(session_id)
+        if session is None or not session.state_history:
             return
             
         # Calculate reward based on feedback
         reward = self.rl_optimizer.get_reward(user_feedback)
         
         # Get current state and action
-        state = self.rl_optimizer.state_history[-1]
-        action = self.rl_optimizer.action_history[-1]
+        state = session.state_history[-1]
+        action = session.action_history[-1]
         
-        # Get next state
-        next_state = self.rl_optimizer.get_state_features(self.conversation_history)
+        # Get next state, tracked as user messages were appended
+        next_state = session.rl_state
         
         # Update Q-values
-        self.rl_optimizer.update(state, action, reward, next_state)
\ No newline at end of file
+        with self.metrics.span("rl_update"):
+            self.rl_optimizer.update(state, action, reward, next_state)
+        
+        if self.event_log is not None:
+            self.event_log.append(feedback_event(session_id, user_feedback, reward, state, action, next_state))
+            
+    def recover_sessions(self, directory: str = None) -> int:
+        """
+        Rebuild conversation sessions from an event log, e.g. after a restart.
+        
+        Args:
+            directory (str, optional): Event log directory; defaults to the agent's event log
+            
+        Returns:
+            int: Number of turns replayed
+        """
+        directory = directory if directory is not None else self.event_log.directory
+        turns = 0
+        for event in read_events(directory):
+            if event.get("type") != "turn":
+                continue
+            session = self.sessions.get(event["session_id"])
+            for message in event["messages"]:
+                session.append(message)
+            session.state_history.append(event["state"])
+            session.action_history.append(event["action"])
+            session.rl_state = event["state"]
+            turns += 1
+        return turns
\ No newline at end of file
@@ -0,0 +1,175 @@
+import asyncio
+from typing import AsyncIterator, Dict, List
+import openai
+from .agent import ShopServiceAgent
+from .router import Speculation
+from .session import Session, DEFAULT_SESSION_ID
+from .streaming import StreamedMessage
+
+class AsyncShopServiceAgent(ShopServiceAgent):
+    """
+    Asyncio variant of ShopServiceAgent.
+    Serves many conversations concurrently on one event loop: completion calls are awaited
+    and database tool calls run in a thread pool so the loop never blocks.
+    """
+    
+    def __init__(self, api_key: str, max_concurrency: int = 256, **kwargs):
+        """
+        Initialize the async agent.
+        
+        Args:
+            api_key (str): OpenAI API key for authentication
+            max_concurrency (int, optional): Maximum number of in-flight completion calls
+            **kwargs: Further options of ShopServiceAgent, e.g. api_base or session_store
+        """
+        super().__init__(api_key, **kwargs)
+        self.max_concurrency = max_concurrency
+        self._semaphore = None  # Created lazily inside the running event loop
+        self._http_session = None
+        
+    async def __aenter__(self):
+        """
+        Open a shared HTTP connection pool for all completion calls made inside the context.
+        """
+        import aiohttp  # Installed together with openai
+        
+        self._http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_concurrency)
+        )
+        openai.aiosession.set(self._http_session)
+        return self
+        
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+        
+    async def aclose(self):
+        """
+        Release the HTTP connection pool and the tool thread pool.
+        """
+        if self._http_session is not None:
+            await self._http_session.close()
+            self._http_session = None
+            openai.aiosession.set(None)
+        self.tool_executor.shutdown(wait=False)
+        
+    async def athink(self, user_input: str, session_id: str = DEFAULT_SESSION_ID) -> str:
+        """
+        Process user input for one conversation without blocking the event loop.
+        
+        Args:
+            user_input (str): User's question or command
+            session_id (str, optional): Session or user ID of the conversation
+            
+        Returns:
+            str: Assistant's response
+        """
+        turn = self._turn(self.sessions.get(session_id), user_input)
+        request = next(turn)
+        while True:
+            if request[0] == "completion":
+                result = await self._achat_completion(*request[1:])
+            elif request[0] == "tools":
+                result = await self._arun_tools(*request[1:])
+            else:
+                result = None
+            try:
+                request = turn.send(result)
+            except StopIteration as finished:
+                return finished.value
+        
+    async def athink_stream(self, user_input: str, session_id: str = DEFAULT_SESSION_ID) -> AsyncIterator[str]:
+        """
+        Process user input like athink, yielding the response text as it is generated.
+        
+        Args:
+            user_input (str): User's question or command
+            session_id (str, optional): Session or user ID of the conversation
+            
+        Yields:
+            str: Pieces of the assistant's response
+        """
+        turn = self._turn(self.sessions.get(session_id), user_input)
+        request = next(turn)
+        while True:
+            if request[0] == "completion":
+                streamed = StreamedMessage()
+                async for text in self._astream_completion(streamed, *request[1:]):
+                    yield text
+                result = streamed.to_message()
+            elif request[0] == "tools":
+                result = await self._arun_tools(*request[1:])
+            else:
+                yield request[1]
+                result = None
+            try:
+                request = turn.send(result)
+            except StopIteration:
+                return
+                
+    async def _arun_tools(self, tool_calls: List[Dict], speculation: Speculation = None,
+                          session: Session = None) -> List[Dict]:
+        """
+        Run all requested tools concurrently in the thread pool, reusing speculative lookups.
+        """
+        futures = [self._tool_future(tool_call, speculation, session) for tool_call in tool_calls]
+        results = await asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+        return [self._tool_message(tool_call, result) for tool_call, result in zip(tool_calls, results)]
+        
+    async def _achat_completion(self, messages: List[Dict], tools: List[Dict] = None,
+                                tool_choice: str = "auto") -> Dict:
+        """
+        Await the model's response message, bounded by the concurrency limit.
+        Cache hits are returned without touching the network.
+        """
+        cache_key = self._cache_key(messages, tools, tool_choice)
+        if cache_key is not None:
+            cached = await self.response_cache.aget(cache_key)
+            if cached is not None:
+                self.metrics.record_completion(cached=True)
+                return cached
+                
+        async with self._get_semaphore():
+            response = await openai.ChatCompletion.acreate(**self._completion_kwargs(messages, tools, tool_choice))
+        self.metrics.record_completion(response.get("usage"))
+        response_message = self._to_message(response.choices[0].message)
+            
+        if cache_key is not None:
+            self.response_cache.set(cache_key, response_message)
+        return response_message
+
+    async def _astream_completion(self, streamed: StreamedMessage, messages: List[Dict], tools: List[Dict] = None,
+                                  tool_choice: str = "auto") -> AsyncIterator[str]:
+        """
+        Stream the model's response, yielding content text as it arrives.
+        The complete message, including tool calls assembled from their fragments, is collected in streamed.
+        """
+        cache_key = self._cache_key(messages, tools, tool_choice)
+        if cache_key is not None:
+            cached = await self.response_cache.aget(cache_key)
+            if cached is not None:
+                self.metrics.record_completion(cached=True)
+                streamed.set_message(cached)
+                if cached["content"]:
+                    yield cached["content"]
+                return
+                
+        # Streamed responses do not report token usage
+        self.metrics.record_completion()
+        async with self._get_semaphore():
+            response = await openai.ChatCompletion.acreate(
+                stream=True, **self._completion_kwargs(messages, tools, tool_choice)
+            )
+            async for chunk in response:
+                if chunk["choices"]:
+                    text = streamed.add_delta(chunk["choices"][0]["delta"])
+                    if text:
+                        yield text
+                        
+        if cache_key is not None:
+            self.response_cache.set(cache_key, streamed.to_message())
+            
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so that it binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
@@ -0,0 +1,252 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+class ResponseCache:
+    """
+    Cache of chat completion responses.
+    Keys are a normalised hash of the model, system prompts, tool schema and the tail of
+    the conversation. Entries live in an in-memory LRU and, optionally, in an on-disk SQLite
+    tier shared across restarts; both expire after the TTL.
+    Disk writes are queued and committed in batches by a background thread, which also deletes
+    expired rows and caps the tier's size, so set() never waits for the disk. aget() reads the
+    disk tier in a thread, keeping it off the event loop.
+    """
+    
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0, disk_path: str = None,
+                 tail_messages: int = 4, max_disk_entries: int = 100000, prune_interval: float = 60.0):
+        """
+        Args:
+            max_entries (int): Maximum number of responses kept in memory
+            ttl (float): Lifetime of a cached response in seconds
+            disk_path (str, optional): SQLite file used as a second cache tier
+            tail_messages (int): Number of latest conversation messages that make up the key
+            max_disk_entries (int): Maximum number of responses kept on disk; the oldest are deleted first
+            prune_interval (float): Seconds between deletions of expired and surplus rows on disk
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.tail_messages = tail_messages
+        self.max_disk_entries = max_disk_entries
+        self.prune_interval = prune_interval
+        self._entries = OrderedDict()  # key -> (created, message), least recently used first
+        self._lock = threading.Lock()
+        self._disk = None
+        self._disk_lock = threading.Lock()  # Serialises use of the shared SQLite connection
+        self._pending = []  # (key, created, message JSON) waiting for the disk writer
+        self._writing = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.disk_pruned = 0
+        if disk_path:
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, created REAL, message TEXT)"
+            )
+            self._disk.execute("CREATE INDEX IF NOT EXISTS idx_responses_created ON responses (created)")
+            self._disk.commit()
+            self._writer = threading.Thread(target=self._run_writer, name="response-cache-disk", daemon=True)
+            self._writer.start()
+            
+    def make_key(self, model: str, messages: List[Dict], tools: List[Dict] = None,
+                 tool_choice: str = "auto") -> str:
+        """
+        Build the cache key of a completion request.
+        
+        Args:
+            model (str): Chat completion model name
+            messages (List[Dict]): Messages sent to the model
+            tools (List[Dict], optional): Tool schema sent to the model
+            tool_choice (str, optional): Whether the model may call tools
+            
+        Returns:
+            str: Hex digest identifying the request
+        """
+        system = [m["content"] for m in messages if m["role"] == "system"]
+        conversation = [m for m in messages if m["role"] != "system"]
+        tail = [self._normalise(m) for m in conversation[-self.tail_messages:]]
+        payload = json.dumps([model, system, tools or [], tool_choice if tools else None, tail],
+                             sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Get a cached response message, or None on a miss.
+        """
+        message = self._get_memory(key)
+        if message is None and self._disk is not None:
+            message = self._get_disk(key)
+        if message is None:
+            self._count_miss()
+        return message
+        
+    async def aget(self, key: str) -> Optional[Dict]:
+        """
+        Like get(), but reads the disk tier in the default executor instead of blocking the event loop.
+        """
+        message = self._get_memory(key)
+        if message is None and self._disk is not None:
+            message = await asyncio.get_running_loop().run_in_executor(None, self._get_disk, key)
+        if message is None:
+            self._count_miss()
+        return message
+        
+    def set(self, key: str, message: Dict):
+        """
+        Store a response message; the disk tier is written in the background.
+        """
+        now = time.time()
+        with self._lock:
+            self._put(key, now, message)
+        if self._disk is not None:
+            row = (key, now, json.dumps(message, ensure_ascii=False))
+            with self._cond:
+                self._pending.append(row)
+                if len(self._pending) == 1:
+                    self._cond.notify_all()
+                    
+    def flush(self):
+        """
+        Wait until every response stored so far is written to the disk tier.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: not self._pending and not self._writing)
+            
+    def clear(self):
+        """
+        Remove all cached responses, including the on-disk tier.
+        """
+        with self._lock:
+            self._entries.clear()
+        if self._disk is not None:
+            with self._disk_lock:
+                with self._cond:
+                    self._pending.clear()
+                self._disk.execute("DELETE FROM responses")
+                self._disk.commit()
+                
+    def close(self):
+        """
+        Write the queued responses, stop the disk writer and close the disk tier.
+        """
+        if self._disk is None:
+            return
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join()
+        with self._disk_lock:
+            self._disk.close()
+            
+    def stats(self) -> Dict:
+        """
+        Get cache counters and the overall hit rate.
+        """
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "disk_pruned": self.disk_pruned,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0
+            }
+            
+    def _get_memory(self, key: str) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if now - entry[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            del self._entries[key]
+            self.expirations += 1
+            return None
+            
+    def _get_disk(self, key: str) -> Optional[Dict]:
+        with self._disk_lock:
+            row = self._disk.execute("SELECT created, message FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None or time.time() - row[0] > self.ttl:
+            return None  # Expired rows are deleted by the writer's next prune
+        message = json.loads(row[1])
+        with self._lock:
+            self._put(key, row[0], message)
+            self.disk_hits += 1
+        return message
+        
+    def _count_miss(self):
+        with self._lock:
+            self.misses += 1
+            
+    def _run_writer(self):
+        next_prune = time.monotonic() + self.prune_interval
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed, max(0.0, next_prune - time.monotonic()))
+                if self._closed and not self._pending:
+                    return
+            if self._pending:
+                # Take the batch under the disk lock, so clear() cannot run between taking and writing it
+                with self._disk_lock:
+                    with self._cond:
+                        batch, self._pending, self._writing = self._pending, [], True
+                    self._disk.executemany(
+                        "INSERT OR REPLACE INTO responses (key, created, message) VALUES (?, ?, ?)", batch
+                    )
+                    self._disk.commit()
+                with self._cond:
+                    self._writing = False
+                    self._cond.notify_all()
+            if time.monotonic() >= next_prune:
+                self._prune()
+                next_prune = time.monotonic() + self.prune_interval
+                
+    def _prune(self):
+        """
+        Delete expired rows, then the oldest rows beyond max_disk_entries.
+        """
+        with self._disk_lock:
+            pruned = self._disk.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,)).rowcount
+            surplus = self._disk.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_disk_entries
+            if surplus > 0:
+                pruned += self._disk.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY created LIMIT ?)",
+                    (surplus,)
+                ).rowcount
+            self._disk.commit()
+        with self._lock:
+            self.disk_pruned += pruned
+            
+    def _put(self, key: str, created: float, message: Dict):
+        self._entries[key] = (created, message)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+            
+    @staticmethod
+    def _normalise(message: Dict) -> Dict:
+        # Case and whitespace differences in user questions should not split cache entries
+        normalised = dict(message)
+        content = normalised.get("content")
+        if content and message["role"] == "user":
+            normalised["content"] = " ".join(content.lower().split())
+        return normalised
@@ -0,0 +1,95 @@
+from typing import Dict, Iterator, Optional, Tuple
+from .records import CartLine
+
+class Cart:
+    """
+    A user's cart with one line per product/spec/colour and running totals.
+    Adding, removing and repricing lines adjust the item count, subtotal and per-brand and
+    per-category subtotals by the change, so reading the totals never walks the lines.
+    Iterates over its CartLines like the list it replaces.
+    """
+    __slots__ = ("lines", "pricing", "items", "subtotal", "by_brand", "by_category")
+    
+    def __init__(self):
+        self.lines = {}  # (product, spec, color) -> CartLine
+        self.pricing = {}  # (product, spec, color) -> (unit price, brand, category)
+        self.items = 0
+        self.subtotal = 0.0
+        self.by_brand = {}
+        self.by_category = {}
+        
+    def __iter__(self) -> Iterator[CartLine]:
+        return iter(list(self.lines.values()))
+        
+    def __len__(self) -> int:
+        return len(self.lines)
+        
+    def add(self, product: str, quantity: int, spec: str, color: str, price: Optional[float],
+            brand: Optional[str], category: Optional[str]) -> CartLine:
+        """
+        Add units of a product, merging with the line of the same spec and colour.
+        """
+        key = (product, spec, color)
+        line = self.lines.get(key)
+        if line is None:
+            line = self.lines[key] = CartLine(product, 0, spec, color)
+            self.pricing[key] = (price or 0, brand, category)
+        line.quantity += quantity
+        self._apply(key, quantity)
+        return line
+        
+    def remove(self, product: str, spec: str, color: str, quantity: int = None) -> bool:
+        """
+        Remove units of a line, or the whole line if quantity is None or covers it.
+        """
+        key = (product, spec, color)
+        line = self.lines.get(key)
+        if line is None:
+            return False
+        quantity = line.quantity if quantity is None else min(quantity, line.quantity)
+        line.quantity -= quantity
+        self._apply(key, -quantity)
+        if line.quantity <= 0:
+            del self.lines[key]
+            del self.pricing[key]
+        return True
+        
+    def reprice(self, product: str, price: Optional[float], brand: Optional[str], category: Optional[str]):
+        """
+        Move the product's lines to a new price, brand or category.
+        """
+        for key, line in self.lines.items():
+            if key[0] == product:
+                self._apply(key, -line.quantity)
+                self.pricing[key] = (price or 0, brand, category)
+                self._apply(key, line.quantity)
+                
+    def products(self) -> Iterator[str]:
+        return (key[0] for key in self.lines)
+        
+    def totals(self) -> Dict:
+        """
+        Item count, subtotal and per-brand/per-category subtotals, as used by coupon rules.
+        """
+        return {
+            "items": self.items,
+            "subtotal": round(self.subtotal, 2),
+            "by_brand": dict(self.by_brand),
+            "by_category": dict(self.by_category)
+        }
+        
+    def _apply(self, key: Tuple, quantity: int):
+        price, brand, category = self.pricing[key]
+        amount = price * quantity
+        self.items += quantity
+        self.subtotal += amount
+        self._bump(self.by_brand, brand, amount)
+        self._bump(self.by_category, category, amount)
+        
+    @staticmethod
+    def _bump(subtotals: Dict, key: Optional[str], amount: float):
+        value = subtotals.get(key, 0.0) + amount
+        if abs(value) < 1e-9:
+            subtotals.pop(key, None)
+        else:
+            subtotals[key] = value
@@ -0,0 +1,100 @@
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterator, Optional, Tuple
+
+class ProductIndex:
+    """
+    Secondary indexes over the product catalog.
+    Keeps one price-sorted list of (price, name) for the whole catalog and one per category
+    and per brand, so category/brand + price-range queries are a bisect plus a slice.
+    """
+    
+    def __init__(self):
+        self.by_price = []  # Sorted (price, name) of all products
+        self.by_category = {}  # category -> sorted (price, name)
+        self.by_brand = {}  # brand -> sorted (price, name)
+        
+    def build(self, products: Dict[str, Dict]):
+        """
+        Rebuild all indexes from a name -> product info mapping.
+        """
+        self.by_price = sorted((info["price"], name) for name, info in products.items())
+        self.by_category = {}
+        self.by_brand = {}
+        for entry in self.by_price:
+            info = products[entry[1]]
+            self.by_category.setdefault(info.get("category"), []).append(entry)
+            self.by_brand.setdefault(info.get("brand"), []).append(entry)
+            
+    def add(self, name: str, info: Dict):
+        """
+        Index a new product.
+        """
+        entry = (info["price"], name)
+        insort(self.by_price, entry)
+        insort(self.by_category.setdefault(info.get("category"), []), entry)
+        insort(self.by_brand.setdefault(info.get("brand"), []), entry)
+        
+    def remove(self, name: str, info: Dict):
+        """
+        Remove a product, given the info it was indexed with.
+        """
+        entry = (info["price"], name)
+        self._discard(self.by_price, entry)
+        self._discard_from(self.by_category, info.get("category"), entry)
+        self._discard_from(self.by_brand, info.get("brand"), entry)
+        
+    def query(self, category: str = None, brand: str = None, price_range: Tuple = None) -> Iterator[str]:
+        """
+        Iterate over the names of matching products in ascending price order.
+        
+        Args:
+            category (str, optional): Product category to filter
+            brand (str, optional): Brand to filter
+            price_range (tuple, optional): Price range tuple (min_price, max_price)
+            
+        Returns:
+            Iterator[str]: Matching product names
+        """
+        # Scan the smallest price-sorted list that satisfies a facet, check the other facet per entry
+        candidates = [self.by_price]
+        if category is not None:
+            candidates.append(self.by_category.get(category, []))
+        if brand is not None:
+            candidates.append(self.by_brand.get(brand, []))
+        entries = min(candidates, key=len)
+        
+        lo, hi = 0, len(entries)
+        if price_range:
+            min_price, max_price = price_range
+            lo = bisect_left(entries, (min_price,))
+            hi = bisect_right(entries, (max_price, chr(0x10FFFF)))
+            
+        category_entries = self.by_category.get(category) if category is not None else None
+        brand_entries = self.by_brand.get(brand) if brand is not None else None
+        for i in range(lo, hi):
+            entry = entries[i]
+            if category_entries is not None and entries is not category_entries \
+                    and not self._contains(category_entries, entry):
+                continue
+            if brand_entries is not None and entries is not brand_entries \
+                    and not self._contains(brand_entries, entry):
+                continue
+            yield entry[1]
+            
+    @staticmethod
+    def _contains(entries: list, entry: Tuple) -> bool:
+        i = bisect_left(entries, entry)
+        return i < len(entries) and entries[i] == entry
+        
+    @staticmethod
+    def _discard(entries: list, entry: Tuple):
+        i = bisect_left(entries, entry)
+        if i < len(entries) and entries[i] == entry:
+            del entries[i]
+            
+    def _discard_from(self, index: Dict, key: Optional[str], entry: Tuple):
+        entries = index.get(key)
+        if entries is not None:
+            self._discard(entries, entry)
+            if not entries:
+                del index[key]
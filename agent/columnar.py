@@ -0,0 +1,181 @@
+import numpy as np
+from typing import Dict, List, Tuple
+
+# Sort keys accepted by search_products and whether larger values come first
+SORT_KEYS = {
+    "price": False,
+    "rating": True,
+    "review_count": True
+}
+
+class ColumnarCatalog:
+    """
+    Columnar copy of the numeric and categorical product fields.
+    Price, stock, rating, review count and category/brand codes live in NumPy arrays, so
+    multi-predicate filters are a handful of vectorised comparisons and top-k selection uses
+    a partial partition instead of sorting the whole catalog.
+    """
+    
+    def __init__(self, capacity: int = 1024):
+        self.size = 0  # Rows in use, including removed ones
+        self.removed = 0
+        self.names = []  # row -> product name, None once removed
+        self.rows = {}  # product name -> row
+        self.category_codes = {}  # category -> code
+        self.brand_codes = {}  # brand -> code
+        self.price = np.zeros(capacity, dtype=np.float64)
+        self.stock = np.zeros(capacity, dtype=np.int64)
+        self.rating = np.zeros(capacity, dtype=np.float64)
+        self.review_count = np.zeros(capacity, dtype=np.int64)
+        self.category = np.zeros(capacity, dtype=np.int32)
+        self.brand = np.zeros(capacity, dtype=np.int32)
+        self.alive = np.zeros(capacity, dtype=bool)
+        
+    @classmethod
+    def from_products(cls, products: Dict[str, Dict]) -> "ColumnarCatalog":
+        """
+        Build the columns from a name -> product info mapping in one pass.
+        """
+        catalog = cls(capacity=max(len(products), 1024))
+        catalog.extend(products)
+        return catalog
+        
+    def extend(self, products: Dict[str, Dict]):
+        """
+        Append a batch of products column by column, replacing existing rows of the same names.
+        """
+        for name in products:
+            if name in self.rows:
+                self.remove(name)
+        start, n = self.size, len(products)
+        if start + n > len(self.price):
+            self._resize(max(start + n, 2 * len(self.price)))
+        stop = start + n
+        infos = list(products.values())
+        self.price[start:stop] = [info["price"] for info in infos]
+        self.stock[start:stop] = [info.get("stock") or 0 for info in infos]
+        self.rating[start:stop] = [np.nan if info.get("rating") is None else info["rating"] for info in infos]
+        self.review_count[start:stop] = [info.get("review_count") or 0 for info in infos]
+        self.category[start:stop] = [self._code(self.category_codes, info.get("category")) for info in infos]
+        self.brand[start:stop] = [self._code(self.brand_codes, info.get("brand")) for info in infos]
+        self.alive[start:stop] = True
+        self.rows.update((name, start + i) for i, name in enumerate(products))
+        self.names.extend(products)
+        self.size = stop
+        
+    def __len__(self) -> int:
+        return self.size - self.removed
+        
+    def add(self, name: str, info: Dict):
+        """
+        Add a product, replacing its previous row if it exists.
+        """
+        self.remove(name)
+        if self.size == len(self.price):
+            self._resize(2 * len(self.price))
+        row = self.size
+        self.price[row] = info["price"]
+        self.stock[row] = info.get("stock") or 0
+        self.rating[row] = np.nan if info.get("rating") is None else info["rating"]
+        self.review_count[row] = info.get("review_count") or 0
+        self.category[row] = self._code(self.category_codes, info.get("category"))
+        self.brand[row] = self._code(self.brand_codes, info.get("brand"))
+        self.alive[row] = True
+        self.names.append(name)
+        self.rows[name] = row
+        self.size += 1
+        
+    def remove(self, name: str) -> bool:
+        """
+        Remove a product; rows are compacted once half of them are removed.
+        """
+        row = self.rows.pop(name, None)
+        if row is None:
+            return False
+        self.alive[row] = False
+        self.names[row] = None
+        self.removed += 1
+        if self.removed > 1024 and self.removed * 2 > self.size:
+            self._compact()
+        return True
+        
+    def query(self, category: str = None, brand: str = None, price_range: Tuple = None,
+              min_rating: float = None, in_stock: bool = False, sort_by: str = "price",
+              limit: int = None, offset: int = 0) -> List[str]:
+        """
+        Filter, sort and paginate the catalog.
+        
+        Args:
+            category (str, optional): Product category to filter
+            brand (str, optional): Brand to filter
+            price_range (tuple, optional): Price range tuple (min_price, max_price)
+            min_rating (float, optional): Minimum rating
+            in_stock (bool, optional): Only products with stock left
+            sort_by (str, optional): "price" (cheapest first), "rating" or "review_count" (highest first)
+            limit (int, optional): Maximum number of names returned
+            offset (int, optional): Number of sorted matches skipped
+            
+        Returns:
+            List[str]: Names of the matching products, ties kept in insertion order
+        """
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {sort_by}")
+        n = self.size
+        mask = self.alive[:n].copy()
+        if category is not None:
+            code = self.category_codes.get(category)
+            if code is None:
+                return []
+            mask &= self.category[:n] == code
+        if brand is not None:
+            code = self.brand_codes.get(brand)
+            if code is None:
+                return []
+            mask &= self.brand[:n] == code
+        if price_range:
+            mask &= (self.price[:n] >= price_range[0]) & (self.price[:n] <= price_range[1])
+        if min_rating is not None:
+            mask &= self.rating[:n] >= min_rating
+        if in_stock:
+            mask &= self.stock[:n] > 0
+            
+        rows = np.flatnonzero(mask)
+        keys = getattr(self, sort_by)[rows]
+        if SORT_KEYS[sort_by]:
+            keys = -keys
+        k = offset + limit if limit is not None else len(rows)
+        if k <= 0:
+            return []
+        if k < len(rows):
+            # Keep every row up to the k-th key, ties included, so pages do not depend on partition order
+            kth = np.partition(keys, k - 1)[k - 1]
+            if not np.isnan(kth):  # Missing ratings sort last
+                selected = keys <= kth
+                rows, keys = rows[selected], keys[selected]
+        order = np.lexsort((rows, keys))[offset:k]
+        return [self.names[row] for row in rows[order]]
+        
+    @staticmethod
+    def _code(codes: Dict, value) -> int:
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+        return code
+        
+    def _resize(self, capacity: int):
+        for column in ("price", "stock", "rating", "review_count", "category", "brand", "alive"):
+            old = getattr(self, column)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, column, new)
+            
+    def _compact(self):
+        keep = np.flatnonzero(self.alive[:self.size])
+        for column in ("price", "stock", "rating", "review_count", "category", "brand", "alive"):
+            values = getattr(self, column)
+            values[:len(keep)] = values[keep]
+            values[len(keep):self.size] = 0
+        self.names = [self.names[row] for row in keep]
+        self.rows = {name: row for row, name in enumerate(self.names)}
+        self.size = len(keep)
+        self.removed = 0
@@ -0,0 +1,71 @@
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Hashable
+
+class OrderIdGenerator:
+    """
+    Monotonic, collision-free order IDs.
+    An ID is "ORDER" + the UTC second it was issued (YYYYMMDDHHMMSS) + a two-digit worker ID + a
+    four-digit sequence within that second. When a second's sequence runs out, IDs continue
+    in the next second, so they never repeat and always sort in issue order per worker.
+    IDs are only unique per worker ID: every generator writing to a shared order store needs
+    its own (see SQLiteShopDatabase, which claims one from the database).
+    """
+    
+    def __init__(self, worker_id: int = 0, prefix: str = "ORDER", start: int = 0):
+        """
+        Args:
+            worker_id (int): Worker number 0-99, unique among the generators sharing an order store
+            prefix (str): ID prefix
+            start (int): First second (Unix time) IDs may be issued in, to skip seconds a previous
+                holder of the worker ID has used
+        """
+        if not 0 <= worker_id < 100:
+            raise ValueError(f"Worker ID out of range: {worker_id}")
+        self.worker_id = worker_id
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._second = start
+        self._sequence = -1
+        
+    def next_id(self) -> str:
+        """
+        Issue the next order ID.
+        """
+        now = int(time.time())
+        with self._lock:
+            if now > self._second:
+                self._second, self._sequence = now, 0
+            else:
+                self._sequence += 1
+                if self._sequence == 10000:  # Borrow the next second rather than reuse a sequence
+                    self._second, self._sequence = self._second + 1, 0
+            second, sequence = self._second, self._sequence
+        # UTC, not local time: a DST fall-back would render two different seconds as the same stamp
+        stamp = datetime.fromtimestamp(second, timezone.utc).strftime("%Y%m%d%H%M%S")
+        return f"{self.prefix}{stamp}{self.worker_id:02d}{sequence:04d}"
+        
+    @property
+    def last_second(self) -> int:
+        """
+        Last second IDs were issued in, or may have been borrowed from.
+        """
+        with self._lock:
+            return self._second
+        
+class StripedLock:
+    """
+    Fixed pool of locks shared by key hash.
+    Writers for different users rarely share a stripe, so they proceed in parallel while
+    writers for the same user are serialised.
+    """
+    
+    def __init__(self, stripes: int = 64):
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        
+    def __call__(self, key: Hashable) -> threading.Lock:
+        """
+        Get the lock guarding a key.
+        """
+        return self._locks[hash(key) % len(self._locks)]
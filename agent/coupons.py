@@ -0,0 +1,137 @@
+import re
+import threading
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MIN_SPEND_PATTERN = re.compile(r"min\.?\s*spend\s+([\d.,]+)", re.IGNORECASE)
+SCOPE_PATTERN = re.compile(r"\bon\s+(.+?)\s+products?\b", re.IGNORECASE)
+NO_MINIMUM_PATTERN = re.compile(r"no\s+minimum", re.IGNORECASE)
+
+def cart_totals(lines: Iterable[Tuple[int, float, str, str]]) -> Dict:
+    """
+    Subtotal, item count and per-brand/per-category subtotals of (quantity, price, brand, category) lines.
+    """
+    totals = {"items": 0, "subtotal": 0.0, "by_brand": {}, "by_category": {}}
+    for quantity, price, brand, category in lines:
+        amount = quantity * (price or 0)
+        totals["items"] += quantity
+        totals["subtotal"] += amount
+        totals["by_brand"][brand] = totals["by_brand"].get(brand, 0.0) + amount
+        totals["by_category"][category] = totals["by_category"].get(category, 0.0) + amount
+    # Same shape as Cart.totals(): rounded subtotal, no entries for brands or categories worth nothing
+    totals["subtotal"] = round(totals["subtotal"], 2)
+    for subtotals in (totals["by_brand"], totals["by_category"]):
+        for key in [key for key, value in subtotals.items() if abs(value) < 1e-9]:
+            del subtotals[key]
+    return totals
+    
+class CouponRule:
+    """
+    A coupon condition parsed into its parts: minimum spend, the brand or category it is
+    limited to, and whether staff have to confirm it (e.g. "Birthday special").
+    """
+    __slots__ = ("min_spend", "scope", "manual")
+    
+    def __init__(self, min_spend: float = 0.0, scope: Optional[str] = None, manual: bool = False):
+        self.min_spend = min_spend
+        self.scope = scope
+        self.manual = manual
+        
+    @classmethod
+    def parse(cls, condition: str) -> "CouponRule":
+        condition = condition or ""
+        min_spend = MIN_SPEND_PATTERN.search(condition)
+        scope = SCOPE_PATTERN.search(condition)
+        if min_spend is None and scope is None and NO_MINIMUM_PATTERN.search(condition) is None and condition:
+            # Conditions we cannot check from the cart, such as "VIP exclusive"
+            return cls(manual=True)
+        return cls(
+            min_spend=float(min_spend.group(1).replace(",", "")) if min_spend else 0.0,
+            scope=scope.group(1).strip() if scope else None
+        )
+        
+    def eligible_amount(self, totals: Dict) -> float:
+        """
+        Part of the cart the coupon is computed on: the whole cart or one brand's or category's lines.
+        """
+        if self.scope is None:
+            return totals["subtotal"]
+        if self.scope in totals["by_brand"]:
+            return totals["by_brand"][self.scope]
+        return totals["by_category"].get(self.scope, 0.0)
+        
+class CouponEngine:
+    """
+    Works out which coupons apply to a cart and which one saves the most.
+    Free-text conditions are parsed once into CouponRules and cached by their text, so
+    evaluating a coupon is a few comparisons, cheap enough to preview whole campaigns.
+    """
+    
+    def __init__(self):
+        self._rules = {}  # condition text -> CouponRule
+        self._lock = threading.Lock()
+        
+    def compile(self, condition: str) -> CouponRule:
+        """
+        Get the parsed rule of a condition.
+        """
+        rule = self._rules.get(condition)
+        if rule is None:
+            rule = CouponRule.parse(condition)
+            with self._lock:
+                self._rules[condition] = rule
+        return rule
+        
+    def evaluate(self, coupon: Dict, totals: Dict, today: str) -> Tuple[float, Optional[str]]:
+        """
+        Discount a coupon gives on a cart, and the reason when it does not apply.
+        """
+        rule = self.compile(coupon.get("condition"))
+        if coupon.get("valid_until") and coupon["valid_until"] < today:
+            return 0.0, "expired"
+        if rule.manual:
+            return 0.0, "needs manual verification"
+        eligible = rule.eligible_amount(totals)
+        if eligible <= 0:
+            return 0.0, f"no {rule.scope} products in cart" if rule.scope else "cart is empty"
+        if eligible < rule.min_spend:
+            return 0.0, f"spend {rule.min_spend - eligible:g} more to reach {rule.min_spend:g}"
+        amount = coupon.get("amount") or 0
+        if "percent" in (coupon.get("type") or "").lower():
+            amount = eligible * amount / 100
+        return min(amount, eligible), None
+        
+    def best(self, coupons: List[Dict], totals: Dict, today: str = None) -> Dict:
+        """
+        Pick the coupon with the largest discount for a cart.
+        
+        Args:
+            coupons (List[Dict]): The user's coupons
+            totals (Dict): Cart totals as computed by cart_totals
+            today (str, optional): Date used for expiry checks, YYYY-MM-DD; defaults to today
+            
+        Returns:
+            Dict: Best coupon code and discount, subtotal, final price, and why other coupons do not apply
+        """
+        today = today or date.today().isoformat()
+        best_code, best_discount, rejected = None, 0.0, []
+        for coupon in coupons:
+            discount, reason = self.evaluate(coupon, totals, today)
+            if reason is not None:
+                rejected.append({"code": coupon.get("code"), "reason": reason})
+            elif discount > best_discount:
+                best_code, best_discount = coupon.get("code"), discount
+        return {
+            "best_coupon": best_code,
+            "discount": best_discount,
+            "subtotal": totals["subtotal"],
+            "final_price": totals["subtotal"] - best_discount,
+            "not_applicable": rejected
+        }
+        
+    def best_many(self, carts: Iterable[Tuple[List[Dict], Dict]], today: str = None) -> List[Dict]:
+        """
+        Pick the best coupon for many (coupons, cart totals) pairs, e.g. to preview a campaign.
+        """
+        today = today or date.today().isoformat()
+        return [self.best(coupons, totals, today) for coupons, totals in carts]
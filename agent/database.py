@@ -1,8 +1,19 @@
+import threading
 from datetime import datetime
-from typing import Dict, List
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+from .catalog import ProductIndex
+from .concurrency import OrderIdGenerator, StripedLock
+from .carts import Cart
+from .coupons import CouponEngine
+from .logistics import LogisticsStore
+from .order_index import OrderIndex
+from .records import Order, Review, compact
+from .columnar import ColumnarCatalog
+from .text_index import TextIndex
 
 class ShopDatabase:
-    def __init__(self):
+    def __init__(self, seed_mock_data: bool = True):
         # Mock product database
         self.products_db = {
             "iPhone 15": {
@@ -250,73 +261,257 @@ class ShopDatabase:
             ]
         }
 
+        if not seed_mock_data:
+            for table in (self.products_db, self.orders_db, self.logistics_db, self.cart_db, self.coupon_db):
+                table.clear()
+                
+        # Keep orders, cart lines, tracking events and reviews as compact records rather than dicts
+        self.orders_db = {order_id: Order.from_dict(order) for order_id, order in self.orders_db.items()}
+        logistics_events = self.logistics_db
+        self.logistics_db = LogisticsStore()  # Append-only tracking events with latest/delta reads
+        self.logistics_db.ingest((number, event) for number, events in logistics_events.items() for event in events)
+        cart_lines = self.cart_db
+        self.cart_db = {}  # user_id -> Cart with merged lines and running totals
+        self.product_carts = {}  # product -> users whose cart holds it, to reprice carts when the product changes
+        for info in self.products_db.values():
+            if "reviews" in info:
+                info["reviews"] = compact(info["reviews"], Review)
+                
+        # Reviews loaded separately from the catalog (see BulkLoader), product name -> reviews
+        self.reviews_db = None
+        
+        # Write path: per-user stripes for carts and orders, one lock for the catalog and its indexes
+        self.order_ids = OrderIdGenerator()
+        self.cart_locks = StripedLock()
+        self.order_locks = StripedLock()
+        self.product_lock = threading.RLock()
+        
+        # Coupon conditions parsed once and evaluated against cart totals
+        self.coupon_engine = CouponEngine()
+        
+        for user_id, items in cart_lines.items():
+            for item in items:
+                self.add_to_cart(user_id, item["product"], item["quantity"], item["spec"], item["color"])
+        
+        # Category/brand/price indexes over products_db, maintained by the product write methods
+        self.product_index = ProductIndex()
+        self.product_index.build(self.products_db)
+        self.product_columns = ColumnarCatalog.from_products(self.products_db)
+        self.text_index = TextIndex()
+        self.text_index.build(self.products_db)
+        
+        # User/status/time indexes over orders_db, maintained by create_order and update_order_status
+        self.order_index = OrderIndex()
+        self.order_index.build(self.orders_db)
+        
+    @classmethod
+    def from_files(cls, paths: Dict[str, str], chunksize: int = 50000, lazy: bool = True) -> "ShopDatabase":
+        """Create a database from JSONL/CSV/Parquet files, given as table name -> path"""
+        from .loader import BulkLoader
+        db = cls(seed_mock_data=False)
+        db.load_reports = BulkLoader(db, chunksize=chunksize).load_all(paths, lazy=lazy)
+        return db
+        
     def get_product_info(self, product_name: str) -> Dict:
         """Query product information"""
-        return self.products_db.get(product_name, {})
+        info = self.products_db.get(product_name, {})
+        if info and self.reviews_db is not None and "reviews" not in info:
+            return {**info, "reviews": self.reviews_db.get(product_name, [])}
+        return info
     
     def get_order_info(self, order_id: str) -> Dict:
         """Query order information"""
         return self.orders_db.get(order_id, {})
+        
+    def get_user_orders(self, user_id: str, status: str = None, start_time: str = None, end_time: str = None,
+                        limit: int = None) -> List[Dict]:
+        """Query a user's orders, newest first, optionally by status and order time range"""
+        order_ids = self.order_index.user_orders(user_id, start_time, end_time)
+        if status:
+            order_ids = (order_id for order_id in order_ids if self.orders_db[order_id]["status"] == status)
+        return [{"order_id": order_id, **self.orders_db[order_id]} for order_id in islice(order_ids, limit)]
+        
+    def get_orders_by_status(self, status: str, start_time: str = None, end_time: str = None,
+                             limit: int = None) -> List[Dict]:
+        """Query orders with a status, newest first, optionally by order time range"""
+        order_ids = self.order_index.status_orders(status, start_time, end_time)
+        return [{"order_id": order_id, **self.orders_db[order_id]} for order_id in islice(order_ids, limit)]
+        
+    def update_order_status(self, order_id: str, status: str, tracking_number: str = None) -> bool:
+        """Change an order's status, and tracking number if given, keeping the indexes up to date"""
+        order = self.orders_db.get(order_id)
+        if order is None:
+            return False
+        with self.order_locks(order["user_id"]):
+            old_status = order["status"]
+            order.status = status
+            if tracking_number is not None:
+                order.tracking_number = tracking_number
+            if old_status != status:
+                self.order_index.change_status(order_id, order, old_status)
+        return True
     
-    def get_logistics_info(self, tracking_number: str) -> List:
-        """Query logistics information"""
-        return self.logistics_db.get(tracking_number, [])
+    def get_logistics_info(self, tracking_number: str, start_time: str = None, end_time: str = None) -> List:
+        """Query logistics information, optionally within an event time range"""
+        return self.logistics_db.history_range(tracking_number, start_time, end_time)
+        
+    def get_latest_logistics(self, tracking_number: str) -> Optional[Dict]:
+        """Query the latest logistics event"""
+        return self.logistics_db.latest(tracking_number)
+        
+    def get_logistics_updates(self, tracking_number: str, cursor: int = 0) -> Tuple[List, int]:
+        """Query logistics events added after a cursor from an earlier call, and the new cursor"""
+        return self.logistics_db.since(tracking_number, cursor)
+        
+    def add_logistics_events(self, events: Iterable[Tuple[str, Dict]]) -> int:
+        """Append a batch of (tracking_number, event) pairs from a carrier feed"""
+        return self.logistics_db.ingest(events)
     
-    def search_products(self, category: str = None, price_range: tuple = None) -> List[Dict]:
-        """Search products"""
+    def search_products(self, category: str = None, price_range: tuple = None, brand: str = None,
+                        limit: int = None, offset: int = 0, sort_by: str = "price", min_rating: float = None,
+                        in_stock: bool = False) -> List[Dict]:
+        """Search products by category, brand, price range, rating and stock, sorted by sort_by; reviews are left out"""
+        if sort_by == "price" and min_rating is None and not in_stock:
+            names = self.product_index.query(category or None, brand or None, price_range)
+        else:
+            names = self.product_columns.query(category or None, brand or None, price_range, min_rating=min_rating,
+                                               in_stock=in_stock, sort_by=sort_by, limit=limit, offset=offset)
+            offset = 0
+        stop = offset + limit if limit is not None else None
         results = []
-        for name, info in self.products_db.items():
-            if category and info["category"] != category:
-                continue
-            if price_range:
-                min_price, max_price = price_range
-                if not (min_price <= info["price"] <= max_price):
-                    continue
-            results.append({"product_name": name, **info})
+        for name in islice(names, offset, stop):
+            info = self.products_db[name]
+            results.append({"product_name": name, **{k: v for k, v in info.items() if k != "reviews"}})
         return results
+        
+    def add_product(self, product_name: str, info: Dict):
+        """Add or replace a product, keeping the indexes up to date"""
+        if "reviews" in info:
+            info = {**info, "reviews": compact(info["reviews"], Review)}
+        with self.product_lock:
+            self.remove_product(product_name)
+            self.products_db[product_name] = info
+            self.product_index.add(product_name, info)
+            self.product_columns.add(product_name, info)
+            self.text_index.add(product_name, info)
+            self._reprice_carts(product_name, info)
+        
+    def update_product(self, product_name: str, **fields) -> bool:
+        """Update fields of a product, keeping the indexes up to date"""
+        with self.product_lock:
+            info = self.products_db.get(product_name)
+            if info is None:
+                return False
+            self.add_product(product_name, {**info, **fields})
+        return True
+        
+    def remove_product(self, product_name: str) -> bool:
+        """Remove a product and its index entries"""
+        with self.product_lock:
+            info = self.products_db.pop(product_name, None)
+            if info is None:
+                return False
+            self.product_index.remove(product_name, info)
+            self.product_columns.remove(product_name)
+            self.text_index.remove(product_name)
+            self._reprice_carts(product_name, {})
+        return True
+        
+    def _reprice_carts(self, product_name: str, info: Dict):
+        for user_id in list(self.product_carts.get(product_name, ())):
+            with self.cart_locks(user_id):
+                cart = self.cart_db.get(user_id)
+                if cart is not None:
+                    cart.reprice(product_name, info.get("price"), info.get("brand"), info.get("category"))
+        
+    def find_products(self, query: str, limit: int = 5, min_score: float = 0.0) -> List[Dict]:
+        """Fuzzy search over product names, brands, categories, descriptions and reviews, best match first"""
+        return [
+            {"product_name": name, "score": score, "brand": self.products_db[name].get("brand"),
+             "category": self.products_db[name].get("category"), "price": self.products_db[name]["price"]}
+            for name, score in self.text_index.search(query, limit, min_score)
+        ]
     
     def get_cart_items(self, user_id: str) -> List[Dict]:
         """Get user's shopping cart items"""
-        return self.cart_db.get(user_id, [])
+        cart = self.cart_db.get(user_id)
+        return list(cart) if cart is not None else []
     
     def add_to_cart(self, user_id: str, product: str, quantity: int, spec: str, color: str) -> bool:
-        """Add item to shopping cart"""
-        if user_id not in self.cart_db:
-            self.cart_db[user_id] = []
+        """Add item to shopping cart, merging it with a line of the same product, spec and color"""
+        with self.cart_locks(user_id):
+            if user_id not in self.cart_db:
+                self.cart_db[user_id] = Cart()
+            # Register the cart before reading the price: a product write that lands after the read
+            # then finds this cart in product_carts and reprices it once this lock is released
+            self.product_carts.setdefault(product, set()).add(user_id)
+            info = self.products_db.get(product, {})
+            self.cart_db[user_id].add(product, quantity, spec, color, info.get("price"), info.get("brand"),
+                                      info.get("category"))
+        return True
         
-        self.cart_db[user_id].append({
-            "product": product,
-            "quantity": quantity,
-            "spec": spec,
-            "color": color
-        })
+    def remove_from_cart(self, user_id: str, product: str, spec: str, color: str, quantity: int = None) -> bool:
+        """Remove some units of a cart line, or the whole line"""
+        with self.cart_locks(user_id):
+            cart = self.cart_db.get(user_id)
+            if cart is None or not cart.remove(product, spec, color, quantity):
+                return False
+            if product not in set(cart.products()):
+                self.product_carts.get(product, set()).discard(user_id)
         return True
     
     def get_user_coupons(self, user_id: str) -> List[Dict]:
         """Get user's coupons"""
         return self.coupon_db.get(user_id, [])
     
+    def get_cart_totals(self, user_id: str) -> Dict:
+        """Get item count, subtotal and per-brand/category subtotals of a user's cart"""
+        cart = self.cart_db.get(user_id)
+        return cart.totals() if cart is not None else Cart().totals()
+        
+    def get_cart_summary(self, user_id: str) -> Dict:
+        """Get the number of lines, item count, subtotal and per-brand/category subtotals of a user's cart"""
+        cart = self.cart_db.get(user_id)
+        return {"lines": len(cart) if cart is not None else 0, **self.get_cart_totals(user_id)}
+        
+    def get_best_coupon(self, user_id: str, today: str = None) -> Dict:
+        """Find the coupon saving the most on a user's cart, and the final price"""
+        return self.coupon_engine.best(self.get_user_coupons(user_id), self.get_cart_totals(user_id), today)
+        
+    def preview_best_coupons(self, user_ids: Iterable[str] = None, extra_coupons: List[Dict] = (),
+                             today: str = None) -> Dict[str, Dict]:
+        """Best coupon per cart for many users, optionally with campaign coupons added for everyone"""
+        user_ids = list(self.cart_db) if user_ids is None else list(user_ids)
+        results = self.coupon_engine.best_many(
+            ((self.get_user_coupons(user_id) + list(extra_coupons), self.get_cart_totals(user_id)) for user_id in user_ids),
+            today
+        )
+        return dict(zip(user_ids, results))
+        
     def create_order(self, user_id: str, product: str, quantity: int, address: str, phone: str) -> str:
         """Create new order"""
-        order_id = f"ORDER{datetime.now().strftime('%Y%m%d%H%M%S')}"
         product_info = self.get_product_info(product)
         
         if not product_info:
             return ""
             
         total_price = product_info["price"] * quantity
+        order_id = self.order_ids.next_id()
         
-        self.orders_db[order_id] = {
-            "user_id": user_id,
-            "product": product,
-            "quantity": quantity,
-            "total_price": total_price,
-            "status": "Pending Payment",
-            "tracking_number": "",
-            "order_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "payment_status": "Unpaid",
-            "shipping_address": address,
-            "contact_phone": phone
-        }
+        order = Order(
+            user_id=user_id,
+            product=product,
+            quantity=quantity,
+            total_price=total_price,
+            status="Pending Payment",
+            tracking_number="",
+            order_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            payment_status="Unpaid",
+            shipping_address=address,
+            contact_phone=phone
+        )
+        with self.order_locks(user_id):
+            self.orders_db[order_id] = order
+            self.order_index.add(order_id, order)
         
         return order_id
\ No newline at end of file
@@ -0,0 +1,214 @@
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, Iterator, List
+from .records import to_json
+
+FRAME = struct.Struct("<II")  # payload length, CRC32 of the payload
+SEGMENT_SUFFIX = ".log"
+
+def segment_paths(directory: str) -> List[str]:
+    """
+    Segment files of an event log, oldest first.
+    """
+    return sorted(glob.glob(os.path.join(glob.escape(directory), "*" + SEGMENT_SUFFIX)))
+    
+def read_events(directory: str) -> Iterator[Dict]:
+    """
+    Read every event of a log in the order it was written.
+    A segment ends at its first torn or corrupt frame, which is where a crash interrupted a write.
+    """
+    for path in segment_paths(directory):
+        if os.path.getsize(path) == 0:
+            continue
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            offset, size = 0, len(data)
+            while offset + FRAME.size <= size:
+                length, crc = FRAME.unpack_from(data, offset)
+                start, end = offset + FRAME.size, offset + FRAME.size + length
+                if end > size:
+                    break
+                payload = data[start:end]
+                if zlib.crc32(payload) != crc:
+                    break
+                yield json.loads(payload)
+                offset = end
+                
+class EventLog:
+    """
+    Append-only log of conversation events, split into size-capped segment files.
+    Events are framed as length + CRC32 + JSON. append() only encodes the event and queues it;
+    a background thread writes everything queued in one write and one fsync (group commit), at
+    most flush_interval after the first event of a batch, so logging costs the caller
+    microseconds rather than a disk sync. flush() waits until what was appended is durable.
+    Each open starts a new segment, so a torn tail left by a crash is never appended to.
+    """
+    
+    def __init__(self, directory: str, segment_bytes: int = 64 << 20, flush_interval: float = 0.01,
+                 batch_bytes: int = 1 << 20, fsync: bool = True):
+        """
+        Args:
+            directory (str): Directory holding the segment files
+            segment_bytes (int): Size after which writing moves on to a new segment
+            flush_interval (float): Longest time in seconds an event waits to be written
+            batch_bytes (int): Queued bytes that trigger a write before flush_interval has passed
+            fsync (bool): Sync every batch to disk, not just to the OS
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.flush_interval = flush_interval
+        self.batch_bytes = batch_bytes
+        self.fsync = fsync
+        existing = segment_paths(directory)
+        self._segment = int(os.path.basename(existing[-1])[:-len(SEGMENT_SUFFIX)]) + 1 if existing else 0
+        self._file = None
+        self._size = 0
+        self._pending = []  # Encoded frames waiting for the writer
+        self._pending_bytes = 0
+        self._appended = 0  # Sequence number of the last appended event
+        self._durable = 0  # Sequence number of the last event written (and synced)
+        self._flush_requested = False
+        self._closed = False
+        self.error = None  # Write error of the background thread, raised again by append(), flush() and close()
+        self.events = 0
+        self.batches = 0
+        self.bytes_written = 0
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="event-log", daemon=True)
+        self._thread.start()
+        
+    def append(self, event: Dict) -> int:
+        """
+        Queue an event for writing. Raises the writer's error once a write has failed.
+        
+        Returns:
+            int: Sequence number of the event, to pass to flush()
+        """
+        payload = json.dumps(event, ensure_ascii=False, separators=(",", ":"), default=to_json).encode("utf-8")
+        frame = FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+        with self._cond:
+            if self._closed:
+                raise ValueError("Event log is closed")
+            # The writer has stopped: fail now rather than queue events that will never be written
+            if self.error is not None:
+                raise self.error
+            self._pending.append(frame)
+            self._pending_bytes += len(frame)
+            self._appended += 1
+            if len(self._pending) == 1 or self._pending_bytes >= self.batch_bytes:
+                self._cond.notify_all()
+            return self._appended
+            
+    def flush(self, seq: int = None, timeout: float = None) -> bool:
+        """
+        Write queued events now and wait until event seq (by default the last appended) is durable.
+        
+        Returns:
+            bool: Whether the event was written before the timeout
+        """
+        with self._cond:
+            seq = self._appended if seq is None else seq
+            if self._durable < seq:
+                self._flush_requested = True
+                self._cond.notify_all()
+            done = self._cond.wait_for(lambda: self._durable >= seq or self.error is not None, timeout)
+            if self.error is not None:
+                raise self.error
+            return done
+            
+    def close(self):
+        """
+        Write everything queued, stop the writer and close the segment.
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.error is not None:
+            raise self.error
+            
+    def stats(self) -> Dict:
+        """
+        Get write counters.
+        """
+        with self._cond:
+            return {
+                "events": self.events,
+                "batches": self.batches,
+                "bytes_written": self.bytes_written,
+                "pending": len(self._pending),
+                "segment": self._segment - 1 if self._file is not None else None
+            }
+            
+    def __enter__(self) -> "EventLog":
+        return self
+        
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                # Give concurrent turns a moment to join this batch
+                self._cond.wait_for(
+                    lambda: self._closed or self._flush_requested or self._pending_bytes >= self.batch_bytes,
+                    self.flush_interval
+                )
+                batch, self._pending, self._pending_bytes = self._pending, [], 0
+                upto, self._flush_requested = self._appended, False
+            try:
+                self._write(b"".join(batch))
+            except OSError as error:
+                with self._cond:
+                    self.error = error
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self._durable = upto
+                self.events += len(batch)
+                self.batches += 1
+                self._cond.notify_all()
+                
+    def _write(self, data: bytes):
+        if self._file is None or (self._size and self._size + len(data) > self.segment_bytes):
+            if self._file is not None:
+                self._file.close()
+            path = os.path.join(self.directory, f"{self._segment:08d}{SEGMENT_SUFFIX}")
+            self._file = open(path, "ab")
+            self._segment += 1
+            self._size = 0
+        self._file.write(data)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._size += len(data)
+        self.bytes_written += len(data)
+        
+def turn_event(session_id: str, state: str, response_type: str, action: str, messages: List[Dict]) -> Dict:
+    """
+    Event recording one conversation turn: its messages and the RL state, response type and action.
+    """
+    return {"type": "turn", "time": time.time(), "session_id": session_id, "state": state,
+            "response_type": response_type, "action": action, "messages": messages}
+            
+def feedback_event(session_id: str, feedback: str, reward: float, state: str, action: str,
+                   next_state: str) -> Dict:
+    """
+    Event recording user feedback and the Q-learning transition it produced.
+    """
+    return {"type": "feedback", "time": time.time(), "session_id": session_id, "feedback": feedback,
+            "reward": reward, "state": state, "action": action, "next_state": next_state}
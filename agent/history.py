@@ -0,0 +1,151 @@
+from collections import deque
+from typing import Dict, List
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken missing or its encoding unavailable, estimate from characters
+    _ENCODING = None
+    
+MESSAGE_OVERHEAD_TOKENS = 4  # Role and separator tokens added per message
+
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens of a text, estimating roughly 4 characters per token without tiktoken.
+    """
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return len(text) // 4 + 1
+    
+def count_message_tokens(message: Dict) -> int:
+    """
+    Count the tokens a chat message contributes to the prompt.
+    """
+    tokens = MESSAGE_OVERHEAD_TOKENS + count_tokens(message.get("content"))
+    for tool_call in message.get("tool_calls") or ():
+        function = tool_call["function"]
+        tokens += count_tokens(function["name"]) + count_tokens(function["arguments"])
+    return tokens
+    
+def is_tool_message(message: Dict) -> bool:
+    """
+    Check whether a message is a tool output or a model request to call a tool.
+    """
+    return (message["role"] in ("function", "tool")
+            or bool(message.get("function_call")) or bool(message.get("tool_calls")))
+            
+class ConversationWindow:
+    """
+    Token-budgeted view of a conversation.
+    Recent messages are kept verbatim; once the budget is exceeded the oldest messages are
+    folded into a rolling summary, and tool outputs of finished turns are dropped.
+    Token counts are computed once per message and maintained incrementally.
+    """
+    
+    def __init__(self, token_budget: int = 1500, max_messages: int = 50, keep_recent: int = 4,
+                 summary_budget: int = 200, summary_line_chars: int = 160):
+        """
+        Args:
+            token_budget (int): Maximum number of tokens of the verbatim messages
+            max_messages (int): Maximum number of verbatim messages
+            keep_recent (int): Number of latest messages that are never summarised
+            summary_budget (int): Maximum number of tokens of the rolling summary
+            summary_line_chars (int): Maximum characters kept per summarised message
+        """
+        self.token_budget = token_budget
+        self.max_messages = max_messages
+        self.keep_recent = keep_recent
+        self.summary_budget = summary_budget
+        self.summary_line_chars = summary_line_chars
+        self.messages = []  # Verbatim messages, oldest first
+        self.token_counts = []  # Token count of each verbatim message
+        self.total_tokens = 0
+        self._turn_start = 0  # Index of the user message of the turn in progress
+        self.summary_lines = deque()  # (line, tokens) of summarised messages
+        self.summary_tokens = 0
+        self._summary = None  # Cached summary text
+        
+    def append(self, message: Dict):
+        """
+        Add a message and compact the window if it exceeds its budget.
+        """
+        # A new question means the tool outputs of the previous turn are stale
+        if message["role"] == "user":
+            self._drop_stale_tool_outputs()
+            self._turn_start = len(self.messages)
+            
+        tokens = count_message_tokens(message)
+        self.messages.append(message)
+        self.token_counts.append(tokens)
+        self.total_tokens += tokens
+        self._compact()
+        
+    def render(self, system_prompt: str) -> List[Dict]:
+        """
+        Build the messages for a completion call.
+        
+        Args:
+            system_prompt (str): System prompt placed first
+            
+        Returns:
+            List[Dict]: System prompt, rolling summary and verbatim messages
+        """
+        messages = [{"role": "system", "content": system_prompt}]
+        summary = self.summary
+        if summary:
+            messages.append({"role": "system", "content": "Summary of the earlier conversation:\n" + summary})
+        messages.extend(self.messages)
+        return messages
+        
+    @property
+    def summary(self) -> str:
+        """
+        Rolling summary of the messages that no longer fit the window.
+        """
+        if self._summary is None:
+            self._summary = "\n".join(line for line, _ in self.summary_lines)
+        return self._summary
+        
+    @property
+    def prompt_tokens(self) -> int:
+        """
+        Tokens of the verbatim messages and the summary, excluding the system prompt.
+        """
+        return self.total_tokens + self.summary_tokens
+        
+    def _drop_stale_tool_outputs(self):
+        # Earlier turns were already cleaned, so only the last turn can hold tool messages
+        i = len(self.messages) - 1
+        while i >= 0 and self.messages[i]["role"] != "user":
+            if is_tool_message(self.messages[i]):
+                self.total_tokens -= self.token_counts[i]
+                del self.messages[i]
+                del self.token_counts[i]
+            i -= 1
+            
+    def _compact(self):
+        # Messages of the turn in progress are never summarised, so tool calls keep their results
+        while (self._turn_start > 0 and len(self.messages) > self.keep_recent
+               and (self.total_tokens > self.token_budget or len(self.messages) > self.max_messages)):
+            message = self.messages.pop(0)
+            self.total_tokens -= self.token_counts.pop(0)
+            self._turn_start -= 1
+            if not is_tool_message(message):
+                self._summarise(message)
+                
+    def _summarise(self, message: Dict):
+        content = " ".join((message.get("content") or "").split())
+        if not content:
+            return
+        if len(content) > self.summary_line_chars:
+            content = content[:self.summary_line_chars - 3] + "..."
+        line = f"{message['role'].capitalize()}: {content}"
+        tokens = count_tokens(line) + 1
+        self.summary_lines.append((line, tokens))
+        self.summary_tokens += tokens
+        while self.summary_tokens > self.summary_budget and self.summary_lines:
+            _, dropped = self.summary_lines.popleft()
+            self.summary_tokens -= dropped
+        self._summary = None
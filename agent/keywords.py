@@ -0,0 +1,70 @@
+import re
+from typing import Dict, FrozenSet, Iterable, List
+
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    """
+    Regex matching the longest of the keywords at a position, factored into a trie so the
+    regex engine walks one branch per character instead of trying every keyword in turn.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}  # End of a keyword
+        
+    def build(node: Dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        # Longer keywords are tried first; a keyword ending here is the fallback
+        return f"(?:{body})?" if "" in node else body
+        
+    return build(trie)
+    
+class KeywordMatcher:
+    """
+    Finds which keyword groups occur in a text in one regex pass.
+    All keywords are compiled into a single lookahead trie regex tried at every position,
+    which finds the longest keyword starting there. Whenever a keyword occurs at a position,
+    it is a prefix of that longest keyword, so each keyword is mapped to the groups of all
+    keywords that are its prefixes. This gives the same answer as testing every keyword with `in`,
+    overlaps included ("not helpful" also contains "helpful").
+    """
+    
+    def __init__(self, groups: Dict[str, Iterable[str]]):
+        """
+        Args:
+            groups (Dict[str, Iterable[str]]): Group name -> lower-case keywords, in output order
+        """
+        self.order = list(groups)
+        owners = {}  # keyword -> groups it belongs to
+        for group, keywords in groups.items():
+            for keyword in keywords:
+                owners.setdefault(keyword, set()).add(group)
+        self._groups = {
+            keyword: frozenset().union(*(owners[prefix] for prefix in owners if keyword.startswith(prefix)))
+            for keyword in owners
+        }
+        self._pattern = re.compile(f"(?=({_trie_pattern(owners)}))") if owners else None
+        
+    def groups(self, text: str) -> FrozenSet[str]:
+        """
+        Groups with at least one keyword in the text; the text is expected in lower case.
+        """
+        if self._pattern is None:
+            return frozenset()
+        found = set()
+        for match in self._pattern.finditer(text):
+            found |= self._groups[match.group(1)]
+            if len(found) == len(self.order):
+                break
+        return frozenset(found)
+        
+    def ordered(self, text: str) -> List[str]:
+        """
+        Groups with at least one keyword in the text, in the order they were given.
+        """
+        found = self.groups(text)
+        return [group for group in self.order if group in found]
@@ -0,0 +1,329 @@
+import csv
+import io
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Dict, Iterator, List, Optional
+import pandas as pd
+from .records import CartLine, LogisticsEvent, Order, Review
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+    
+# Column layout of each table: integer and float columns, list columns (JSON text in CSV files),
+# the key column the rows are grouped by and the record type holding a row, if any
+TABLES = {
+    "products": {"key": "name", "ints": ("stock", "review_count"), "floats": ("price", "rating"),
+                 "lists": ("specs", "colors")},
+    "reviews": {"key": "product", "ints": ("rating",), "floats": (), "lists": (), "record": Review},
+    "orders": {"key": "order_id", "ints": ("quantity",), "floats": ("total_price",), "lists": (), "record": Order},
+    "logistics": {"key": "tracking_number", "ints": (), "floats": (), "lists": (), "record": LogisticsEvent},
+    "carts": {"key": "user_id", "ints": ("quantity",), "floats": (), "lists": (), "record": CartLine},
+    "coupons": {"key": "user_id", "ints": (), "floats": ("amount",), "lists": ()}
+}
+
+def read_chunks(path: str, chunksize: int = 50000) -> Iterator[pd.DataFrame]:
+    """
+    Stream a JSONL, CSV or Parquet file as DataFrames of at most chunksize rows.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".jsonl", ".ndjson"):
+        with pd.read_json(path, lines=True, chunksize=chunksize, dtype=False, convert_dates=False) as reader:
+            yield from reader
+    elif extension == ".csv":
+        # Read as text so IDs and phone numbers keep their leading zeros; numeric columns are cast later
+        yield from pd.read_csv(path, chunksize=chunksize, dtype=str, keep_default_na=False, na_values=[""])
+    elif extension == ".parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        raise ValueError(f"Unsupported file type: {path}")
+        
+def to_records(chunk: pd.DataFrame, table: str) -> List[Dict]:
+    """
+    Convert a chunk into plain Python dicts with the table's column types; missing values become None.
+    """
+    spec = TABLES[table]
+    chunk = chunk.copy()
+    for column in spec["ints"]:
+        if column in chunk:
+            chunk[column] = pd.to_numeric(chunk[column]).astype("Int64")
+    for column in spec["floats"]:
+        if column in chunk:
+            chunk[column] = pd.to_numeric(chunk[column])
+    records = chunk.astype(object).where(chunk.notna(), None).to_dict("records")
+    for column in spec["lists"]:
+        for record in records:
+            value = record.get(column)
+            if isinstance(value, str):
+                record[column] = json.loads(value) if value.startswith("[") else value.split("|")
+            elif value is not None and not isinstance(value, list):
+                record[column] = list(value)  # Parquet list columns arrive as arrays
+    return records
+    
+def _process_peak_rss_mb() -> Optional[float]:
+    # Highest RSS of the whole process so far, not of one load: it only rises, and earlier loads count
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Kilobytes on Linux
+    
+class LazyTable(MutableMapping):
+    """
+    Mapping of key -> list of rows that stays on disk until a key is read.
+    Loading only scans the file for the byte offsets of each key's lines; rows are parsed on
+    first access and kept in a bounded LRU cache. New values are held in memory on top of
+    the file. JSONL and CSV files with one record per line are supported.
+    """
+    
+    def __init__(self, path: str, table: str, cache_size: int = 4096):
+        """
+        Args:
+            path (str): JSONL or CSV file
+            table (str): Table layout in TABLES, e.g. "reviews" or "logistics"
+            cache_size (int): Number of materialised keys kept in memory
+        """
+        self.path = path
+        self.table = table
+        self.key = TABLES[table]["key"]
+        self.cache_size = cache_size
+        self.is_csv = path.lower().endswith(".csv")
+        self.header = None
+        self.offsets = {}  # key -> byte offsets of its lines
+        self.overlay = {}  # key -> rows written after loading
+        self.cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.rows = self._scan()
+        
+    def _scan(self) -> int:
+        rows = 0
+        with open(self.path, "rb") as f:
+            offset = 0
+            if self.is_csv:
+                first = f.readline()
+                self.header = next(csv.reader([first.decode("utf-8")]))
+                key_position = self.header.index(self.key)
+                offset = len(first)
+            for line in f:
+                if line.strip():
+                    if self.is_csv:
+                        key = next(csv.reader([line.decode("utf-8")]))[key_position]
+                    else:
+                        key = json.loads(line)[self.key]
+                    self.offsets.setdefault(key, []).append(offset)
+                    rows += 1
+                offset += len(line)
+        return rows
+        
+    def _materialise(self, key: str) -> List[Dict]:
+        lines = []
+        with open(self.path, "rb") as f:
+            for offset in self.offsets[key]:
+                f.seek(offset)
+                lines.append(f.readline().decode("utf-8"))
+        if self.is_csv:
+            chunk = pd.read_csv(io.StringIO("".join(lines)), names=self.header, dtype=str,
+                                keep_default_na=False, na_values=[""])
+        else:
+            chunk = pd.DataFrame([json.loads(line) for line in lines])
+        record_type = TABLES[self.table].get("record")
+        records = to_records(chunk, self.table)
+        for record in records:
+            record.pop(self.key, None)
+        return [record_type.from_dict(record) for record in records] if record_type else records
+        
+    def __getitem__(self, key: str) -> List[Dict]:
+        if key in self.overlay:
+            return self.overlay[key]
+        with self._lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+        if key not in self.offsets:
+            raise KeyError(key)
+        records = self._materialise(key)
+        with self._lock:
+            self.cache[key] = records
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return records
+        
+    def __setitem__(self, key: str, value: List[Dict]):
+        self.overlay[key] = value
+        
+    def __delitem__(self, key: str):
+        found = self.overlay.pop(key, None) is not None
+        found = self.offsets.pop(key, None) is not None or found
+        with self._lock:
+            self.cache.pop(key, None)
+        if not found:
+            raise KeyError(key)
+            
+    def __contains__(self, key) -> bool:
+        return key in self.overlay or key in self.offsets
+        
+    def __iter__(self):
+        yield from self.overlay
+        yield from (key for key in self.offsets if key not in self.overlay)
+        
+    def __len__(self) -> int:
+        return len(self.offsets.keys() | self.overlay.keys())
+        
+class BulkLoader:
+    """
+    Loads real datasets into a ShopDatabase chunk by chunk.
+    Memory stays bounded by the chunk size plus the tables themselves: the category/brand/price
+    columns and the fuzzy text index are extended with every chunk, and reviews and logistics
+    history can stay on disk as LazyTables until they are read.
+    """
+    
+    def __init__(self, db, chunksize: int = 50000, index_text: bool = True):
+        """
+        Args:
+            db (ShopDatabase): Database to load into
+            chunksize (int): Rows per chunk
+            index_text (bool): Index product names and descriptions for fuzzy search while loading
+        """
+        self.db = db
+        self.chunksize = chunksize
+        self.index_text = index_text
+        self.reports = []
+        
+    def load_products(self, path: str) -> Dict:
+        """
+        Load products, one row per product with a "name" column, and index them.
+        """
+        def load(chunk: pd.DataFrame) -> int:
+            products = {}
+            for record in to_records(chunk, "products"):
+                name = record.pop("name")
+                products[name] = {k: v for k, v in record.items() if v is not None}
+            self.db.products_db.update(products)
+            self.db.product_columns.extend(products)
+            if self.index_text:
+                for name, info in products.items():
+                    self.db.text_index.add(name, info)
+            return len(products)
+            
+        report = self._load("products", path, load)
+        # One sort over the finished catalog is cheaper than inserting row by row
+        self.db.product_index.build(self.db.products_db)
+        return report
+        
+    def load_orders(self, path: str) -> Dict:
+        """
+        Load orders, one row per order with an "order_id" column.
+        """
+        def load(chunk: pd.DataFrame) -> int:
+            records = to_records(chunk, "orders")
+            for record in records:
+                self.db.orders_db[record["order_id"]] = Order.from_dict(record)
+            return len(records)
+            
+        report = self._load("orders", path, load)
+        self.db.order_index.build(self.db.orders_db)
+        return report
+        
+    def load_carts(self, path: str) -> Dict:
+        """
+        Load cart lines with a "user_id" column; load products first so lines are priced.
+        """
+        def load(chunk: pd.DataFrame) -> int:
+            records = to_records(chunk, "carts")
+            for record in records:
+                self.db.add_to_cart(record["user_id"], record["product"], record["quantity"], record["spec"],
+                                    record["color"])
+            return len(records)
+            
+        return self._load("carts", path, load)
+        
+    def load_coupons(self, path: str) -> Dict:
+        """
+        Load coupons with a "user_id" column.
+        """
+        return self._load("coupons", path, self._grouped_loader("coupons", self.db.coupon_db))
+        
+    def load_reviews(self, path: str, lazy: bool = True) -> Dict:
+        """
+        Load reviews with a "product" column, lazily by default.
+        """
+        if lazy and not path.lower().endswith(".parquet"):
+            return self._load_lazy("reviews", path, "reviews_db")
+        if self.db.reviews_db is None:
+            self.db.reviews_db = {}
+        return self._load("reviews", path, self._grouped_loader("reviews", self.db.reviews_db))
+        
+    def load_logistics(self, path: str, lazy: bool = True) -> Dict:
+        """
+        Load tracking events with a "tracking_number" column, lazily by default.
+        """
+        if lazy and not path.lower().endswith(".parquet"):
+            start = time.perf_counter()
+            history = LazyTable(path, "logistics")
+            self.db.logistics_db.attach_history(history)
+            return self._report("logistics", path, history.rows, start, lazy=True)
+            
+        def load(chunk: pd.DataFrame) -> int:
+            return self.db.logistics_db.ingest(
+                (record.pop("tracking_number"), record) for record in to_records(chunk, "logistics")
+            )
+            
+        return self._load("logistics", path, load)
+        
+    def load_all(self, paths: Dict[str, str], lazy: bool = True) -> List[Dict]:
+        """
+        Load several tables, given as table name -> file path; reviews and logistics stay lazy if lazy is set.
+        """
+        loaders = {
+            "products": self.load_products,
+            "orders": self.load_orders,
+            "carts": self.load_carts,
+            "coupons": self.load_coupons,
+            "reviews": lambda path: self.load_reviews(path, lazy=lazy),
+            "logistics": lambda path: self.load_logistics(path, lazy=lazy)
+        }
+        return [loaders[table](path) for table, path in paths.items()]
+        
+    def _grouped_loader(self, table: str, target: Dict):
+        key = TABLES[table]["key"]
+        record_type = TABLES[table].get("record")
+        
+        def load(chunk: pd.DataFrame) -> int:
+            records = to_records(chunk, table)
+            for record in records:
+                target.setdefault(record.pop(key), []).append(record_type.from_dict(record) if record_type else record)
+            return len(records)
+            
+        return load
+        
+    def _load(self, table: str, path: str, load) -> Dict:
+        start = time.perf_counter()
+        rows = 0
+        for chunk in read_chunks(path, self.chunksize):
+            rows += load(chunk)
+        return self._report(table, path, rows, start, lazy=False)
+        
+    def _load_lazy(self, table: str, path: str, attribute: str) -> Dict:
+        start = time.perf_counter()
+        lazy_table = LazyTable(path, table)
+        setattr(self.db, attribute, lazy_table)
+        return self._report(table, path, lazy_table.rows, start, lazy=True)
+        
+    def _report(self, table: str, path: str, rows: int, start: float, lazy: bool) -> Dict:
+        seconds = time.perf_counter() - start
+        report = {
+            "table": table,
+            "path": path,
+            "rows": rows,
+            "lazy": lazy,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(rows / seconds) if seconds > 0 else rows,
+            "process_peak_rss_mb": _process_peak_rss_mb()
+        }
+        self.reports.append(report)
+        return report
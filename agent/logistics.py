@@ -0,0 +1,173 @@
+import itertools
+import queue
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+from typing import Iterable, List, Optional, Tuple
+from .concurrency import StripedLock
+from .records import LogisticsEvent, compact
+
+class _Track:
+    """
+    Events of one tracking number: parallel lists sorted by event time, with ingest sequence numbers.
+    """
+    __slots__ = ("times", "events", "seqs")
+    
+    def __init__(self):
+        self.times = []
+        self.events = []
+        self.seqs = []
+        
+class LogisticsStore(Mapping):
+    """
+    Append-only, time-ordered store of carrier tracking events.
+    Every event gets a global ingest sequence number, so a reader can ask for only what arrived
+    after its last read, and the latest event per tracking number is the tail of its list.
+    Batches are grouped by tracking number so each track is locked once per batch. Reads as a
+    mapping of tracking number -> events, like the dict it replaces.
+    """
+    
+    def __init__(self, history: Mapping = None):
+        """
+        Args:
+            history (Mapping, optional): Older events by tracking number, e.g. a LazyTable, read on first use
+        """
+        self.history = history
+        self.tracks = {}  # tracking number -> _Track
+        self._locks = StripedLock()
+        self._seq = itertools.count(1)
+        
+    def attach_history(self, history: Mapping):
+        """
+        Serve tracking numbers not yet in memory from history, e.g. a LazyTable loaded at startup.
+        """
+        self.history = history
+        
+    def _track(self, tracking_number: str, create: bool = False) -> Optional[_Track]:
+        track = self.tracks.get(tracking_number)
+        if track is None and (create or (self.history is not None and tracking_number in self.history)):
+            with self._locks(tracking_number):
+                track = self.tracks.get(tracking_number)
+                if track is None:
+                    track = _Track()
+                    if self.history is not None and tracking_number in self.history:
+                        self._extend(track, compact(self.history[tracking_number], LogisticsEvent))
+                    self.tracks[tracking_number] = track
+        return track
+        
+    def _extend(self, track: _Track, events: List[LogisticsEvent]):
+        for event in sorted(events, key=lambda event: event.time):
+            seq = next(self._seq)
+            if not track.times or event.time >= track.times[-1]:
+                track.times.append(event.time)
+                track.events.append(event)
+                track.seqs.append(seq)
+            else:  # Late event from the carrier: keep the list in time order
+                i = bisect_right(track.times, event.time)
+                track.times.insert(i, event.time)
+                track.events.insert(i, event)
+                track.seqs.insert(i, seq)
+                
+    def append(self, tracking_number: str, event) -> None:
+        """
+        Add one event, given as a LogisticsEvent or a dict with time, status and location.
+        """
+        self.ingest([(tracking_number, event)])
+        
+    def ingest(self, events: Iterable[Tuple[str, object]]) -> int:
+        """
+        Add a batch of (tracking number, event) pairs.
+        
+        Returns:
+            int: Number of events added
+        """
+        grouped = {}
+        for tracking_number, event in events:
+            if not isinstance(event, LogisticsEvent):
+                event = LogisticsEvent.from_dict(event)
+            grouped.setdefault(tracking_number, []).append(event)
+        for tracking_number, batch in grouped.items():
+            track = self._track(tracking_number, create=True)
+            with self._locks(tracking_number):
+                self._extend(track, batch)
+        return sum(len(batch) for batch in grouped.values())
+        
+    def ingest_file(self, path: str, batch_size: int = 50000) -> int:
+        """
+        Ingest a JSONL, CSV or Parquet carrier feed with tracking_number, time, status and location columns.
+        """
+        from .loader import read_chunks, to_records
+        count = 0
+        for chunk in read_chunks(path, batch_size):
+            count += self.ingest((record.pop("tracking_number"), record) for record in to_records(chunk, "logistics"))
+        return count
+        
+    def ingest_queue(self, events: queue.Queue, batch_size: int = 1000, timeout: float = 0.05) -> int:
+        """
+        Drain (tracking number, event) pairs from a queue in batches until None is received.
+        Meant to run in its own thread next to a carrier feed consumer.
+        """
+        count, batch, done = 0, [], False
+        while not done:
+            try:
+                item = events.get(timeout=timeout if batch else None)
+                if item is None:
+                    done = True
+                else:
+                    batch.append(item)
+            except queue.Empty:
+                pass
+            if batch and (done or len(batch) >= batch_size or events.empty()):
+                count += self.ingest(batch)
+                batch = []
+        return count
+        
+    def history_range(self, tracking_number: str, start_time: str = None, end_time: str = None) -> List:
+        """
+        Events of a tracking number in time order, optionally within [start_time, end_time].
+        """
+        track = self._track(tracking_number)
+        if track is None:
+            return []
+        with self._locks(tracking_number):
+            lo = bisect_left(track.times, start_time) if start_time else 0
+            hi = bisect_right(track.times, end_time + "\uffff") if end_time else len(track.times)
+            return track.events[lo:hi]
+            
+    def latest(self, tracking_number: str) -> Optional[LogisticsEvent]:
+        """
+        Most recent event of a tracking number.
+        """
+        track = self._track(tracking_number)
+        if track is None or not track.events:
+            return None
+        return track.events[-1]
+        
+    def since(self, tracking_number: str, cursor: int = 0) -> Tuple[List, int]:
+        """
+        Events ingested after a cursor returned by an earlier call, and the new cursor.
+        """
+        track = self._track(tracking_number)
+        if track is None:
+            return [], cursor
+        with self._locks(tracking_number):
+            events = [event for event, seq in zip(track.events, track.seqs) if seq > cursor]
+            return events, max(track.seqs, default=cursor)
+            
+    def __getitem__(self, tracking_number: str) -> List:
+        track = self._track(tracking_number)
+        if track is None:
+            raise KeyError(tracking_number)
+        return list(track.events)
+        
+    def __contains__(self, tracking_number) -> bool:
+        return tracking_number in self.tracks or (self.history is not None and tracking_number in self.history)
+        
+    def __iter__(self):
+        yield from self.tracks
+        if self.history is not None:
+            yield from (number for number in self.history if number not in self.tracks)
+            
+    def __len__(self) -> int:
+        if self.history is None:
+            return len(self.tracks)
+        return len(self.tracks) + sum(1 for number in self.history if number not in self.tracks)
@@ -0,0 +1,237 @@
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+BUCKETS_PER_OCTAVE = 4  # Bucket bounds grow by 2 ** (1 / 4), about 19%
+MAX_BUCKET = 40 * BUCKETS_PER_OCTAVE  # 2 ** 40 ns, about 18 minutes
+QUANTILES = (0.5, 0.95, 0.99)
+
+class Histogram:
+    """
+    Log-bucketed histogram of durations in nanoseconds.
+    Recording is a log2 and a counter increment; quantiles are read from the buckets with the
+    bucket width as error bound, which is plenty for latency percentiles. Not locked: each
+    thread records into its own histograms, which are merged when read.
+    """
+    __slots__ = ("counts", "count", "total")
+    
+    def __init__(self):
+        self.counts = [0] * (MAX_BUCKET + 1)
+        self.count = 0
+        self.total = 0
+        
+    def observe(self, ns: int):
+        bucket = min(MAX_BUCKET, math.ceil(math.log2(ns) * BUCKETS_PER_OCTAVE)) if ns > 1 else 0
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += ns
+        
+    def merge(self, other: "Histogram"):
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        
+    def quantile(self, q: float) -> float:
+        """
+        Upper bound of the bucket holding the q-quantile, in nanoseconds.
+        """
+        rank, seen = q * self.count, 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return 2 ** (bucket / BUCKETS_PER_OCTAVE)
+        return 0.0
+        
+    def summary(self) -> Dict:
+        """
+        Count, mean and p50/p95/p99 in milliseconds.
+        """
+        summary = {"count": self.count, "mean_ms": self.total / self.count / 1e6 if self.count else 0.0}
+        for q in QUANTILES:
+            summary[f"p{round(q * 100)}_ms"] = self.quantile(q) / 1e6
+        return summary
+        
+class _Span:
+    __slots__ = ("metrics", "stage", "start")
+    
+    def __init__(self, metrics: "Metrics", stage: str):
+        self.metrics = metrics
+        self.stage = stage
+        
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter_ns()
+        return self
+        
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.stage, time.perf_counter_ns() - self.start)
+        
+class Metrics:
+    """
+    Hot-path latency and usage metrics of the agent.
+    Stages of a turn are timed with the monotonic perf_counter_ns clock into per-stage
+    histograms; tool calls get per-tool counts, errors and latency histograms; completion
+    token usage is summed per kind. Everything can be read as p50/p95/p99 summaries or as a
+    Prometheus text dump. An optional profiling hook sees every span as it ends.
+    Histograms are kept per thread, so recording takes no lock; readers merge them.
+    """
+    
+    def __init__(self, namespace: str = "shop_agent",
+                 profile_hook: Callable[[str, int], None] = None):
+        """
+        Args:
+            namespace (str): Prefix of the Prometheus metric names
+            profile_hook (Callable[[str, int], None], optional): Called with (stage, nanoseconds) after each span,
+                e.g. to feed a tracer or start a profiler when a stage is slow
+        """
+        self.namespace = namespace
+        self.profile_hook = profile_hook
+        self.tool_errors = {}  # tool name -> failed calls
+        self.tokens = {"prompt": 0, "completion": 0, "total": 0}
+        self.completions = {"api": 0, "cache": 0}
+        self._shards = []  # Per-thread ({stage -> Histogram}, {tool name -> Histogram})
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        
+    def span(self, stage: str) -> _Span:
+        """
+        Context manager timing a stage.
+        """
+        return _Span(self, stage)
+        
+    def observe(self, stage: str, ns: int):
+        """
+        Record the duration of a stage in nanoseconds.
+        """
+        stages = self._shard()[0]
+        histogram = stages.get(stage)
+        if histogram is None:
+            histogram = stages[stage] = Histogram()
+        histogram.observe(ns)
+        if self.profile_hook is not None:
+            self.profile_hook(stage, ns)
+            
+    def observe_tool(self, name: str, ns: int, failed: bool = False):
+        """
+        Record a tool call and its duration in nanoseconds.
+        """
+        tools = self._shard()[1]
+        histogram = tools.get(name)
+        if histogram is None:
+            histogram = tools[name] = Histogram()
+        histogram.observe(ns)
+        if failed:
+            with self._lock:
+                self.tool_errors[name] = self.tool_errors.get(name, 0) + 1
+                
+    def record_completion(self, usage: Optional[Dict] = None, cached: bool = False):
+        """
+        Count a completion and add its token usage, as reported in the response's "usage".
+        """
+        with self._lock:
+            self.completions["cache" if cached else "api"] += 1
+            if usage:
+                for kind in self.tokens:
+                    self.tokens[kind] += usage.get(f"{kind}_tokens", 0) or 0
+                    
+    def _shard(self) -> tuple:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = ({}, {})
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+        
+    def _merged(self, kind: int) -> Dict[str, Histogram]:
+        merged = {}
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for key, histogram in list(shard[kind].items()):
+                merged.setdefault(key, Histogram()).merge(histogram)
+        return merged
+        
+    @property
+    def stages(self) -> Dict[str, Histogram]:
+        """
+        Stage latency histograms merged across threads.
+        """
+        return self._merged(0)
+        
+    @property
+    def tools(self) -> Dict[str, Histogram]:
+        """
+        Tool latency histograms merged across threads.
+        """
+        return self._merged(1)
+        
+    def summary(self) -> Dict:
+        """
+        Per-stage and per-tool latency summaries, tool errors, completions and token usage.
+        """
+        stages, tools = self.stages, self.tools
+        with self._lock:
+            return {
+                "stages": {stage: histogram.summary() for stage, histogram in stages.items()},
+                "tools": {name: histogram.summary() for name, histogram in tools.items()},
+                "tool_errors": dict(self.tool_errors),
+                "completions": dict(self.completions),
+                "tokens": dict(self.tokens)
+            }
+            
+    def render_prometheus(self) -> str:
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        ns = self.namespace
+        lines = []
+        stages, tools = self.stages, self.tools
+        with self._lock:
+            tool_errors, completions, tokens = dict(self.tool_errors), dict(self.completions), dict(self.tokens)
+        self._render_histograms(lines, f"{ns}_stage_seconds", "stage", stages, "Latency of the stages of a turn")
+        self._render_histograms(lines, f"{ns}_tool_seconds", "tool", tools, "Latency of tool calls")
+        lines += [f"# HELP {ns}_tool_errors_total Failed tool calls", f"# TYPE {ns}_tool_errors_total counter"]
+        lines += [f'{ns}_tool_errors_total{{tool="{name}"}} {count}' for name, count in sorted(tool_errors.items())]
+        lines += [f"# HELP {ns}_completions_total Completions by source",
+                  f"# TYPE {ns}_completions_total counter"]
+        lines += [f'{ns}_completions_total{{source="{source}"}} {count}' for source, count in completions.items()]
+        lines += [f"# HELP {ns}_tokens_total Completion token usage",
+                  f"# TYPE {ns}_tokens_total counter"]
+        lines += [f'{ns}_tokens_total{{kind="{kind}"}} {count}' for kind, count in tokens.items()]
+        return "\n".join(lines) + "\n"
+        
+    @staticmethod
+    def _render_histograms(lines: List[str], name: str, label: str, histograms: Dict[str, Histogram],
+                           description: str):
+        lines += [f"# HELP {name} {description}", f"# TYPE {name} histogram"]
+        for key, histogram in sorted(histograms.items()):
+            cumulative = 0
+            # One exported bucket per octave keeps the dump short
+            for bucket, count in enumerate(histogram.counts):
+                cumulative += count
+                if bucket % BUCKETS_PER_OCTAVE == 0 and bucket:
+                    le = 2 ** (bucket / BUCKETS_PER_OCTAVE) / 1e9
+                    lines.append(f'{name}_bucket{{{label}="{key}",le="{le:.9g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{label}="{key}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{name}_sum{{{label}="{key}"}} {histogram.total / 1e9:.9g}')
+            lines.append(f'{name}_count{{{label}="{key}"}} {histogram.count}')
+        lines += [f"# HELP {name}_quantile {description}, p50/p95/p99", f"# TYPE {name}_quantile gauge"]
+        for key, histogram in sorted(histograms.items()):
+            for q in QUANTILES:
+                lines.append(f'{name}_quantile{{{label}="{key}",quantile="{q}"}} {histogram.quantile(q) / 1e9:.9g}')
+                
+    def measure_overhead(self, iterations: int = 100000) -> Dict:
+        """
+        Cost of one span and of one tool observation in nanoseconds, measured on a scratch registry.
+        """
+        scratch = Metrics(self.namespace)
+        start = time.perf_counter_ns()
+        for _ in range(iterations):
+            with scratch.span("overhead"):
+                pass
+        span_ns = (time.perf_counter_ns() - start) / iterations
+        start = time.perf_counter_ns()
+        for _ in range(iterations):
+            scratch.observe_tool("overhead", 1000)
+        tool_ns = (time.perf_counter_ns() - start) / iterations
+        return {"span_ns": round(span_ns), "tool_observation_ns": round(tool_ns)}
@@ -0,0 +1,94 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterator, List, Tuple
+from .concurrency import StripedLock
+
+class OrderIndex:
+    """
+    Secondary indexes over the orders table.
+    Keeps each user's orders and each status's orders as lists of (order_time, order_id) sorted
+    by time, so "my recent orders", "my pending orders" and time-range queries are a bisect
+    and a short slice instead of a scan of every order.
+    """
+    
+    def __init__(self):
+        self.by_user = {}  # user_id -> sorted (order_time, order_id)
+        self.by_status = {}  # status -> sorted (order_time, order_id)
+        self._user_locks = StripedLock()
+        self._status_lock = threading.Lock()
+        
+    def build(self, orders: Dict[str, Dict]):
+        """
+        Rebuild both indexes from an order_id -> order mapping.
+        """
+        by_user, by_status = {}, {}
+        for entry in sorted((order["order_time"] or "", order_id) for order_id, order in orders.items()):
+            order = orders[entry[1]]
+            by_user.setdefault(order["user_id"], []).append(entry)
+            by_status.setdefault(order["status"], []).append(entry)
+        self.by_user, self.by_status = by_user, by_status
+        
+    def add(self, order_id: str, order: Dict):
+        """
+        Index a new order.
+        """
+        entry = (order["order_time"] or "", order_id)
+        with self._user_locks(order["user_id"]):
+            insort(self.by_user.setdefault(order["user_id"], []), entry)
+        with self._status_lock:
+            insort(self.by_status.setdefault(order["status"], []), entry)
+            
+    def change_status(self, order_id: str, order: Dict, old_status: str):
+        """
+        Move an order whose status changed from old_status to order["status"].
+        """
+        entry = (order["order_time"] or "", order_id)
+        with self._status_lock:
+            self._discard(self.by_status, old_status, entry)
+            insort(self.by_status.setdefault(order["status"], []), entry)
+            
+    def remove(self, order_id: str, order: Dict):
+        """
+        Remove an order, given the fields it was indexed with.
+        """
+        entry = (order["order_time"] or "", order_id)
+        with self._user_locks(order["user_id"]):
+            self._discard(self.by_user, order["user_id"], entry)
+        with self._status_lock:
+            self._discard(self.by_status, order["status"], entry)
+            
+    def user_orders(self, user_id: str, start_time: str = None, end_time: str = None) -> Iterator[str]:
+        """
+        Iterate over a user's order IDs, newest first, optionally within [start_time, end_time].
+        """
+        with self._user_locks(user_id):
+            entries = self._range(self.by_user.get(user_id, []), start_time, end_time)
+        for entry in reversed(entries):
+            yield entry[1]
+            
+    def status_orders(self, status: str, start_time: str = None, end_time: str = None) -> Iterator[str]:
+        """
+        Iterate over the IDs of orders with a status, newest first, optionally within [start_time, end_time].
+        """
+        with self._status_lock:
+            entries = self._range(self.by_status.get(status, []), start_time, end_time)
+        for entry in reversed(entries):
+            yield entry[1]
+            
+    @staticmethod
+    def _range(entries: List[Tuple], start_time: str, end_time: str) -> List[Tuple]:
+        lo = bisect_left(entries, (start_time,)) if start_time else 0
+        # Times are "YYYY-MM-DD HH:MM:SS", so a bare date as end_time covers that whole day
+        hi = bisect_right(entries, (end_time + "\uffff",)) if end_time else len(entries)
+        return entries[lo:hi]
+        
+    @staticmethod
+    def _discard(index: Dict, key: str, entry: Tuple):
+        entries = index.get(key)
+        if entries is None:
+            return
+        i = bisect_left(entries, entry)
+        if i < len(entries) and entries[i] == entry:
+            del entries[i]
+            if not entries:
+                del index[key]
@@ -0,0 +1,232 @@
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+import numpy as np
+from .records import Codebook
+
+class QTable:
+    """
+    Dense NumPy Q-table over interned states and actions.
+    State and action strings get small integer IDs from Codebooks and index a float matrix
+    that grows by doubling. The best action and value of every state are cached and kept
+    current on each write, so choosing a response type is two array reads, and batches of
+    transitions are applied in one vectorised pass.
+    """
+    
+    def __init__(self, learning_rate: float = 0.1, discount_factor: float = 0.95, states: int = 64,
+                 actions: int = 16):
+        self.learning_rate = learning_rate
+        self.discount_factor = discount_factor
+        self.states = Codebook()
+        self.actions = Codebook()
+        self.values = np.zeros((states, actions))
+        self.known = np.zeros((states, actions), dtype=bool)  # (state, action) pairs that have been updated
+        self.best_action = np.full(states, -1, dtype=np.int64)  # -1 while a state has no known action
+        self.best_value = np.zeros(states)
+        self.base = None  # (values, known) when the table was last loaded or its delta last taken
+        self.version = 0  # Bumped on every write, so snapshot writers can skip unchanged tables
+        self._lock = threading.Lock()
+        
+    @classmethod
+    def from_arrays(cls, data: Dict, learning_rate: float = 0.1, discount_factor: float = 0.95,
+                    base: Tuple[np.ndarray, np.ndarray] = None) -> "QTable":
+        """
+        Build a table from exported arrays, e.g. views of a memory-mapped snapshot, without copying them.
+        """
+        table = cls(learning_rate, discount_factor, states=0, actions=0)
+        table.states = Codebook(data["states"])
+        table.actions = Codebook(data["actions"])
+        table.values, table.known = data["values"], data["known"]
+        table.best_action, table.best_value = data["best_action"], data["best_value"]
+        table.base = base
+        return table
+        
+    def state_id(self, state: str) -> int:
+        return self.states.encode(state)
+        
+    def action_id(self, action: str) -> int:
+        return self.actions.encode(action)
+        
+    def _reserve(self, states: int, actions: int):
+        rows, cols = self.values.shape
+        if states <= rows and actions <= cols:
+            return
+        new_rows, new_cols = max(rows, 1), max(cols, 1)
+        while new_rows < states:
+            new_rows *= 2
+        while new_cols < actions:
+            new_cols *= 2
+        values = np.zeros((new_rows, new_cols))
+        values[:rows, :cols] = self.values
+        known = np.zeros((new_rows, new_cols), dtype=bool)
+        known[:rows, :cols] = self.known
+        self.values, self.known = values, known
+        self.best_action = np.concatenate([self.best_action, np.full(new_rows - rows, -1, dtype=np.int64)])
+        self.best_value = np.concatenate([self.best_value, np.zeros(new_rows - rows)])
+        
+    def get(self, state: str, action: str) -> float:
+        """
+        Q-value of an action in a state, 0 if it has never been updated.
+        """
+        s, a = self.states.codes.get(state), self.actions.codes.get(action)
+        if s is None or a is None or s >= len(self.values) or a >= self.values.shape[1]:
+            return 0.0
+        return float(self.values[s, a])
+        
+    def best(self, state: str) -> Optional[str]:
+        """
+        Action with the highest Q-value in a state, or None if no action has been tried there.
+        """
+        s = self.states.codes.get(state)
+        if s is None or s >= len(self.best_action) or self.best_action[s] < 0:
+            return None
+        return self.actions.decode(int(self.best_action[s]))
+        
+    def row(self, state: str) -> Dict[str, float]:
+        """
+        Known action values of a state, as the nested dict Q-table used to store them.
+        """
+        s = self.states.codes.get(state)
+        if s is None or s >= len(self.values):
+            return {}
+        return {self.actions.decode(int(a)): float(self.values[s, a]) for a in np.flatnonzero(self.known[s])}
+        
+    def update(self, state: str, action: str, reward: float, next_state: str) -> float:
+        """
+        Apply one Q-learning step.
+        
+        Returns:
+            float: The new Q-value
+        """
+        s, a, n = self.state_id(state), self.action_id(action), self.state_id(next_state)
+        with self._lock:
+            self._reserve(max(s, n) + 1, a + 1)
+            current = self.values[s, a]
+            value = current + self.learning_rate * (reward + self.discount_factor * self.best_value[n] - current)
+            self.values[s, a] = value
+            self.known[s, a] = True
+            self.version += 1
+            if self.best_action[s] < 0 or value > self.best_value[s]:
+                self.best_action[s], self.best_value[s] = a, value
+            elif self.best_action[s] == a and value < current:
+                # The best action got worse, so another one may now be ahead
+                self._refresh(np.array([s]))
+        return float(value)
+        
+    def update_many(self, transitions: Iterable[Tuple[str, str, float, str]]) -> int:
+        """
+        Apply a batch of (state, action, reward, next_state) transitions in one vectorised pass.
+        Targets are computed against the table as it was before the batch. Transitions hitting the
+        same (state, action) pair are applied one after another in batch order, in closed form, so
+        a batch matches sequential updates whenever no next state's best value changes within it.
+        
+        Returns:
+            int: Number of transitions applied
+        """
+        transitions = list(transitions)
+        if not transitions:
+            return 0
+        s = np.fromiter((self.state_id(t[0]) for t in transitions), dtype=np.int64, count=len(transitions))
+        a = np.fromiter((self.action_id(t[1]) for t in transitions), dtype=np.int64, count=len(transitions))
+        r = np.fromiter((t[2] for t in transitions), dtype=float, count=len(transitions))
+        n = np.fromiter((self.state_id(t[3]) for t in transitions), dtype=np.int64, count=len(transitions))
+        return self.update_ids(s, a, r, n)
+        
+    def update_ids(self, s: np.ndarray, a: np.ndarray, r: np.ndarray, n: np.ndarray) -> int:
+        """
+        Apply a batch of transitions given as arrays of state IDs, action IDs, rewards and next state IDs.
+        See update_many for how repeated (state, action) pairs are handled.
+        
+        Returns:
+            int: Number of transitions applied
+        """
+        if not len(s):
+            return 0
+        with self._lock:
+            self._reserve(int(max(s.max(), n.max())) + 1, int(a.max()) + 1)
+            keep = 1.0 - self.learning_rate
+            targets = r + self.discount_factor * self.best_value[n]
+            # k steps towards targets t_1..t_k give Q_k = keep^k * Q_0 + sum_i lr * keep^(k-i) * t_i
+            pairs = s * self.values.shape[1] + a
+            order = np.argsort(pairs, kind="stable")
+            pairs = pairs[order]
+            starts = np.flatnonzero(np.concatenate(([True], pairs[1:] != pairs[:-1])))
+            counts = np.diff(np.append(starts, len(pairs)))
+            group = np.repeat(np.arange(len(starts)), counts)
+            later = counts[group] - 1 - (np.arange(len(pairs)) - starts[group])  # Steps after each one in its pair
+            pulled = np.bincount(group, weights=self.learning_rate * keep ** later * targets[order],
+                                 minlength=len(starts))
+            rows, cols = s[order][starts], a[order][starts]
+            self.values[rows, cols] = keep ** counts * self.values[rows, cols] + pulled
+            self.known[rows, cols] = True
+            self._refresh(np.unique(rows))
+            self.version += 1
+        return len(s)
+        
+    def merge(self, data: Dict) -> int:
+        """
+        Add the values of an exported delta into this table, matching states and actions by name.
+        
+        Returns:
+            int: Number of (state, action) pairs merged
+        """
+        rows, cols = np.nonzero(data["known"])
+        if not len(rows):
+            return 0
+        s = np.array([self.state_id(state) for state in data["states"]], dtype=np.int64)[rows]
+        a = np.array([self.action_id(action) for action in data["actions"]], dtype=np.int64)[cols]
+        with self._lock:
+            self._reserve(len(self.states.values), len(self.actions.values))
+            np.add.at(self.values, (s, a), data["values"][rows, cols])
+            self.known[s, a] = True
+            self._refresh(np.unique(s))
+            self.version += 1
+        return len(rows)
+        
+    def export(self) -> Dict:
+        """
+        Copy of the table's vocabularies and arrays, trimmed to the interned states and actions.
+        Taken under the write lock but only as a few array copies, so writers barely wait.
+        """
+        with self._lock:
+            return self._export()
+            
+    def take_delta(self) -> Dict:
+        """
+        Export what changed since the table was loaded or the last delta was taken, and start a
+        new delta from here. Unchanged pairs are left out of "known".
+        """
+        with self._lock:
+            data = self._export()
+            values, known = data["values"], data["known"]
+            delta, changed = values.copy(), known.copy()
+            if self.base is not None:
+                base_values, base_known = self.base
+                rows, cols = base_values.shape
+                delta[:rows, :cols] -= base_values
+                changed[:rows, :cols] &= ~base_known | (delta[:rows, :cols] != 0)
+            self.base = (values, known)
+            return {**data, "values": delta, "known": changed}
+            
+    def _export(self) -> Dict:
+        rows, cols = self.values.shape
+        states = self.states.values[:rows]
+        actions = self.actions.values[:cols]
+        s, a = len(states), len(actions)
+        return {
+            "states": list(states),
+            "actions": list(actions),
+            "values": self.values[:s, :a].copy(),
+            "known": self.known[:s, :a].copy(),
+            "best_action": self.best_action[:s].copy(),
+            "best_value": self.best_value[:s].copy()
+        }
+        
+    def _refresh(self, rows: np.ndarray):
+        masked = np.where(self.known[rows], self.values[rows], -np.inf)
+        best = masked.argmax(axis=1)
+        has_known = self.known[rows].any(axis=1)
+        self.best_action[rows] = np.where(has_known, best, -1)
+        self.best_value[rows] = np.where(has_known, masked[np.arange(len(rows)), best], 0.0)
+        
+    def __len__(self) -> int:
+        return len(self.states.values)
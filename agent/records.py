@@ -0,0 +1,174 @@
+import sys
+import threading
+from typing import Dict, List
+
+class Codebook:
+    """
+    Small-integer codes for a field with few distinct values, such as order statuses or hub locations.
+    """
+    
+    def __init__(self, values=()):
+        self._lock = threading.Lock()
+        self.codes = {}  # value -> code
+        self.values = []  # code -> value
+        for value in values:
+            self.encode(value)
+            
+    def encode(self, value) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            with self._lock:
+                code = self.codes.get(value)
+                if code is None:
+                    code = self.codes[value] = len(self.values)
+                    self.values.append(value)
+        return code
+        
+    def decode(self, code: int):
+        return self.values[code]
+        
+ORDER_STATUSES = Codebook(("Pending Payment", "Processing", "Shipped", "Delivered", "Cancelled"))
+PAYMENT_STATUSES = Codebook(("Unpaid", "Pending", "Paid", "Refunded"))
+LOGISTICS_STATUSES = Codebook(("Picked Up", "In Transit", "Arrived", "Out for Delivery", "Delivered"))
+LOCATIONS = Codebook()
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+    
+class Record:
+    """
+    Base of the compact record types.
+    Records keep their fields in __slots__ instead of a per-record dict, store repeated strings
+    interned or as Codebook codes, and read like the dicts they replace (record["status"],
+    record.get("tracking_number")). to_dict() turns them back into plain dicts for JSON.
+    """
+    __slots__ = ()
+    FIELDS = ()
+    
+    def to_dict(self) -> Dict:
+        return {field: getattr(self, field) for field in self.FIELDS}
+        
+    def get(self, field: str, default=None):
+        return getattr(self, field) if field in self.FIELDS else default
+        
+    def __getitem__(self, field: str):
+        if field not in self.FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+        
+    def __contains__(self, field: str) -> bool:
+        return field in self.FIELDS
+        
+    def keys(self):
+        return self.FIELDS
+        
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Record):
+            other = other.to_dict()
+        return self.to_dict() == other
+        
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+        
+class Order(Record):
+    __slots__ = ("user_id", "product", "quantity", "total_price", "_status", "tracking_number", "order_time",
+                 "_payment_status", "shipping_address", "contact_phone")
+    FIELDS = ("user_id", "product", "quantity", "total_price", "status", "tracking_number", "order_time",
+              "payment_status", "shipping_address", "contact_phone")
+              
+    def __init__(self, user_id: str, product: str, quantity: int, total_price: float, status: str,
+                 tracking_number: str, order_time: str, payment_status: str, shipping_address: str,
+                 contact_phone: str):
+        self.user_id = _intern(user_id)
+        self.product = _intern(product)
+        self.quantity = quantity
+        self.total_price = total_price
+        self.status = status
+        self.tracking_number = tracking_number
+        self.order_time = order_time
+        self.payment_status = payment_status
+        self.shipping_address = shipping_address
+        self.contact_phone = contact_phone
+        
+    @property
+    def status(self) -> str:
+        return ORDER_STATUSES.decode(self._status)
+        
+    @status.setter
+    def status(self, value: str):
+        self._status = ORDER_STATUSES.encode(value)
+        
+    @property
+    def payment_status(self) -> str:
+        return PAYMENT_STATUSES.decode(self._payment_status)
+        
+    @payment_status.setter
+    def payment_status(self, value: str):
+        self._payment_status = PAYMENT_STATUSES.encode(value)
+        
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Order":
+        return cls(*(data.get(field) for field in cls.FIELDS))
+        
+class CartLine(Record):
+    __slots__ = ("product", "quantity", "spec", "color")
+    FIELDS = __slots__
+    
+    def __init__(self, product: str, quantity: int, spec: str, color: str):
+        self.product = _intern(product)
+        self.quantity = quantity
+        self.spec = _intern(spec)
+        self.color = _intern(color)
+        
+    @classmethod
+    def from_dict(cls, data: Dict) -> "CartLine":
+        return cls(*(data.get(field) for field in cls.FIELDS))
+        
+class LogisticsEvent(Record):
+    __slots__ = ("time", "_status", "_location")
+    FIELDS = ("time", "status", "location")
+    
+    def __init__(self, time: str, status: str, location: str):
+        self.time = time
+        self._status = LOGISTICS_STATUSES.encode(status)
+        self._location = LOCATIONS.encode(location)
+        
+    @property
+    def status(self) -> str:
+        return LOGISTICS_STATUSES.decode(self._status)
+        
+    @property
+    def location(self) -> str:
+        return LOCATIONS.decode(self._location)
+        
+    @classmethod
+    def from_dict(cls, data: Dict) -> "LogisticsEvent":
+        return cls(*(data.get(field) for field in cls.FIELDS))
+        
+class Review(Record):
+    __slots__ = ("user", "rating", "content", "date")
+    FIELDS = __slots__
+    
+    def __init__(self, user: str, rating: int, content: str, date: str):
+        self.user = _intern(user)
+        self.rating = rating
+        self.content = content
+        self.date = _intern(date)
+        
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Review":
+        return cls(*(data.get(field) for field in cls.FIELDS))
+        
+def compact(rows: List, record_type) -> List[Record]:
+    """
+    Convert a list of dicts (or records) into records of the given type.
+    """
+    return [row if isinstance(row, record_type) else record_type.from_dict(row) for row in rows]
+    
+def to_json(value):
+    """
+    json.dumps default hook turning records into dicts.
+    """
+    if isinstance(value, Record):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,207 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from .qtable import QTable
+from .records import Codebook
+from .rl_optimizer import RLOptimizer
+from .snapshot import load_qtable, write_snapshot
+
+def transcript_transitions(rl: RLOptimizer, messages: List[Dict], feedback: str = None) -> List[Tuple]:
+    """
+    (state, action, reward, next_state) transitions of one conversation, as the live agent would
+    have learned them: each assistant reply is rewarded by the user message that follows it,
+    and the last one by the explicit feedback, if any.
+    """
+    transitions = []
+    state, pending = "initial_state", None  # pending: (state, action) of a reply waiting for its reward
+    for message in messages:
+        role, content = message.get("role"), message.get("content")
+        if role == "user":
+            next_state = rl.get_message_state(content)
+            if pending is not None:
+                transitions.append((*pending, rl.get_reward(content or ""), next_state))
+                pending = None
+            state = next_state
+        elif role == "assistant" and content:  # Tool-calling messages have no content
+            pending = (state, rl.get_action_features(content))
+    if pending is not None and feedback:
+        transitions.append((*pending, rl.get_reward(feedback), state))
+    return transitions
+    
+def iter_transcripts(path: str, start: int = 0, end: Optional[int] = None) -> Iterator[Dict]:
+    """
+    Stream conversation records from a JSONL log, optionally only the lines starting in [start, end).
+    Each line is {"messages": [...], "feedback": "..."} or a bare list of messages.
+    """
+    with open(path, "rb") as f:
+        if start > 0:
+            f.seek(start - 1)
+            f.readline()  # Finish the line the previous shard owns
+        while end is None or f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            if line.strip():
+                record = json.loads(line)
+                yield {"messages": record} if isinstance(record, list) else record
+                
+def _shards(paths: List[str], count: int) -> List[Tuple[str, int, int]]:
+    """
+    Split log files into about count byte ranges of similar size.
+    """
+    sizes = [(path, os.path.getsize(path)) for path in paths]
+    step = max(1, -(-sum(size for _, size in sizes) // count))
+    return [(path, start, min(start + step, size)) for path, size in sizes for start in range(0, size, step)]
+    
+def _train_shard(task: Dict) -> Dict:
+    """
+    Train a Q-table on one shard with experience replay and return its delta and visit counts.
+    Runs in a worker process.
+    """
+    rl = RLOptimizer(task["learning_rate"], task["discount_factor"])
+    if task["base_path"] and os.path.exists(task["base_path"]):
+        rl.load_snapshot(task["base_path"])
+    table = rl.q_table
+    # Logs repeat the same template replies and short messages, so extract each distinct text once
+    for extractor in ("get_message_state", "get_action_features", "get_reward"):
+        setattr(rl, extractor, lru_cache(maxsize=task["cache_size"])(getattr(rl, extractor)))
+        
+    s, a, r, n, transcripts = [], [], [], [], 0
+    path, start, end = task["shard"]
+    for record in iter_transcripts(path, start, end):
+        transcripts += 1
+        for state, action, reward, next_state in transcript_transitions(rl, record.get("messages", []),
+                                                                        record.get("feedback")):
+            s.append(table.state_id(state))
+            a.append(table.action_id(action))
+            r.append(reward)
+            n.append(table.state_id(next_state))
+    s, a, n = (np.array(ids, dtype=np.int64) for ids in (s, a, n))
+    r = np.array(r, dtype=float)
+    
+    # Replay the shard's transitions in shuffled minibatches, several times over
+    rng = np.random.default_rng(task["seed"])
+    for _ in range(task["epochs"]):
+        order = rng.permutation(len(s))
+        for i in range(0, len(order), task["batch_size"]):
+            batch = order[i:i + task["batch_size"]]
+            table.update_ids(s[batch], a[batch], r[batch], n[batch])
+            
+    delta = table.take_delta()
+    counts = np.zeros(delta["values"].shape)
+    np.add.at(counts, (s, a), 1)
+    return {"delta": delta, "counts": counts, "transcripts": transcripts, "transitions": len(s)}
+    
+class ReplayTrainer:
+    """
+    Offline Q-learning over conversation logs.
+    Log files are split into byte ranges, one per worker process. Each worker extracts the
+    transitions of its conversations with the live feature extractors, replays them for several
+    epochs in shuffled minibatches starting from the current snapshot, and returns what it
+    learned as a delta. The deltas are averaged per (state, action) pair, weighted by how often
+    each worker saw the pair, added to the snapshot and saved for the agent to load.
+    Extra workers only help with free CPUs to run them; benchmarks/replay.py measures 1, 2 and 4.
+    """
+    
+    def __init__(self, workers: int = None, epochs: int = 3, batch_size: int = 4096, seed: int = 0,
+                 learning_rate: float = 0.1, discount_factor: float = 0.95, cache_size: int = 65536):
+        """
+        Args:
+            workers (int, optional): Worker processes; defaults to the number of CPUs
+            epochs (int): Passes over each worker's transitions
+            batch_size (int): Transitions per vectorised update
+            seed (int): Seed of the replay shuffling
+            learning_rate (float): Q-learning rate
+            discount_factor (float): Discount of future rewards
+            cache_size (int): Distinct message texts whose features each worker remembers
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.epochs = epochs
+        self.batch_size = batch_size
+        self.seed = seed
+        self.learning_rate = learning_rate
+        self.discount_factor = discount_factor
+        self.cache_size = cache_size
+        self.reports = []
+        
+    def train(self, paths: List[str], snapshot_path: str) -> Dict:
+        """
+        Train on JSONL conversation logs and merge the result into a Q-table snapshot.
+        
+        Args:
+            paths (List[str]): Conversation log files
+            snapshot_path (str): Snapshot to start from, if it exists, and to write the result to
+            
+        Returns:
+            Dict: Conversations, transitions and replayed updates processed, seconds and transitions per second
+        """
+        start = time.perf_counter()
+        tasks = [{
+            "shard": shard,
+            "base_path": snapshot_path,
+            "epochs": self.epochs,
+            "batch_size": self.batch_size,
+            "seed": self.seed + i,
+            "learning_rate": self.learning_rate,
+            "discount_factor": self.discount_factor,
+            "cache_size": self.cache_size
+        } for i, shard in enumerate(_shards(paths, self.workers))]
+        
+        if self.workers == 1 or len(tasks) <= 1:
+            results = [_train_shard(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(tasks))) as executor:
+                results = list(executor.map(_train_shard, tasks))
+                
+        if os.path.exists(snapshot_path):
+            table = load_qtable(snapshot_path, self.learning_rate, self.discount_factor)
+        else:
+            table = QTable(self.learning_rate, self.discount_factor)
+        table.merge(self._average(results))
+        write_snapshot(table.export(), snapshot_path)
+        
+        seconds = time.perf_counter() - start
+        transitions = sum(result["transitions"] for result in results)
+        report = {
+            "path": snapshot_path,
+            "workers": min(self.workers, len(tasks)),
+            "transcripts": sum(result["transcripts"] for result in results),
+            "transitions": transitions,
+            "updates": transitions * self.epochs,
+            "seconds": round(seconds, 3),
+            "transitions_per_second": round(transitions / seconds) if seconds > 0 else transitions
+        }
+        self.reports.append(report)
+        return report
+        
+    @staticmethod
+    def _average(results: List[Dict]) -> Dict:
+        """
+        Visit-weighted mean of the workers' deltas, matched by state and action name.
+        """
+        states, actions = Codebook(), Codebook()
+        pairs = []
+        for result in results:
+            delta, counts = result["delta"], result["counts"]
+            rows, cols = np.nonzero(counts)
+            if not len(rows):
+                continue
+            s = np.array([states.encode(state) for state in delta["states"]], dtype=np.int64)[rows]
+            a = np.array([actions.encode(action) for action in delta["actions"]], dtype=np.int64)[cols]
+            pairs.append((s, a, delta["values"][rows, cols], counts[rows, cols]))
+        shape = (len(states.values), len(actions.values))
+        sums, weights = np.zeros(shape), np.zeros(shape)
+        for s, a, values, counts in pairs:
+            np.add.at(sums, (s, a), values * counts)
+            np.add.at(weights, (s, a), counts)
+        known = weights > 0
+        return {
+            "states": states.values,
+            "actions": actions.values,
+            "values": np.divide(sums, weights, out=np.zeros(shape), where=known),
+            "known": known
+        }
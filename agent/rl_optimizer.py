@@ -1,6 +1,30 @@
-import numpy as np
-from typing import List, Dict
-from collections import defaultdict
+import os
+from typing import Iterable, List, Dict, Optional, Tuple
+from .keywords import KeywordMatcher
+from .qtable import QTable
+from .snapshot import DeltaMerger, SnapshotWriter, load_qtable, write_snapshot
+
+# Query type features of user messages
+QUERY_TYPES = {
+    "price": ["price", "cost", "how much"],
+    "product": ["specs", "features", "details"],
+    "order": ["order", "tracking", "delivery"],
+    "complaint": ["problem", "issue", "wrong", "bad"]
+}
+
+# Response type features of agent responses
+RESPONSE_TYPES = {
+    "price_info": ["price"],
+    "order_info": ["order"],
+    "apology": ["sorry", "apologize"],
+    "question": ["?"]
+}
+
+# Feedback indicators
+FEEDBACK_WORDS = {
+    "positive": ["thanks", "thank you", "helpful", "good", "great", "perfect"],
+    "negative": ["not helpful", "bad", "wrong", "incorrect", "confused"]
+}
 
 class RLOptimizer:
     """
@@ -10,9 +34,13 @@ class RLOptimizer:
     def __init__(self, learning_rate=0.1, discount_factor=0.95):
         self.learning_rate = learning_rate  # Learning rate for Q-learning
         self.discount_factor = discount_factor  # Discount factor for future rewards
-        self.q_table = defaultdict(lambda: defaultdict(float))  # Q-table for storing state-action values
-        self.state_history = []  # Store conversation states
-        self.action_history = []  # Store taken actions
+        self.q_table = QTable(learning_rate, discount_factor)  # Q-table for storing state-action values
+        self.snapshot_writer = None  # Background writer started by start_snapshots
+        self._loaded_snapshot = None  # (path, mtime, inode) of the snapshot the Q-table was loaded from
+        # Keyword groups compiled once, so each text is scanned in a single pass
+        self.query_matcher = KeywordMatcher(QUERY_TYPES)
+        self.response_matcher = KeywordMatcher(RESPONSE_TYPES)
+        self.feedback_matcher = KeywordMatcher(FEEDBACK_WORDS)
         
     def get_state_features(self, conversation_history: List[Dict]) -> str:
         """
@@ -34,33 +62,33 @@ class RLOptimizer:
                 last_user_msg = msg["content"]
                 break
                 
-        # Simple state features (can be expanded)
-        features = []
+        return self.get_message_state(last_user_msg)
+        
+    def get_message_state(self, user_message: Optional[str]) -> str:
+        """
+        State representation of a user message, so callers can track the state as messages
+        are appended instead of rescanning the history.
+        
+        Args:
+            user_message: Latest user message
+            
+        Returns:
+            str: State representation
+        """
+        if not user_message:
+            return "general_query"
         
         # Message length features
-        if last_user_msg:
-            if len(last_user_msg) < 10:
-                features.append("short_query")
-            elif len(last_user_msg) < 30:
-                features.append("medium_query")
-            else:
-                features.append("long_query")
+        if len(user_message) < 10:
+            features = ["short_query"]
+        elif len(user_message) < 30:
+            features = ["medium_query"]
+        else:
+            features = ["long_query"]
                 
         # Query type features
-        query_types = {
-            "price": ["price", "cost", "how much"],
-            "product": ["specs", "features", "details"],
-            "order": ["order", "tracking", "delivery"],
-            "complaint": ["problem", "issue", "wrong", "bad"]
-        }
-        
-        if last_user_msg:
-            last_user_msg = last_user_msg.lower()
-            for qtype, keywords in query_types.items():
-                if any(keyword in last_user_msg for keyword in keywords):
-                    features.append(qtype)
-                    
-        return "_".join(features) if features else "general_query"
+        features += self.query_matcher.ordered(user_message.lower())
+        return "_".join(features)
     
     def get_action_features(self, response: str) -> str:
         """
@@ -72,26 +100,16 @@ class RLOptimizer:
         Returns:
             str: Action representation
         """
-        features = []
-        
         # Response length feature
         if len(response) < 50:
-            features.append("brief")
+            features = ["brief"]
         elif len(response) < 150:
-            features.append("moderate")
+            features = ["moderate"]
         else:
-            features.append("detailed")
+            features = ["detailed"]
             
         # Response type features
-        if "price" in response.lower():
-            features.append("price_info")
-        if "order" in response.lower():
-            features.append("order_info")
-        if "sorry" in response.lower() or "apologize" in response.lower():
-            features.append("apology")
-        if "?" in response:
-            features.append("question")
-            
+        features += self.response_matcher.ordered(response.lower())
         return "_".join(features)
     
     def get_reward(self, user_feedback: str) -> float:
@@ -104,22 +122,17 @@ class RLOptimizer:
         Returns:
             float: Reward value
         """
-        # Positive feedback indicators
-        positive_words = ["thanks", "thank you", "helpful", "good", "great", "perfect"]
-        # Negative feedback indicators
-        negative_words = ["not helpful", "bad", "wrong", "incorrect", "confused"]
-        
-        user_feedback = user_feedback.lower()
+        found = self.feedback_matcher.groups(user_feedback.lower())
         
         # Calculate reward
         reward = 0.0
         
         # Check for positive feedback
-        if any(word in user_feedback for word in positive_words):
+        if "positive" in found:
             reward += 1.0
             
         # Check for negative feedback
-        if any(word in user_feedback for word in negative_words):
+        if "negative" in found:
             reward -= 1.0
             
         # Length-based penalties to encourage concise responses
@@ -138,20 +151,101 @@ class RLOptimizer:
             reward: Received reward
             next_state: Resulting state
         """
-        # Get current Q-value
-        current_q = self.q_table[state][action]
+        self.q_table.update(state, action, reward, next_state)
         
-        # Get maximum Q-value for next state
-        next_max_q = max(self.q_table[next_state].values()) if self.q_table[next_state] else 0
+    def update_many(self, transitions: Iterable[Tuple[str, str, float, str]]) -> int:
+        """
+        Update Q-values from a batch of transitions in one vectorised pass.
         
-        # Q-learning update formula
-        new_q = current_q + self.learning_rate * (
-            reward + self.discount_factor * next_max_q - current_q
-        )
+        Args:
+            transitions: (state, action, reward, next_state) tuples
         
-        # Update Q-table
-        self.q_table[state][action] = new_q
+        Returns:
+            int: Number of transitions applied
+        """
+        return self.q_table.update_many(transitions)
     
+    def save_snapshot(self, path: str):
+        """
+        Save the Q-table and its state/action vocabularies to a binary snapshot.
+        
+        Args:
+            path: Snapshot file
+        """
+        write_snapshot(self.q_table.export(), path)
+        
+    def load_snapshot(self, path: str):
+        """
+        Replace the Q-table with a memory-mapped snapshot.
+        A running snapshot writer saves the loaded table from now on.
+        
+        Args:
+            path: Snapshot file written by save_snapshot, a SnapshotWriter or a DeltaMerger
+        """
+        stat = os.stat(path)
+        self.q_table = load_qtable(path, self.learning_rate, self.discount_factor)
+        self._loaded_snapshot = (path, stat.st_mtime_ns, stat.st_ino)
+        if self.snapshot_writer is not None:
+            self.snapshot_writer.retarget(self.q_table)
+            
+    def reload_snapshot(self, path: str) -> bool:
+        """
+        Swap in the merged snapshot of all workers if it changed since it was last loaded.
+        Updates this worker made since its last delta are carried over into the new table, so
+        they still reach the shared snapshot with the next delta.
+        
+        Args:
+            path: Snapshot file written by a DeltaMerger
+            
+        Returns:
+            bool: Whether a new snapshot was loaded
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:  # Nothing merged yet
+            return False
+        if self._loaded_snapshot == (path, stat.st_mtime_ns, stat.st_ino):
+            return False
+        table = load_qtable(path, self.learning_rate, self.discount_factor)
+        old_table, self.q_table = self.q_table, table
+        if self.snapshot_writer is not None:
+            self.snapshot_writer.retarget(table, carry_over=True)
+        else:
+            table.merge(old_table.take_delta())
+        self._loaded_snapshot = (path, stat.st_mtime_ns, stat.st_ino)
+        return True
+        
+    def start_snapshots(self, path: str, interval: float = 60.0, worker_id: str = None) -> SnapshotWriter:
+        """
+        Save the Q-table in the background every interval seconds.
+        
+        Args:
+            path: Snapshot file
+            interval: Seconds between saves
+            worker_id: Save per-worker deltas next to the snapshot instead, and reload the snapshot
+                after each save once a DeltaMerger (see start_merger) has merged them
+            
+        Returns:
+            SnapshotWriter: The running writer; stop() it to save a last time
+        """
+        reload = (lambda: self.reload_snapshot(path)) if worker_id is not None else None
+        self.snapshot_writer = SnapshotWriter(self.q_table, path, interval, worker_id, reload).start()
+        return self.snapshot_writer
+        
+    def start_merger(self, path: str, interval: float = 60.0) -> DeltaMerger:
+        """
+        Merge the delta files of all workers into the shared snapshot every interval seconds.
+        Run it in one process per snapshot, e.g. the parent of the worker processes.
+        
+        Args:
+            path: Snapshot file the workers' writers were started with
+            interval: Seconds between merges
+            
+        Returns:
+            DeltaMerger: The running merger; stop() it to merge a last time
+        """
+        return DeltaMerger(path, interval, self.learning_rate, self.discount_factor).start()
+        
     def get_best_response_type(self, state: str) -> str:
         """
         Get the best response type for current state based on Q-values.
@@ -162,7 +256,8 @@ class RLOptimizer:
         Returns:
             str: Best response type
         """
-        if not self.q_table[state]:
+        best = self.q_table.best(state)
+        if best is None:
             return "moderate_general"  # Default response type
             
-        return max(self.q_table[state].items(), key=lambda x: x[1])[0] 
\ No newline at end of file
+        return best 
\ No newline at end of file
@@ -0,0 +1,211 @@
+import json
+import re
+import threading
+from concurrent.futures import Executor, Future
+from typing import Callable, Dict, FrozenSet, List, Optional
+from .session import Session
+
+ORDER_ID_PATTERN = re.compile(r"\bORDER\d{8,}\b", re.IGNORECASE)
+TRACKING_NUMBER_PATTERN = re.compile(r"\bSF\d{8,}\b", re.IGNORECASE)
+LOGISTICS_KEYWORDS = ("tracking", "delivery", "where", "shipping", "arrive", "logistics")
+
+def _call_key(name: str, args: Dict) -> str:
+    return name + json.dumps(args, sort_keys=True, ensure_ascii=False)
+    
+class _Cursors:
+    """
+    Stand-in session of a speculative lookup, holding the cursors it moved until the model claims it.
+    """
+    __slots__ = ("cursors",)
+    
+    def __init__(self):
+        self.cursors = {}
+        
+class Speculation:
+    """
+    Tool lookups started for one turn before the model asked for them.
+    Lookups of session tools run against a stand-in session, so a lookup the model never asks
+    for leaves the conversation's cursors alone; a claimed one moves them as the real call would.
+    """
+    
+    def __init__(self, router: "IntentRouter", executor: Executor, call_tool: Callable,
+                 session: Session = None, session_tools: FrozenSet[str] = frozenset()):
+        self._router = router
+        self._executor = executor
+        self._call_tool = call_tool
+        self._session = session
+        self._session_tools = session_tools
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> (name, args, future, stand-in session or None)
+        self._claimed = set()
+        self._finished = False
+        
+    def start(self, name: str, args: Dict) -> Optional[Future]:
+        """
+        Start a lookup in the tool executor, unless the turn is already over.
+        """
+        key = _call_key(name, args)
+        with self._lock:
+            if self._finished:
+                return None
+            if key in self._calls:
+                return self._calls[key][2]
+            scratch = _Cursors() if self._session is not None and name in self._session_tools else None
+            future = self._executor.submit(self._call_tool, name, args, scratch)
+            self._calls[key] = (name, args, future, scratch)
+        self._router.record("predicted")
+        return future
+        
+    def chain_logistics(self, order_future: Future):
+        """
+        Fetch the parcel of an order as soon as the order lookup returns its tracking number.
+        """
+        def start_logistics(future: Future):
+            if future.exception() is None and not future.cancelled():
+                tracking_number = (future.result() or {}).get("tracking_number")
+                if tracking_number:
+                    try:
+                        self.start("get_logistics_info", {"tracking_number": tracking_number})
+                    except RuntimeError:  # Executor already shut down
+                        pass
+                        
+        order_future.add_done_callback(start_logistics)
+        
+    def claim(self, name: str, args: Dict) -> Optional[Future]:
+        """
+        Take the speculative result of a tool call requested by the model, if there is one.
+        """
+        key = _call_key(name, args)
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None or key in self._claimed:
+                return None
+            self._claimed.add(key)
+        self._router.record("hits")
+        future, scratch = call[2], call[3]
+        if scratch is None:
+            return future
+            
+        # Hand over the lookup's cursors before anyone waiting on the result sees it
+        claimed = Future()
+        def adopt(done: Future):
+            if done.cancelled():
+                claimed.cancel()
+            elif done.exception() is not None:
+                claimed.set_exception(done.exception())
+            else:
+                self._session.cursors.update(scratch.cursors)
+                claimed.set_result(done.result())
+                
+        future.add_done_callback(adopt)
+        return claimed
+        
+    def tool_calls(self) -> List[Dict]:
+        """
+        Describe the started lookups as tool calls, so their results can be shown to the model.
+        """
+        with self._lock:
+            calls = list(self._calls.values())
+        return [
+            {
+                "id": f"speculative_{i}",
+                "type": "function",
+                "function": {"name": name, "arguments": json.dumps(args, ensure_ascii=False)}
+            }
+            for i, (name, args, _, _) in enumerate(calls)
+        ]
+        
+    def finish(self):
+        """
+        Record lookups the model never used.
+        """
+        with self._lock:
+            self._finished = True
+            wasted = len(self._calls) - len(self._claimed)
+        if wasted:
+            self._router.record("wasted", wasted)
+            
+class IntentRouter:
+    """
+    Local pre-router that recognises order IDs and tracking numbers in the user's message.
+    Likely tool lookups are started in parallel with the first completion call ("parallel"),
+    or their results are put in front of the model before the first call ("inject"), taking
+    the database lookup and often a model round-trip off the critical path.
+    """
+    
+    def __init__(self, mode: str = "parallel", max_predictions: int = 4):
+        """
+        Args:
+            mode (str): "parallel", "inject", or "off"
+            max_predictions (int): Maximum number of lookups started per turn
+        """
+        if mode not in ("parallel", "inject", "off"):
+            raise ValueError(f"Unknown speculation mode: {mode}")
+        self.mode = mode
+        self.max_predictions = max_predictions
+        self._lock = threading.Lock()
+        self.counters = {"turns": 0, "predicted": 0, "hits": 0, "wasted": 0}
+        
+    def predict(self, user_input: str, state: str) -> List[Dict]:
+        """
+        Predict the lookups the model will ask for.
+        
+        Args:
+            user_input (str): User's question
+            state (str): RL state features of the turn
+            
+        Returns:
+            List[Dict]: Predicted calls with "name", "args" and whether to "chain" the parcel lookup
+        """
+        predictions = []
+        wants_parcel = "order" in state and any(keyword in user_input.lower() for keyword in LOGISTICS_KEYWORDS)
+        for order_id in ORDER_ID_PATTERN.findall(user_input):
+            predictions.append({"name": "get_order_info", "args": {"order_id": order_id.upper()},
+                                "chain": wants_parcel})
+        for tracking_number in TRACKING_NUMBER_PATTERN.findall(user_input):
+            predictions.append({"name": "get_logistics_info", "args": {"tracking_number": tracking_number.upper()},
+                                "chain": False})
+        return predictions[:self.max_predictions]
+        
+    def speculate(self, user_input: str, state: str, executor: Executor, call_tool: Callable,
+                  session: Session = None, session_tools: FrozenSet[str] = frozenset()) -> Optional[Speculation]:
+        """
+        Start the predicted lookups of a turn.
+        
+        Args:
+            user_input (str): User's question
+            state (str): RL state features of the turn
+            executor (Executor): Executor running the lookups
+            call_tool (Callable): Function taking a tool name, its arguments and the session
+            session (Session, optional): Conversation of the turn
+            session_tools (FrozenSet[str]): Tools that keep per-session cursors
+            
+        Returns:
+            Optional[Speculation]: The started lookups, or None if nothing was predicted
+        """
+        if self.mode == "off":
+            return None
+        predictions = self.predict(user_input, state)
+        if not predictions:
+            return None
+            
+        self.record("turns")
+        speculation = Speculation(self, executor, call_tool, session, session_tools)
+        for prediction in predictions:
+            future = speculation.start(prediction["name"], prediction["args"])
+            if prediction["chain"]:
+                speculation.chain_logistics(future)
+        return speculation
+        
+    def record(self, counter: str, amount: int = 1):
+        with self._lock:
+            self.counters[counter] += amount
+            
+    def stats(self) -> Dict:
+        """
+        Get speculation counters and the share of speculative lookups the model used.
+        """
+        with self._lock:
+            stats = dict(self.counters)
+        stats["hit_rate"] = stats["hits"] / stats["predicted"] if stats["predicted"] else 0.0
+        return stats
@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Optional
+from .history import ConversationWindow
+
+DEFAULT_SESSION_ID = "default"
+
+class Session:
+    """
+    Conversation state of a single customer: message history and RL trajectory.
+    """
+    
+    def __init__(self, session_id: str, max_history: int = 50, max_trajectory: int = 50,
+                 token_budget: int = 1500, summary_budget: int = 200):
+        """
+        Args:
+            session_id (str): Session or user ID
+            max_history (int): Maximum number of messages kept verbatim in the conversation history
+            max_trajectory (int): Maximum number of state-action pairs kept for RL updates
+            token_budget (int): Maximum number of tokens of the verbatim history
+            summary_budget (int): Maximum number of tokens of the rolling summary of older turns
+        """
+        self.session_id = session_id
+        self.window = ConversationWindow(token_budget=token_budget, max_messages=max_history,
+                                         summary_budget=summary_budget)
+        self.conversation_history = self.window.messages  # Stores the conversation context
+        self.state_history = deque(maxlen=max_trajectory)  # Store conversation states
+        self.action_history = deque(maxlen=max_trajectory)  # Store taken actions
+        self.rl_state = "initial_state"  # RL state of the latest user message
+        self.cursors = {}  # (tool, key) -> position of the last read, for tools answering with deltas
+        self.last_access = time.monotonic()
+        
+    def append(self, message: Dict):
+        """
+        Add a message to the conversation history, summarising turns that exceed the budget.
+        """
+        self.window.append(message)
+            
+class SessionStore:
+    """
+    Bounded store of conversation sessions keyed by session/user ID.
+    Least recently used sessions are evicted once the store is full, and sessions idle
+    for longer than the TTL are evicted on access, so memory stays flat over time.
+    """
+    
+    def __init__(self, max_sessions: int = 10000, ttl: float = 1800.0,
+                 max_history: int = 50, max_trajectory: int = 50,
+                 token_budget: int = 1500, summary_budget: int = 200):
+        """
+        Args:
+            max_sessions (int): Maximum number of sessions kept in memory
+            ttl (float): Idle time in seconds after which a session expires
+            max_history (int): Maximum number of messages kept verbatim per session
+            max_trajectory (int): Maximum number of state-action pairs kept per session
+            token_budget (int): Maximum number of tokens of the verbatim history per session
+            summary_budget (int): Maximum number of tokens of the rolling summary per session
+        """
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_history = max_history
+        self.max_trajectory = max_trajectory
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self._sessions = OrderedDict()  # Ordered from least to most recently used
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.lru_evictions = 0
+        self.ttl_evictions = 0
+        
+    def get(self, session_id: str) -> Session:
+        """
+        Get a session, creating it if it does not exist or has expired.
+        
+        Args:
+            session_id (str): Session or user ID
+            
+        Returns:
+            Session: The live session
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self.hits += 1
+                self._sessions.move_to_end(session_id)
+            else:
+                self.misses += 1
+                session = Session(session_id, self.max_history, self.max_trajectory,
+                                  self.token_budget, self.summary_budget)
+                self._sessions[session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.lru_evictions += 1
+            session.last_access = now
+            return session
+            
+    def peek(self, session_id: str) -> Optional[Session]:
+        """
+        Get a session without creating it or refreshing its position.
+        """
+        with self._lock:
+            return self._sessions.get(session_id)
+            
+    def remove(self, session_id: str) -> bool:
+        """
+        Remove a session, returning whether it existed.
+        """
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+            
+    def evict_expired(self) -> int:
+        """
+        Evict all sessions idle for longer than the TTL.
+        
+        Returns:
+            int: Number of evicted sessions
+        """
+        with self._lock:
+            return self._evict_expired(time.monotonic())
+            
+    def _evict_expired(self, now: float) -> int:
+        # Sessions are ordered by last access, so expired ones are always at the front
+        evicted = 0
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_access <= self.ttl:
+                break
+            self._sessions.popitem(last=False)
+            evicted += 1
+        self.ttl_evictions += evicted
+        return evicted
+        
+    def stats(self) -> Dict:
+        """
+        Get session counters.
+        """
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "hits": self.hits,
+                "misses": self.misses,
+                "lru_evictions": self.lru_evictions,
+                "ttl_evictions": self.ttl_evictions
+            }
+            
+    def __len__(self) -> int:
+        return len(self._sessions)
+        
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
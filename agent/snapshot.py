@@ -0,0 +1,247 @@
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+import numpy as np
+from .qtable import QTable
+
+MAGIC = b"QTBL"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sIIIQ")  # magic, format version, states, actions, vocabulary bytes
+DATA_OFFSET = 64  # Arrays start here, 8-byte aligned
+
+def _layout(states: int, actions: int) -> Dict[str, tuple]:
+    """
+    Offset, dtype and shape of every array in a snapshot, in file order.
+    """
+    layout, offset = {}, DATA_OFFSET
+    for name, dtype, shape in (("values", np.float64, (states, actions)), ("best_value", np.float64, (states,)),
+                               ("best_action", np.int64, (states,)), ("known", np.bool_, (states, actions))):
+        layout[name] = (offset, dtype, shape)
+        offset += int(np.prod(shape)) * np.dtype(dtype).itemsize
+    layout["vocabulary"] = (offset, None, None)
+    return layout
+    
+def write_snapshot(data: Dict, path: str):
+    """
+    Write exported Q-table arrays and vocabularies to a binary snapshot.
+    The file is written next to its destination and renamed over it, so readers never see a partial snapshot.
+    """
+    states, actions = len(data["states"]), len(data["actions"])
+    vocabulary = json.dumps({"states": data["states"], "actions": data["actions"]}, ensure_ascii=False)
+    vocabulary = vocabulary.encode("utf-8")
+    layout = _layout(states, actions)
+    tmp_path = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, states, actions, len(vocabulary)).ljust(DATA_OFFSET, b"\0"))
+        for name in ("values", "best_value", "best_action", "known"):
+            f.write(np.ascontiguousarray(data[name], dtype=layout[name][1]).tobytes())
+        f.write(vocabulary)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    
+def read_snapshot(path: str, access: int = mmap.ACCESS_READ) -> Dict:
+    """
+    Map a snapshot into memory and return its vocabularies and arrays as views of the mapping.
+    With mmap.ACCESS_READ the arrays are read-only and share the page cache with every other
+    process mapping the file; with mmap.ACCESS_COPY they are writable, and only the pages
+    written to are copied into the process.
+    """
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=access)
+    magic, version, states, actions, vocabulary_size = HEADER.unpack_from(mapped)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f"{path} is not a Q-table snapshot of format version {FORMAT_VERSION}")
+    layout = _layout(states, actions)
+    data = {}
+    for name in ("values", "best_value", "best_action", "known"):
+        offset, dtype, shape = layout[name]
+        data[name] = np.frombuffer(mapped, dtype=dtype, count=int(np.prod(shape)), offset=offset).reshape(shape)
+    offset = layout["vocabulary"][0]
+    data.update(json.loads(mapped[offset:offset + vocabulary_size].decode("utf-8")))
+    return data
+    
+def load_qtable(path: str, learning_rate: float = 0.1, discount_factor: float = 0.95) -> QTable:
+    """
+    Load a Q-table from a snapshot without reading its arrays up front.
+    The table writes to a copy-on-write mapping, and keeps a read-only mapping of the same
+    file as the base its deltas are taken against.
+    """
+    data = read_snapshot(path, mmap.ACCESS_COPY)
+    base = read_snapshot(path)
+    return QTable.from_arrays(data, learning_rate, discount_factor, base=(base["values"], base["known"]))
+    
+def merge_deltas(path: str, delta_paths: Iterable[str], learning_rate: float = 0.1,
+                 discount_factor: float = 0.95) -> int:
+    """
+    Add worker deltas into the snapshot at path (created if missing) and delete the merged delta files.
+    
+    Returns:
+        int: Number of delta files merged
+    """
+    delta_paths = sorted(delta_paths)
+    if os.path.exists(path):
+        table = QTable.from_arrays(read_snapshot(path, mmap.ACCESS_COPY), learning_rate, discount_factor)
+    else:
+        table = QTable(learning_rate, discount_factor)
+    for delta_path in delta_paths:
+        table.merge(read_snapshot(delta_path))
+    write_snapshot(table.export(), path)
+    for delta_path in delta_paths:
+        os.remove(delta_path)
+    return len(delta_paths)
+    
+def delta_paths(path: str) -> List[str]:
+    """
+    Delta files written by SnapshotWriters of every worker for the snapshot at path.
+    """
+    return glob.glob(glob.escape(path) + ".*.delta")
+    
+class SnapshotWriter:
+    """
+    Background thread saving a Q-table periodically.
+    Each save copies the arrays under the table's lock and does the file I/O outside it, so
+    updates are only held up for the copy. With a worker_id, the writer saves what changed
+    since its last save to a timestamped delta file next to the snapshot instead, for a
+    DeltaMerger to fold into the shared snapshot, and then calls reload so the worker can pick
+    up the merged snapshot.
+    """
+    
+    def __init__(self, table: QTable, path: str, interval: float = 60.0, worker_id: Optional[str] = None,
+                 reload: Callable[[], object] = None):
+        """
+        Args:
+            table (QTable): Table to save
+            path (str): Snapshot file
+            interval (float): Seconds between saves; unchanged tables are not saved
+            worker_id (str, optional): Write per-worker deltas instead of the full snapshot
+            reload (Callable, optional): Called after each periodic save, e.g. to load the merged snapshot
+        """
+        self.table = table
+        self.path = path
+        self.interval = interval
+        self.worker_id = worker_id
+        self.reload = reload
+        self.saves = 0
+        self._saved_version = None  # Nothing saved yet, so the first save writes whatever the table holds
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="qtable-snapshot", daemon=True)
+        
+    def start(self) -> "SnapshotWriter":
+        self._thread.start()
+        return self
+        
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.save()
+            if self.reload is not None:
+                self.reload()
+                
+    def save(self) -> bool:
+        """
+        Save the table now if it changed since the last save.
+        """
+        with self._lock:
+            version = self.table.version
+            if version == self._saved_version:
+                return False
+            if self.worker_id is None:
+                write_snapshot(self.table.export(), self.path)
+            else:
+                delta = self.table.take_delta()
+                if not delta["known"].any():
+                    self._saved_version = version
+                    return False
+                write_snapshot(delta, f"{self.path}.{self.worker_id}.{time.time_ns()}.delta")
+            self._saved_version = version
+            self.saves += 1
+            return True
+            
+    def retarget(self, table: QTable, carry_over: bool = False):
+        """
+        Save another table from now on, e.g. after the owner loaded a snapshot.
+        
+        Args:
+            table (QTable): Table to save
+            carry_over (bool): Merge what the old table changed since its last delta into the new one,
+                so no update is lost when a worker swaps in the merged snapshot
+        """
+        with self._lock:
+            if carry_over:
+                table.merge(self.table.take_delta())
+            self.table = table
+            self._saved_version = None
+            
+    def stop(self):
+        """
+        Stop the thread and save what changed since the last save.
+        """
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.save()
+        
+class DeltaMerger:
+    """
+    Background thread folding the delta files of all workers into the shared snapshot.
+    Run one merger per snapshot, e.g. in the parent process of the workers; the workers'
+    SnapshotWriters then reload the merged snapshot, so their tables converge.
+    """
+    
+    def __init__(self, path: str, interval: float = 60.0, learning_rate: float = 0.1,
+                 discount_factor: float = 0.95):
+        """
+        Args:
+            path (str): Snapshot file the workers write deltas for
+            interval (float): Seconds between merges
+            learning_rate (float): Q-learning rate of the merged table
+            discount_factor (float): Discount of future rewards of the merged table
+        """
+        self.path = path
+        self.interval = interval
+        self.learning_rate = learning_rate
+        self.discount_factor = discount_factor
+        self.merges = 0
+        self.deltas_merged = 0
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="qtable-merge", daemon=True)
+        
+    def start(self) -> "DeltaMerger":
+        self._thread.start()
+        return self
+        
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.merge()
+            
+    def merge(self) -> int:
+        """
+        Merge the deltas written so far now.
+        
+        Returns:
+            int: Number of delta files merged
+        """
+        with self._lock:
+            paths = delta_paths(self.path)
+            if not paths:
+                return 0
+            merged = merge_deltas(self.path, paths, self.learning_rate, self.discount_factor)
+            self.merges += 1
+            self.deltas_merged += merged
+            return merged
+            
+    def stop(self):
+        """
+        Stop the thread and merge the deltas left.
+        """
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.merge()
@@ -0,0 +1,543 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from .columnar import SORT_KEYS
+from .concurrency import OrderIdGenerator
+from .coupons import CouponEngine, cart_totals
+from .text_index import TextIndex
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    name TEXT PRIMARY KEY,
+    price REAL NOT NULL,
+    stock INTEGER,
+    description TEXT,
+    category TEXT,
+    rating REAL,
+    review_count INTEGER,
+    brand TEXT,
+    specs TEXT,
+    colors TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_products_price ON products (price, name);
+CREATE INDEX IF NOT EXISTS idx_products_category ON products (category, price, name);
+CREATE INDEX IF NOT EXISTS idx_products_brand ON products (brand, price, name);
+
+CREATE TABLE IF NOT EXISTS reviews (
+    product TEXT NOT NULL,
+    user TEXT,
+    rating INTEGER,
+    content TEXT,
+    date TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_reviews_product ON reviews (product);
+
+CREATE TABLE IF NOT EXISTS orders (
+    order_id TEXT PRIMARY KEY,
+    user_id TEXT,
+    product TEXT,
+    quantity INTEGER,
+    total_price REAL,
+    status TEXT,
+    tracking_number TEXT,
+    order_time TEXT,
+    payment_status TEXT,
+    shipping_address TEXT,
+    contact_phone TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_orders_user ON orders (user_id, order_time);
+CREATE INDEX IF NOT EXISTS idx_orders_status ON orders (status, order_time);
+
+CREATE TABLE IF NOT EXISTS logistics (
+    tracking_number TEXT NOT NULL,
+    time TEXT,
+    status TEXT,
+    location TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_logistics_tracking ON logistics (tracking_number, time);
+
+CREATE TABLE IF NOT EXISTS cart_items (
+    user_id TEXT NOT NULL,
+    product TEXT,
+    quantity INTEGER,
+    spec TEXT,
+    color TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_cart_user ON cart_items (user_id);
+
+CREATE TABLE IF NOT EXISTS coupons (
+    user_id TEXT NOT NULL,
+    code TEXT,
+    type TEXT,
+    amount REAL,
+    condition TEXT,
+    valid_until TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_coupons_user ON coupons (user_id);
+
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id INTEGER PRIMARY KEY,
+    host TEXT,
+    pid INTEGER,
+    next_second INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# Statements are kept as constants so each connection's statement cache reuses them prepared
+SELECT_PRODUCT = ("SELECT name, price, stock, description, category, rating, review_count, brand, specs, colors "
+                  "FROM products WHERE name = ?")
+SELECT_REVIEWS = "SELECT user, rating, content, date FROM reviews WHERE product = ? ORDER BY rowid"
+SELECT_ORDER = ("SELECT user_id, product, quantity, total_price, status, tracking_number, order_time, "
+                "payment_status, shipping_address, contact_phone FROM orders WHERE order_id = ?")
+SELECT_ORDERS = ("SELECT order_id, user_id, product, quantity, total_price, status, tracking_number, order_time, "
+                 "payment_status, shipping_address, contact_phone FROM orders")
+UPDATE_ORDER_STATUS = "UPDATE orders SET status = ?, tracking_number = COALESCE(?, tracking_number) WHERE order_id = ?"
+SELECT_LOGISTICS = ("SELECT time, status, location FROM logistics WHERE tracking_number = ? AND time >= ? AND time <= ? "
+                    "ORDER BY time, rowid")
+SELECT_LATEST_LOGISTICS = ("SELECT time, status, location FROM logistics WHERE tracking_number = ? "
+                           "ORDER BY time DESC, rowid DESC LIMIT 1")
+SELECT_LOGISTICS_UPDATES = ("SELECT rowid, time, status, location FROM logistics WHERE tracking_number = ? AND rowid > ? "
+                            "ORDER BY time, rowid")
+SELECT_CART = "SELECT product, quantity, spec, color FROM cart_items WHERE user_id = ? ORDER BY rowid"
+# LEFT JOIN: a line whose product was removed still counts its items, at price 0 like an in-memory Cart
+SELECT_CART_LINES = ("SELECT c.quantity, COALESCE(p.price, 0), p.brand, p.category FROM cart_items c "
+                     "LEFT JOIN products p ON p.name = c.product WHERE c.user_id = ?")
+SELECT_CART_USERS = "SELECT DISTINCT user_id FROM cart_items"
+SELECT_COUPONS = "SELECT code, type, amount, condition, valid_until FROM coupons WHERE user_id = ? ORDER BY rowid"
+UPSERT_PRODUCT = ("INSERT OR REPLACE INTO products (name, price, stock, description, category, rating, "
+                  "review_count, brand, specs, colors) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+DELETE_PRODUCT = "DELETE FROM products WHERE name = ?"
+DELETE_REVIEWS = "DELETE FROM reviews WHERE product = ?"
+INSERT_REVIEW = "INSERT INTO reviews (product, user, rating, content, date) VALUES (?, ?, ?, ?, ?)"
+INSERT_ORDER = ("INSERT INTO orders (order_id, user_id, product, quantity, total_price, status, "
+                "tracking_number, order_time, payment_status, shipping_address, contact_phone) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+# Only imports overwrite orders; create_order uses INSERT_ORDER, so a duplicate ID fails instead of replacing
+UPSERT_ORDER = ("INSERT OR REPLACE INTO orders (order_id, user_id, product, quantity, total_price, status, "
+                "tracking_number, order_time, payment_status, shipping_address, contact_phone) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+INSERT_LOGISTICS = "INSERT INTO logistics (tracking_number, time, status, location) VALUES (?, ?, ?, ?)"
+INSERT_CART_ITEM = "INSERT INTO cart_items (user_id, product, quantity, spec, color) VALUES (?, ?, ?, ?, ?)"
+MERGE_CART_ITEM = ("UPDATE cart_items SET quantity = quantity + ? "
+                   "WHERE user_id = ? AND product = ? AND spec IS ? AND color IS ?")
+REMOVE_CART_UNITS = ("UPDATE cart_items SET quantity = quantity - ? "
+                     "WHERE user_id = ? AND product = ? AND spec IS ? AND color IS ?")
+DELETE_CART_ITEM = ("DELETE FROM cart_items WHERE user_id = ? AND product = ? AND spec IS ? AND color IS ? "
+                    "AND (quantity <= 0 OR ?)")
+SELECT_WORKERS = "SELECT worker_id, host, pid, next_second FROM workers"
+CLAIM_WORKER = ("INSERT INTO workers (worker_id, host, pid, next_second) VALUES (?, ?, ?, 0) "
+                "ON CONFLICT (worker_id) DO UPDATE SET host = excluded.host, pid = excluded.pid")
+RELEASE_WORKER = ("UPDATE workers SET host = NULL, pid = NULL, next_second = MAX(next_second, ?) "
+                  "WHERE worker_id = ? AND host = ? AND pid = ?")
+INSERT_COUPON = ("INSERT INTO coupons (user_id, code, type, amount, condition, valid_until) "
+                 "VALUES (?, ?, ?, ?, ?, ?)")
+                 
+PRODUCT_COLUMNS = ("price", "stock", "description", "category", "rating", "review_count", "brand", "specs", "colors")
+ORDER_COLUMNS = ("user_id", "product", "quantity", "total_price", "status", "tracking_number", "order_time",
+                 "payment_status", "shipping_address", "contact_phone")
+WORKER_IDS = 100  # Worker numbers that fit the two digits order IDs reserve for them
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # Alive, but owned by another user
+        return True
+    return True
+    
+                 
+class SQLiteShopDatabase:
+    """
+    ShopDatabase backed by a local SQLite file in WAL mode.
+    Offers the same methods as ShopDatabase, so several agent worker processes can share one
+    on-disk store: readers run concurrently with a writer, each thread uses its own pooled
+    connection, and bulk writes are batched into single transactions.
+    Every instance claims a worker number for its order IDs in the workers table, so instances
+    sharing the file never issue the same ID; close() releases it for the next instance.
+    """
+    
+    def __init__(self, path: str = "shop.db", seed_mock_data: bool = True, worker_id: int = None):
+        """
+        Args:
+            path (str): SQLite database file
+            seed_mock_data (bool): Fill an empty database with the mock data of ShopDatabase
+            worker_id (int, optional): Worker number 0-99 to claim for order IDs; the lowest free one by default
+        """
+        self.path = path
+        self.order_ids = None  # Built once a worker number is claimed
+        self._worker = None  # (worker ID, host, pid) held in the workers table
+        self.coupon_engine = CouponEngine()
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._text_index = None  # Built on the first fuzzy search; only follows this instance's writes
+        self._text_index_lock = threading.Lock()
+        
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        self.order_ids = self._claim_worker(worker_id)
+        if seed_mock_data and conn.execute("SELECT COUNT(*) FROM products").fetchone()[0] == 0:
+            from .database import ShopDatabase
+            self.import_from(ShopDatabase())
+            
+    def _conn(self) -> sqlite3.Connection:
+        """
+        Get the calling thread's connection, opening it on first use.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Each connection is only used by its own thread; close() may run from any thread
+            conn = sqlite3.connect(self.path, timeout=30.0, cached_statements=256, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=OFF")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+        
+    def _claim_worker(self, worker_id: Optional[int]) -> OrderIdGenerator:
+        """
+        Claim a worker number in the workers table and build the order ID generator for it.
+        Numbers held by processes on this host that are no longer running are taken over. IDs
+        start after the last second the previous holder used, so they cannot repeat its IDs.
+        """
+        if worker_id is not None and not 0 <= worker_id < WORKER_IDS:
+            raise ValueError(f"Worker ID out of range: {worker_id}")
+        host, pid = socket.gethostname(), os.getpid()
+        conn = self._conn()
+        # Take the write lock before reading, so two instances cannot pick the same number
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            free = {}  # worker ID -> first second its IDs may use
+            taken = {}  # worker ID -> (host, pid) of its live holder
+            for row_id, row_host, row_pid, next_second in conn.execute(SELECT_WORKERS):
+                if row_pid is None:
+                    free[row_id] = next_second
+                elif row_host == host and not _process_alive(row_pid):
+                    # The holder died without releasing, possibly after issuing IDs up to now
+                    free[row_id] = max(next_second, int(time.time()) + 1)
+                else:
+                    taken[row_id] = (row_host, row_pid)
+            if worker_id is None:
+                available = [i for i in range(WORKER_IDS) if i not in taken]
+                if not available:
+                    raise ValueError(f"All {WORKER_IDS} worker IDs of {self.path} are claimed")
+                worker_id = available[0]
+            elif worker_id in taken:
+                raise ValueError(f"Worker ID {worker_id} of {self.path} is claimed by process {taken[worker_id][1]} "
+                                 f"on {taken[worker_id][0]}")
+            conn.execute(CLAIM_WORKER, (worker_id, host, pid))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        self._worker = (worker_id, host, pid)
+        return OrderIdGenerator(worker_id, start=free.get(worker_id, 0))
+        
+    def close(self):
+        """
+        Release the worker number and close the connections of all threads.
+        """
+        if self.order_ids is not None:
+            worker_id, host, pid = self._worker
+            with self._conn() as conn:
+                conn.execute(RELEASE_WORKER, (self.order_ids.last_second + 1, worker_id, host, pid))
+            self.order_ids = None
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+        
+    def get_product_info(self, product_name: str) -> Dict:
+        """Query product information"""
+        conn = self._conn()
+        row = conn.execute(SELECT_PRODUCT, (product_name,)).fetchone()
+        if row is None:
+            return {}
+        info = self._product_from_row(row)
+        info["reviews"] = [
+            {"user": user, "rating": rating, "content": content, "date": date}
+            for user, rating, content, date in conn.execute(SELECT_REVIEWS, (product_name,))
+        ]
+        return info
+        
+    def get_order_info(self, order_id: str) -> Dict:
+        """Query order information"""
+        row = self._conn().execute(SELECT_ORDER, (order_id,)).fetchone()
+        return dict(zip(ORDER_COLUMNS, row)) if row is not None else {}
+        
+    def get_user_orders(self, user_id: str, status: str = None, start_time: str = None, end_time: str = None,
+                        limit: int = None) -> List[Dict]:
+        """Query a user's orders, newest first, optionally by status and order time range"""
+        return self._select_orders("user_id", user_id, status, start_time, end_time, limit)
+        
+    def get_orders_by_status(self, status: str, start_time: str = None, end_time: str = None,
+                             limit: int = None) -> List[Dict]:
+        """Query orders with a status, newest first, optionally by order time range"""
+        return self._select_orders("status", status, None, start_time, end_time, limit)
+        
+    def update_order_status(self, order_id: str, status: str, tracking_number: str = None) -> bool:
+        """Change an order's status, and tracking number if given"""
+        with self._conn() as conn:
+            return conn.execute(UPDATE_ORDER_STATUS, (status, tracking_number, order_id)).rowcount > 0
+            
+    def _select_orders(self, column: str, value: str, status: str, start_time: str, end_time: str,
+                       limit: int) -> List[Dict]:
+        clauses, params = [f"{column} = ?"], [value]
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if start_time:
+            clauses.append("order_time >= ?")
+            params.append(start_time)
+        if end_time:
+            # A bare date as end_time covers that whole day
+            clauses.append("order_time <= ?")
+            params.append(end_time + "\uffff")
+        sql = f"{SELECT_ORDERS} WHERE {' AND '.join(clauses)} ORDER BY order_time DESC, order_id DESC LIMIT ?"
+        params.append(limit if limit is not None else -1)
+        return [{"order_id": row[0], **dict(zip(ORDER_COLUMNS, row[1:]))} for row in self._conn().execute(sql, params)]
+        
+    def get_logistics_info(self, tracking_number: str, start_time: str = None, end_time: str = None) -> List:
+        """Query logistics information, optionally within an event time range"""
+        params = (tracking_number, start_time or "", (end_time or "") + "\uffff")
+        return [
+            {"time": time, "status": status, "location": location}
+            for time, status, location in self._conn().execute(SELECT_LOGISTICS, params)
+        ]
+        
+    def get_latest_logistics(self, tracking_number: str) -> Optional[Dict]:
+        """Query the latest logistics event"""
+        row = self._conn().execute(SELECT_LATEST_LOGISTICS, (tracking_number,)).fetchone()
+        return {"time": row[0], "status": row[1], "location": row[2]} if row is not None else None
+        
+    def get_logistics_updates(self, tracking_number: str, cursor: int = 0) -> Tuple[List, int]:
+        """Query logistics events added after a cursor from an earlier call, and the new cursor"""
+        rows = self._conn().execute(SELECT_LOGISTICS_UPDATES, (tracking_number, cursor)).fetchall()
+        events = [{"time": time, "status": status, "location": location} for _, time, status, location in rows]
+        return events, max((row[0] for row in rows), default=cursor)
+        
+    def search_products(self, category: str = None, price_range: tuple = None, brand: str = None,
+                        limit: int = None, offset: int = 0, sort_by: str = "price", min_rating: float = None,
+                        in_stock: bool = False) -> List[Dict]:
+        """Search products by category, brand, price range, rating and stock, sorted by sort_by; reviews are left out"""
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {sort_by}")
+        clauses, params = [], []
+        if category:
+            clauses.append("category = ?")
+            params.append(category)
+        if brand:
+            clauses.append("brand = ?")
+            params.append(brand)
+        if price_range:
+            clauses.append("price BETWEEN ? AND ?")
+            params.extend(price_range)
+        if min_rating is not None:
+            clauses.append("rating >= ?")
+            params.append(min_rating)
+        if in_stock:
+            clauses.append("stock > 0")
+        sql = SELECT_PRODUCT.replace(" WHERE name = ?", "")
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        # Same tie order as ShopDatabase: by name for price, by insertion for the columnar sort keys
+        sql += (" ORDER BY price, name" if sort_by == "price"
+                else f" ORDER BY {sort_by}{' DESC' if SORT_KEYS[sort_by] else ''}, rowid") + " LIMIT ? OFFSET ?"
+        params.extend((limit if limit is not None else -1, offset))
+        return [
+            {"product_name": row[0], **self._product_from_row(row)}
+            for row in self._conn().execute(sql, params)
+        ]
+        
+    def find_products(self, query: str, limit: int = 5, min_score: float = 0.0) -> List[Dict]:
+        """
+        Fuzzy search over product names, brands, categories, descriptions and reviews, best match first.
+        The search runs on an in-memory index of this instance, built on first use and kept current by
+        writes through this instance. Products written by other instances or processes sharing the file
+        are not seen until refresh_text_index(); matches they removed are dropped from the results.
+        """
+        with self._text_index_lock:
+            if self._text_index is None:
+                self._text_index = TextIndex()
+                self._text_index.build({name: self.get_product_info(name)
+                                        for name, in self._conn().execute("SELECT name FROM products")})
+            matches = self._text_index.search(query, limit, min_score)
+        results = []
+        for name, score in matches:
+            row = self._conn().execute(SELECT_PRODUCT, (name,)).fetchone()
+            if row is not None:
+                results.append({"product_name": name, "score": score, "brand": row[7], "category": row[4],
+                                "price": row[1]})
+        return results
+        
+    def refresh_text_index(self):
+        """
+        Drop the fuzzy search index, so the next find_products() rebuilds it from the table.
+        Call after other instances or processes sharing the file have written products.
+        """
+        with self._text_index_lock:
+            self._text_index = None
+            
+    def get_cart_items(self, user_id: str) -> List[Dict]:
+        """Get user's shopping cart items"""
+        return [
+            {"product": product, "quantity": quantity, "spec": spec, "color": color}
+            for product, quantity, spec, color in self._conn().execute(SELECT_CART, (user_id,))
+        ]
+        
+    def add_to_cart(self, user_id: str, product: str, quantity: int, spec: str, color: str) -> bool:
+        """Add item to shopping cart, merging it with a line of the same product, spec and color"""
+        with self._conn() as conn:
+            if conn.execute(MERGE_CART_ITEM, (quantity, user_id, product, spec, color)).rowcount == 0:
+                conn.execute(INSERT_CART_ITEM, (user_id, product, quantity, spec, color))
+        return True
+        
+    def remove_from_cart(self, user_id: str, product: str, spec: str, color: str, quantity: int = None) -> bool:
+        """Remove some units of a cart line, or the whole line"""
+        line = (user_id, product, spec, color)
+        with self._conn() as conn:
+            if quantity is not None:
+                if conn.execute(REMOVE_CART_UNITS, (quantity, *line)).rowcount == 0:
+                    return False
+                conn.execute(DELETE_CART_ITEM, (*line, False))
+                return True
+            return conn.execute(DELETE_CART_ITEM, (*line, True)).rowcount > 0
+        
+    def get_user_coupons(self, user_id: str) -> List[Dict]:
+        """Get user's coupons"""
+        return [
+            {"code": code, "type": type_, "amount": amount, "condition": condition, "valid_until": valid_until}
+            for code, type_, amount, condition, valid_until in self._conn().execute(SELECT_COUPONS, (user_id,))
+        ]
+        
+    def get_cart_totals(self, user_id: str) -> Dict:
+        """Get item count, subtotal and per-brand/category subtotals of a user's cart"""
+        return cart_totals(self._conn().execute(SELECT_CART_LINES, (user_id,)))
+        
+    def get_cart_summary(self, user_id: str) -> Dict:
+        """Get the number of lines, item count, subtotal and per-brand/category subtotals of a user's cart"""
+        lines = self._conn().execute(SELECT_CART_LINES, (user_id,)).fetchall()
+        return {"lines": len(lines), **cart_totals(lines)}
+        
+    def get_best_coupon(self, user_id: str, today: str = None) -> Dict:
+        """Find the coupon saving the most on a user's cart, and the final price"""
+        return self.coupon_engine.best(self.get_user_coupons(user_id), self.get_cart_totals(user_id), today)
+        
+    def preview_best_coupons(self, user_ids: Iterable[str] = None, extra_coupons: List[Dict] = (),
+                             today: str = None) -> Dict[str, Dict]:
+        """Best coupon per cart for many users, optionally with campaign coupons added for everyone"""
+        if user_ids is None:
+            user_ids = [user_id for user_id, in self._conn().execute(SELECT_CART_USERS)]
+        user_ids = list(user_ids)
+        results = self.coupon_engine.best_many(
+            ((self.get_user_coupons(user_id) + list(extra_coupons), self.get_cart_totals(user_id)) for user_id in user_ids),
+            today
+        )
+        return dict(zip(user_ids, results))
+        
+    def create_order(self, user_id: str, product: str, quantity: int, address: str, phone: str) -> str:
+        """Create new order"""
+        order_id = self.order_ids.next_id()
+        product_info = self._conn().execute(SELECT_PRODUCT, (product,)).fetchone()
+        
+        if product_info is None:
+            return ""
+            
+        total_price = product_info[1] * quantity
+        
+        with self._conn() as conn:
+            conn.execute(INSERT_ORDER, (
+                order_id, user_id, product, quantity, total_price, "Pending Payment", "",
+                datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "Unpaid", address, phone
+            ))
+            
+        return order_id
+        
+    def add_product(self, product_name: str, info: Dict):
+        """Add or replace a product"""
+        self.add_products([(product_name, info)])
+        
+    def update_product(self, product_name: str, **fields) -> bool:
+        """Update fields of a product"""
+        info = self.get_product_info(product_name)
+        if not info:
+            return False
+        self.add_product(product_name, {**info, **fields})
+        return True
+        
+    def remove_product(self, product_name: str) -> bool:
+        """Remove a product and its reviews"""
+        with self._conn() as conn:
+            removed = conn.execute(DELETE_PRODUCT, (product_name,)).rowcount
+            conn.execute(DELETE_REVIEWS, (product_name,))
+        if self._text_index is not None:
+            with self._text_index_lock:
+                self._text_index.remove(product_name)
+        return removed > 0
+        
+    def add_products(self, products: Iterable[Tuple[str, Dict]]):
+        """Add or replace many products in one transaction"""
+        products = list(products)
+        with self._conn() as conn:
+            conn.executemany(UPSERT_PRODUCT, (self._product_row(name, info) for name, info in products))
+            conn.executemany(DELETE_REVIEWS, ((name,) for name, info in products if "reviews" in info))
+            conn.executemany(INSERT_REVIEW, (
+                (name, review.get("user"), review.get("rating"), review.get("content"), review.get("date"))
+                for name, info in products for review in info.get("reviews", ())
+            ))
+        if self._text_index is not None:
+            with self._text_index_lock:
+                for name, info in products:
+                    self._text_index.add(name, info)
+            
+    def add_logistics_events(self, events: Iterable[Tuple[str, Dict]]) -> int:
+        """Append a batch of (tracking_number, event) pairs from a carrier feed in one transaction"""
+        with self._conn() as conn:
+            return conn.executemany(INSERT_LOGISTICS, (
+                (tracking_number, event["time"], event["status"], event["location"])
+                for tracking_number, event in events
+            )).rowcount
+            
+    def import_from(self, db) -> None:
+        """Copy all tables of an in-memory ShopDatabase in batched transactions"""
+        self.add_products(db.products_db.items())
+        with self._conn() as conn:
+            conn.executemany(UPSERT_ORDER, (
+                (order_id, *(order.get(column) for column in ORDER_COLUMNS))
+                for order_id, order in db.orders_db.items()
+            ))
+            conn.executemany(INSERT_CART_ITEM, (
+                (user_id, item["product"], item["quantity"], item["spec"], item["color"])
+                for user_id, items in db.cart_db.items() for item in items
+            ))
+            conn.executemany(INSERT_COUPON, (
+                (user_id, c["code"], c["type"], c["amount"], c["condition"], c["valid_until"])
+                for user_id, coupons in db.coupon_db.items() for c in coupons
+            ))
+        self.add_logistics_events(
+            (tracking_number, event)
+            for tracking_number, events in db.logistics_db.items() for event in events
+        )
+        
+    @staticmethod
+    def _product_row(name: str, info: Dict) -> Tuple:
+        return (name, info["price"], info.get("stock"), info.get("description"), info.get("category"),
+                info.get("rating"), info.get("review_count"), info.get("brand"),
+                json.dumps(info.get("specs", []), ensure_ascii=False),
+                json.dumps(info.get("colors", []), ensure_ascii=False))
+                
+    @staticmethod
+    def _product_from_row(row: Tuple) -> Dict:
+        info = dict(zip(PRODUCT_COLUMNS, row[1:]))
+        info["specs"] = json.loads(info["specs"]) if info["specs"] else []
+        info["colors"] = json.loads(info["colors"]) if info["colors"] else []
+        return info
@@ -0,0 +1,59 @@
+from typing import Dict
+
+class StreamedMessage:
+    """
+    Assembles an assistant message from streamed chat completion chunks.
+    Content arrives as text pieces; tool calls arrive as fragments keyed by their index,
+    with the function arguments split over many chunks.
+    """
+    
+    def __init__(self):
+        self.content_parts = []
+        self.tool_calls = {}  # index -> {"id", "type", "function": {"name", "arguments"}}
+        self._message = None  # Complete message, e.g. from the response cache
+        
+    def add_delta(self, delta: Dict) -> str:
+        """
+        Merge one streamed delta into the message.
+        
+        Args:
+            delta (Dict): The "delta" field of a streamed choice
+            
+        Returns:
+            str: New content text carried by the delta, empty if none
+        """
+        for fragment in delta.get("tool_calls") or ():
+            tool_call = self.tool_calls.setdefault(fragment["index"], {
+                "id": None,
+                "type": "function",
+                "function": {"name": "", "arguments": ""}
+            })
+            if fragment.get("id"):
+                tool_call["id"] = fragment["id"]
+            function = fragment.get("function") or {}
+            if function.get("name"):
+                tool_call["function"]["name"] += function["name"]
+            if function.get("arguments"):
+                tool_call["function"]["arguments"] += function["arguments"]
+                
+        text = delta.get("content") or ""
+        if text:
+            self.content_parts.append(text)
+        return text
+        
+    def set_message(self, message: Dict):
+        """
+        Use a complete message instead of streamed deltas.
+        """
+        self._message = message
+        
+    def to_message(self) -> Dict:
+        """
+        Get the assembled assistant message.
+        """
+        if self._message is not None:
+            return self._message
+        message = {"role": "assistant", "content": "".join(self.content_parts) or None}
+        if self.tool_calls:
+            message["tool_calls"] = [self.tool_calls[index] for index in sorted(self.tool_calls)]
+        return message
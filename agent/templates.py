@@ -0,0 +1,149 @@
+import json
+import threading
+from typing import Dict, Iterable, List, Optional
+from .rl_optimizer import QUERY_TYPES
+
+def render_order(args: Dict, order: Dict) -> Optional[str]:
+    """
+    Render a get_order_info result, or None if it is not a complete order.
+    """
+    if not all(key in order for key in ("product", "quantity", "total_price", "status", "payment_status")):
+        return None
+    response = (f"Dear customer, your order {args.get('order_id', '')} for {order['quantity']} x "
+                f"{order['product']} (total {order['total_price']}) is currently {order['status']}, "
+                f"payment status: {order['payment_status']}.")
+    if order.get("tracking_number"):
+        response += f" The tracking number is {order['tracking_number']}."
+    return response + " Is there anything else I can help you with?"
+    
+def render_logistics(args: Dict, events: List[Dict]) -> Optional[str]:
+    """
+    Render a get_logistics_info result, or None if there are no tracking events.
+    """
+    if not events or not all(key in events[-1] for key in ("time", "status", "location")):
+        return None
+    latest = events[-1]
+    return (f"Dear customer, the latest update for parcel {args.get('tracking_number', '')} is "
+            f"\"{latest['status']}\" at {latest['location']} ({latest['time']}). "
+            "Is there anything else I can help you with?")
+            
+# Templates for tool results that can be answered without a follow-up completion call
+TEMPLATES = {
+    "get_order_info": render_order,
+    "get_logistics_info": render_logistics
+}
+
+# Words asking for something beyond a status lookup, which a status template would ignore
+REQUEST_KEYWORDS = ("cancel", "change", "modify", "edit", "address", "refund", "return", "exchange", "replace",
+                    "wrong", "damaged", "broken", "missing", "lost", "delay", "why")
+
+class FastPathRenderer:
+    """
+    Answers simple lookups directly from tool results.
+    For order and logistics lookups the follow-up completion mostly rephrases a small JSON
+    dict, so a template produces the reply instead and saves a model round-trip. Only plain
+    status questions qualify: the turn's RL state may carry no query type but "order", and the
+    message may not ask for a change such as a cancellation or a new address.
+    """
+    
+    def __init__(self, tools: Iterable[str] = ("get_order_info", "get_logistics_info"),
+                 skip_response_types: Iterable[str] = ("detailed",), lookup_query_types: Iterable[str] = ("order",),
+                 request_keywords: Iterable[str] = REQUEST_KEYWORDS):
+        """
+        Args:
+            tools (Iterable[str]): Tools answered from templates
+            skip_response_types (Iterable[str]): Response type features, as chosen by the RL
+                optimizer, for which the model should still phrase the answer
+            lookup_query_types (Iterable[str]): Query type features a turn may have and still be answered from templates
+            request_keywords (Iterable[str]): Words in the user's message that leave the answer to the model
+        """
+        self.rules = {}  # tool -> response type features that disable the fast path
+        for tool in tools:
+            self.enable(tool, skip_response_types)
+        self.lookup_query_types = frozenset(lookup_query_types)
+        self.request_keywords = tuple(request_keywords)
+        self._lock = threading.Lock()
+        self.fired = 0  # Tool rounds answered from templates
+        self.fired_by_tool = {}  # tool -> number of template replies
+        self.fallbacks = 0  # Tool rounds handed back to the model
+        
+    def enable(self, tool: str, skip_response_types: Iterable[str] = ("detailed",)):
+        """
+        Answer a tool's results from its template, except for the given response types.
+        """
+        if tool not in TEMPLATES:
+            raise ValueError(f"No template for tool: {tool}")
+        self.rules[tool] = frozenset(skip_response_types)
+        
+    def disable(self, tool: str):
+        """
+        Always let the model phrase the answer for a tool.
+        """
+        self.rules.pop(tool, None)
+        
+    def is_lookup(self, user_input: str, state: str) -> bool:
+        """
+        Whether a turn only asks for the status of an order or parcel.
+        
+        Args:
+            user_input (str): User's question
+            state (str): RL state features of the turn
+        """
+        query_types = set(state.split("_")) & set(QUERY_TYPES)
+        if not query_types <= self.lookup_query_types:
+            return False
+        text = user_input.lower()
+        return not any(keyword in text for keyword in self.request_keywords)
+        
+    def render(self, tool_calls: List[Dict], tool_messages: List[Dict], response_type: str, user_input: str,
+               state: str) -> Optional[str]:
+        """
+        Render a reply for one round of tool calls.
+        
+        Args:
+            tool_calls (List[Dict]): Tool calls requested by the model
+            tool_messages (List[Dict]): Results of the tool calls
+            response_type (str): Response type chosen by the RL optimizer
+            user_input (str): User's question
+            state (str): RL state features of the turn
+            
+        Returns:
+            Optional[str]: The reply, or None if the model should answer
+        """
+        if not self.is_lookup(user_input, state):
+            with self._lock:
+                self.fallbacks += 1
+            return None
+            
+        replies = []
+        for tool_call, tool_message in zip(tool_calls, tool_messages):
+            name = tool_call["function"]["name"]
+            skip = self.rules.get(name)
+            reply = None
+            if skip is not None and not any(feature in response_type for feature in skip):
+                reply = TEMPLATES[name](json.loads(tool_call["function"]["arguments"]),
+                                        json.loads(tool_message["content"]))
+            if reply is None:
+                with self._lock:
+                    self.fallbacks += 1
+                return None
+            replies.append((name, reply))
+            
+        with self._lock:
+            self.fired += 1
+            for name, _ in replies:
+                self.fired_by_tool[name] = self.fired_by_tool.get(name, 0) + 1
+        return "\n".join(reply for _, reply in replies)
+        
+    def stats(self) -> Dict:
+        """
+        Get how often the fast path answered instead of the model.
+        """
+        with self._lock:
+            rounds = self.fired + self.fallbacks
+            return {
+                "fired": self.fired,
+                "fired_by_tool": dict(self.fired_by_tool),
+                "fallbacks": self.fallbacks,
+                "fire_rate": self.fired / rounds if rounds else 0.0
+            }
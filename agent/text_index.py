@@ -0,0 +1,181 @@
+import heapq
+import math
+import re
+from collections import Counter
+from itertools import islice
+from typing import Dict, List, Set, Tuple
+
+TOKEN_PATTERN = re.compile(r"[^\W\d_]+|\d+")
+
+# Weight of a token by the product field it appears in; a token keeps its best field
+FIELD_WEIGHTS = {
+    "name": 1.0,
+    "brand": 0.8,
+    "category": 0.6,
+    "description": 0.5,
+    "reviews": 0.3
+}
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase words and numbers, splitting "iphone15" into "iphone" and "15".
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+    
+def name_key(text: str) -> str:
+    """
+    Lowercase text with spaces and punctuation removed, so "mate 60" and "Mate60" agree.
+    """
+    return "".join(tokenize(text))
+    
+def name_keys(name: str, brand: str = None) -> Set[str]:
+    """
+    Keys a product name is known by: the whole name and, when it starts with the brand, the name without it.
+    """
+    keys = {name_key(name)}
+    tokens, brand_tokens = tokenize(name), tokenize(brand or "")
+    if brand_tokens and tokens[:len(brand_tokens)] == brand_tokens and len(tokens) > len(brand_tokens):
+        keys.add("".join(tokens[len(brand_tokens):]))
+    return keys
+    
+def trigrams(text: str) -> Set[str]:
+    """
+    Character trigrams of the text's name key, so spacing and punctuation do not matter.
+    """
+    compact = "$" + name_key(text) + "$"
+    return {compact[i:i + 3] for i in range(len(compact) - 2)}
+    
+class TextIndex:
+    """
+    Inverted indexes for fuzzy product lookup.
+    Product names are indexed by character trigrams, which tolerate missing spaces, typos and
+    partial names, and names, brands, categories, descriptions and reviews by word token.
+    Queries only touch the postings of their own trigrams and tokens, skipping very common
+    ones, so their cost does not grow with the catalog.
+    """
+    
+    def __init__(self, max_postings: int = 10000, name_weight: float = 0.7):
+        """
+        Args:
+            max_postings (int): Trigrams and tokens in more products than this are skipped at query time
+            name_weight (float): Share of the score from name similarity; the rest comes from token matches
+        """
+        self.max_postings = max_postings
+        self.name_weight = name_weight
+        self.gram_postings = {}  # trigram -> product names
+        self.token_postings = {}  # token -> {product name: field weight}
+        self.doc_grams = {}  # product name -> trigrams of the name
+        self.doc_tokens = {}  # product name -> {token: field weight}
+        
+    def __len__(self) -> int:
+        return len(self.doc_grams)
+        
+    def build(self, products: Dict[str, Dict]):
+        """
+        Rebuild the index from a name -> product info mapping.
+        """
+        self.gram_postings = {}
+        self.token_postings = {}
+        self.doc_grams = {}
+        self.doc_tokens = {}
+        for name, info in products.items():
+            self.add(name, info)
+            
+    def add(self, name: str, info: Dict):
+        """
+        Index a product, replacing its previous entry.
+        """
+        self.remove(name)
+        grams = trigrams(name)
+        for gram in grams:
+            self.gram_postings.setdefault(gram, set()).add(name)
+        self.doc_grams[name] = grams
+        
+        fields = {
+            "name": name,
+            "brand": info.get("brand") or "",
+            "category": info.get("category") or "",
+            "description": info.get("description") or "",
+            "reviews": " ".join(review.get("content", "") for review in info.get("reviews", ()))
+        }
+        tokens = {}
+        for field, text in fields.items():
+            weight = FIELD_WEIGHTS[field]
+            for token in tokenize(text):
+                if tokens.get(token, 0.0) < weight:
+                    tokens[token] = weight
+        for token, weight in tokens.items():
+            self.token_postings.setdefault(token, {})[name] = weight
+        self.doc_tokens[name] = tokens
+        
+    def remove(self, name: str) -> bool:
+        """
+        Remove a product from the index.
+        """
+        grams = self.doc_grams.pop(name, None)
+        if grams is None:
+            return False
+        for gram in grams:
+            postings = self.gram_postings[gram]
+            postings.discard(name)
+            if not postings:
+                del self.gram_postings[gram]
+        for token in self.doc_tokens.pop(name):
+            postings = self.token_postings[token]
+            del postings[name]
+            if not postings:
+                del self.token_postings[token]
+        return True
+        
+    def search(self, query: str, limit: int = 5, min_score: float = 0.0) -> List[Tuple[str, float]]:
+        """
+        Rank products against a free-text query.
+        
+        Args:
+            query (str): Product name, partial name or description words
+            limit (int): Maximum number of results
+            min_score (float): Minimum score in [0, 1] of returned products
+            
+        Returns:
+            List[Tuple[str, float]]: (product name, score) pairs, best first
+        """
+        query_grams = trigrams(query)
+        query_tokens = set(tokenize(query))
+        if not query_tokens:
+            return []
+            
+        # Name similarity: Dice coefficient over the trigrams both sides share
+        overlap = Counter()
+        for gram in self._selective(query_grams, self.gram_postings):
+            overlap.update(islice(self.gram_postings[gram], self.max_postings))
+        name_scores = {
+            name: 2.0 * shared / (len(query_grams) + len(self.doc_grams[name]))
+            for name, shared in overlap.items()
+        }
+        
+        # Token coverage: idf-weighted share of query tokens found in the product's fields
+        n = max(len(self.doc_grams), 1)
+        idf = {token: math.log(1.0 + n / len(self.token_postings.get(token) or (None,))) for token in query_tokens}
+        total_idf = sum(idf.values())
+        token_scores = Counter()
+        for token in self._selective(query_tokens, self.token_postings):
+            for name, weight in islice(self.token_postings[token].items(), self.max_postings):
+                token_scores[name] += weight * idf[token] / total_idf
+                
+        scores = {
+            name: self.name_weight * name_scores.get(name, 0.0) + (1.0 - self.name_weight) * token_scores.get(name, 0.0)
+            for name in name_scores.keys() | token_scores.keys()
+        }
+        ranked = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(name, round(score, 4)) for name, score in ranked if score >= min_score]
+        
+    def _selective(self, terms: Set[str], postings: Dict) -> List[str]:
+        """
+        Terms present in the index, without those too common to be worth scanning.
+        If every term is common, the rarest one is kept and read up to max_postings entries.
+        """
+        present = [term for term in terms if term in postings]
+        selective = [term for term in present if len(postings[term]) <= self.max_postings]
+        if not selective and present:
+            selective = [min(present, key=lambda term: len(postings[term]))]
+        return selective
@@ -0,0 +1,78 @@
+"""
+Latency of filtered, sorted top-k product queries on ColumnarCatalog versus a scan and sort of the product dicts.
+
+    python -m benchmarks.columnar [products]
+"""
+import random
+import sys
+import time
+from typing import Callable, Dict, List
+from agent.columnar import SORT_KEYS, ColumnarCatalog
+
+CATEGORIES = ["Mobile Phones", "Wearables", "Audio", "Laptops", "Tablets", "Cameras", "Accessories", "Home"]
+BRANDS = ["Apple", "Huawei", "Xiaomi", "Samsung", "Sony", "Lenovo", "Dell", "Canon"]
+
+# Queries as search_products would send them: (label, query arguments)
+QUERIES = [
+    ("category+price+stock by rating", {"category": "Audio", "price_range": (500, 5000), "in_stock": True,
+                                        "sort_by": "rating", "limit": 5}),
+    ("brand+rating by review count", {"brand": "Sony", "min_rating": 4.5, "sort_by": "review_count",
+                                      "limit": 10}),
+    ("price range by price, page 3", {"price_range": (1000, 2000), "sort_by": "price", "limit": 10, "offset": 20})
+]
+
+def _sample_products(count: int) -> Dict[str, Dict]:
+    rng = random.Random(0)
+    return {
+        f"Product {i}": {"price": round(rng.uniform(50, 20000), 2), "stock": rng.choice([0, 0, 5, 20, 100]),
+                         "rating": round(rng.uniform(3.0, 5.0), 1), "review_count": rng.randrange(5000),
+                         "category": rng.choice(CATEGORIES), "brand": rng.choice(BRANDS)}
+        for i in range(count)
+    }
+    
+def scan(products: Dict[str, Dict], category: str = None, brand: str = None, price_range: tuple = None,
+         min_rating: float = None, in_stock: bool = False, sort_by: str = "price", limit: int = None,
+         offset: int = 0) -> List[str]:
+    """
+    The same query as ColumnarCatalog.query, as a loop over the product dicts and a full sort.
+    """
+    matches = [
+        name for name, info in products.items()
+        if (category is None or info["category"] == category) and (brand is None or info["brand"] == brand)
+        and (not price_range or price_range[0] <= info["price"] <= price_range[1])
+        and (min_rating is None or info["rating"] >= min_rating) and (not in_stock or info["stock"] > 0)
+    ]
+    matches.sort(key=lambda name: products[name][sort_by], reverse=SORT_KEYS[sort_by])
+    return matches[offset:offset + limit if limit is not None else None]
+    
+def _best_ms(run: Callable, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+    
+def measure_queries(count: int = 1000000) -> Dict[str, Dict[str, float]]:
+    """
+    Best-of-5 latency of each query on both layouts.
+    
+    Returns:
+        Dict[str, Dict[str, float]]: Query label -> milliseconds as "scan" and "columnar", and the "speedup"
+    """
+    products = _sample_products(count)
+    catalog = ColumnarCatalog.from_products(products)
+    results = {}
+    for label, kwargs in QUERIES:
+        if catalog.query(**kwargs) != scan(products, **kwargs):
+            raise AssertionError(f"Results differ for {label}")
+        scan_ms = _best_ms(lambda: scan(products, **kwargs))
+        columnar_ms = _best_ms(lambda: catalog.query(**kwargs))
+        results[label] = {"scan": scan_ms, "columnar": columnar_ms, "speedup": scan_ms / columnar_ms}
+    return results
+    
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    print(f"{'query':<34}{'scan ms':>10}{'columnar ms':>13}{'speedup':>9}   ({count} products)")
+    for label, result in measure_queries(count).items():
+        print(f"{label:<34}{result['scan']:>10.1f}{result['columnar']:>13.1f}{result['speedup']:>8.1f}x")
@@ -0,0 +1,77 @@
+"""
+Memory of rows loaded as plain dicts versus the compact records of agent.records.
+
+    python -m benchmarks.records_memory [rows]
+"""
+import json
+import random
+import sys
+import tracemalloc
+from typing import Dict, List
+from agent.records import LOGISTICS_STATUSES, ORDER_STATUSES, PAYMENT_STATUSES, CartLine, LogisticsEvent, Order, Review
+
+def _sample_rows(record_type, rows: int) -> List[str]:
+    """
+    JSON lines shaped like the mock database's records, with realistic repetition of values.
+    """
+    rng = random.Random(0)
+    products = ["iPhone 15", "iPhone 15 Pro", "Huawei Mate60", "Xiaomi 14 Pro", "AirPods Pro 2", "MacBook Pro 14"]
+    lines = []
+    for i in range(rows):
+        if record_type is Order:
+            row = {"user_id": f"U{rng.randrange(rows // 10 + 1)}", "product": rng.choice(products),
+                   "quantity": rng.randint(1, 3), "total_price": rng.randint(100, 20000) + 0.99,
+                   "status": rng.choice(ORDER_STATUSES.values), "tracking_number": f"SF{1000000000 + i}",
+                   "order_time": f"2024-0{rng.randint(1, 9)}-1{rng.randint(0, 9)} 1{rng.randint(0, 9)}:30:00",
+                   "payment_status": rng.choice(PAYMENT_STATUSES.values),
+                   "shipping_address": f"{rng.randint(1, 999)} Nanjing Road, Shanghai",
+                   "contact_phone": f"138{rng.randrange(10 ** 8):08d}"}
+        elif record_type is CartLine:
+            row = {"product": rng.choice(products), "quantity": rng.randint(1, 3),
+                   "spec": rng.choice(["128GB", "256GB", "512GB"]), "color": rng.choice(["Black", "White", "Blue"])}
+        elif record_type is LogisticsEvent:
+            city = rng.choice(["Shanghai", "Beijing", "Shenzhen", "Hangzhou"])
+            row = {"time": f"2024-0{rng.randint(1, 9)}-1{rng.randint(0, 9)} 1{rng.randint(0, 9)}:00:00",
+                   "status": rng.choice(LOGISTICS_STATUSES.values), "location": f"{city} Hub {rng.randint(1, 20)}"}
+        else:
+            row = {"user": f"U{rng.randrange(rows // 10 + 1)}", "rating": rng.randint(1, 5),
+                   "content": rng.choice(["Great phone", "Fast delivery", "Battery could be better"]),
+                   "date": f"2024-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}"}
+        lines.append(json.dumps(row))
+    return lines
+    
+def _traced_bytes(build) -> int:
+    """
+    Bytes still allocated by build() once it returns, i.e. the size of what it built.
+    """
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        built = build()
+        size = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+    del built
+    return size
+    
+def measure_layouts(rows: int = 200000) -> Dict[str, Dict[str, float]]:
+    """
+    Memory of rows loaded as plain dicts versus compact records, per record type, measured with tracemalloc.
+    Both layouts are built from the same JSON lines, as a loader would read them.
+    
+    Returns:
+        Dict[str, Dict[str, float]]: Record type name -> megabytes as "dicts" and "records", and their "ratio"
+    """
+    results = {}
+    for record_type in (Order, CartLine, LogisticsEvent, Review):
+        lines = _sample_rows(record_type, rows)
+        dicts = _traced_bytes(lambda: [json.loads(line) for line in lines])
+        records = _traced_bytes(lambda: [record_type.from_dict(json.loads(line)) for line in lines])
+        results[record_type.__name__] = {"dicts": dicts / 1e6, "records": records / 1e6, "ratio": dicts / records}
+    return results
+    
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    print(f"{'record':<16}{'dicts MB':>12}{'records MB':>12}{'ratio':>8}   ({rows} rows each)")
+    for name, result in measure_layouts(rows).items():
+        print(f"{name:<16}{result['dicts']:>12.1f}{result['records']:>12.1f}{result['ratio']:>8.2f}")
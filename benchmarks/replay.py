@@ -0,0 +1,51 @@
+"""
+Throughput of ReplayTrainer with 1, 2 and 4 worker processes on synthetic conversation logs.
+
+    python -m benchmarks.replay [conversations]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+from typing import Dict, List
+from agent.replay import ReplayTrainer
+
+QUESTIONS = ["How much is the iPhone 15?", "Where is my order ORDER2024030001?", "What are the specs of the Mate60?",
+             "My parcel has a problem", "Is there a discount on AirPods?", "Tracking SF1234567890 please"]
+REPLIES = ["The price is 5999.", "Your order has shipped, tracking number SF1234567890.",
+           "Sorry for the trouble, I have escalated your issue.", "Could you share your order number?"]
+FOLLOW_UPS = ["Thanks, that was helpful", "That is wrong", "ok", "Can you tell me more?", "Great, thank you"]
+
+def _write_log(path: str, conversations: int):
+    rng = random.Random(0)
+    with open(path, "w", encoding="utf-8") as f:
+        for _ in range(conversations):
+            messages = []
+            for turn in range(rng.randint(1, 3)):
+                messages.append({"role": "user", "content": rng.choice(QUESTIONS if turn == 0 else FOLLOW_UPS)})
+                messages.append({"role": "assistant", "content": rng.choice(REPLIES)})
+            f.write(json.dumps({"messages": messages, "feedback": rng.choice(FOLLOW_UPS)}) + "\n")
+    
+def measure_workers(conversations: int = 200000, workers: List[int] = (1, 2, 4)) -> Dict[int, Dict]:
+    """
+    Train from scratch on the same log once per worker count.
+    
+    Returns:
+        Dict[int, Dict]: Worker count -> ReplayTrainer report
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        log_path = os.path.join(directory, "conversations.jsonl")
+        _write_log(log_path, conversations)
+        results = {}
+        for count in workers:
+            snapshot_path = os.path.join(directory, f"qtable.{count}.snap")
+            results[count] = ReplayTrainer(workers=count).train([log_path], snapshot_path)
+        return results
+    
+if __name__ == "__main__":
+    conversations = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    print(f"{'workers':<10}{'seconds':>10}{'transitions/s':>16}   ({conversations} conversations, "
+          f"{os.cpu_count()} CPUs)")
+    for count, report in measure_workers(conversations).items():
+        print(f"{count:<10}{report['seconds']:>10.2f}{report['transitions_per_second']:>16}")
@@ -1,5 +1,6 @@
 import os
 from agent.agent import ShopServiceAgent
+from agent.cache import ResponseCache
 
 def main():
     """
@@ -12,7 +13,7 @@ def main():
         raise ValueError("Please set the OPENAI_API_KEY environment variable")
     
     # Initialize the customer services agent
-    agent = ShopServiceAgent(api_key)
+    agent = ShopServiceAgent(api_key, response_cache=ResponseCache())
     
     # Start the chat loop
     print("AI Customer Service Assistant started. Please enter your question (type 'quit' to exit)")
@@ -24,9 +25,11 @@ def main():
             break
             
         try:
-            # Process user input and get response
-            response = agent.think(user_input)
-            print(f"Assistant: {response}")
+            # Process user input and print the response as it is generated
+            print("Assistant: ", end="", flush=True)
+            for text in agent.think_stream(user_input):
+                print(text, end="", flush=True)
+            print()
         except Exception as e:
             print(f"Error occurred: {str(e)}")
 
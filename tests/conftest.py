@@ -0,0 +1,74 @@
+import asyncio
+import json
+import openai
+import pytest
+from openai.openai_object import OpenAIObject
+
+def tool_call(name: str, args: dict, call_id: str = "call_1") -> dict:
+    return {"id": call_id, "type": "function", "function": {"name": name, "arguments": json.dumps(args)}}
+    
+class FakeOpenAI:
+    """
+    Stand-in for the chat completions API, answering from a script.
+    script(messages, kwargs) returns the assistant message of each call; streamed calls get it
+    back in small chunks, with tool call arguments split across several of them.
+    """
+    
+    def __init__(self):
+        self.script = lambda messages, kwargs: {"role": "assistant", "content": "OK"}
+        self.calls = []
+        self.delay = 0.0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        message = self.script(kwargs["messages"], kwargs)
+        if kwargs.get("stream"):
+            return iter(self.chunks(message))
+        return self.response(message)
+        
+    async def acreate(self, **kwargs):
+        self.calls.append(kwargs)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        message = self.script(kwargs["messages"], kwargs)
+        if kwargs.get("stream"):
+            return self._achunks(message)
+        return self.response(message)
+        
+    @staticmethod
+    def response(message: dict) -> OpenAIObject:
+        return OpenAIObject.construct_from({
+            "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+        })
+        
+    @staticmethod
+    def chunks(message: dict) -> list:
+        deltas = []
+        content = message.get("content") or ""
+        deltas += [{"content": content[i:i + 3]} for i in range(0, len(content), 3)]
+        for index, call in enumerate(message.get("tool_calls") or ()):
+            deltas.append({"tool_calls": [{"index": index, "id": call["id"], "type": "function",
+                                           "function": {"name": call["function"]["name"], "arguments": ""}}]})
+            arguments = call["function"]["arguments"]
+            deltas += [{"tool_calls": [{"index": index, "function": {"arguments": arguments[i:i + 4]}}]}
+                       for i in range(0, len(arguments), 4)]
+        return [{"choices": [{"index": 0, "delta": delta}]} for delta in deltas]
+        
+    async def _achunks(self, message: dict):
+        for chunk in self.chunks(message):
+            await asyncio.sleep(0)
+            yield chunk
+            
+@pytest.fixture
+def fake_openai(monkeypatch) -> FakeOpenAI:
+    fake = FakeOpenAI()
+    monkeypatch.setattr(openai.ChatCompletion, "create", fake.create)
+    monkeypatch.setattr(openai.ChatCompletion, "acreate", fake.acreate)
+    return fake
@@ -0,0 +1,32 @@
+import json
+from agent.agent import FUNCTIONS, ShopServiceAgent
+from conftest import tool_call
+
+def _tool_results(fake) -> list:
+    return [json.loads(m["content"]) for m in fake.calls[-1]["messages"] if m["role"] == "tool"]
+    
+def _ask_for(fake, name: str, args: dict):
+    def script(messages, kwargs):
+        if messages[-1]["role"] == "user":
+            return {"role": "assistant", "content": None, "tool_calls": [tool_call(name, args)]}
+        return {"role": "assistant", "content": "Here you go."}
+    fake.script = script
+    
+def test_user_orders_are_bound_to_the_session(fake_openai):
+    agent = ShopServiceAgent("test-key")
+    _ask_for(fake_openai, "get_user_orders", {"user_id": "USER002"})
+    agent.think("Show me my orders", session_id="USER001")
+    orders = _tool_results(fake_openai)[0]
+    assert orders and all(order["user_id"] == "USER001" for order in orders)
+    
+def test_cart_and_coupon_tools_are_bound_to_the_session(fake_openai):
+    agent = ShopServiceAgent("test-key")
+    for name in ("get_cart_summary", "get_best_coupon"):
+        _ask_for(fake_openai, name, {"user_id": "USER002"})
+        agent.think(f"Check my {name}", session_id="USER001")
+        assert _tool_results(fake_openai)[0] == json.loads(json.dumps(getattr(agent.db, name)("USER001")))
+        assert _tool_results(fake_openai)[0] != json.loads(json.dumps(getattr(agent.db, name)("USER002")))
+        
+def test_no_tool_takes_a_user_id_from_the_model():
+    for function in FUNCTIONS:
+        assert "user_id" not in function["parameters"].get("properties", {}), function["name"]
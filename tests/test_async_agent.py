@@ -0,0 +1,91 @@
+import asyncio
+import json
+import time
+import openai
+import pytest
+from agent.async_agent import AsyncShopServiceAgent
+from conftest import tool_call
+
+SESSIONS = 200
+
+def _echo(messages, kwargs):
+    return {"role": "assistant", "content": f"Echo: {messages[-1]['content']}"}
+    
+def test_concurrent_sessions(fake_openai):
+    fake_openai.script = _echo
+    fake_openai.delay = 0.05
+    agent = AsyncShopServiceAgent("test-key")
+    
+    async def serve():
+        return await asyncio.gather(*(agent.athink(f"Question {i}", session_id=f"S{i}") for i in range(SESSIONS)))
+        
+    started = time.perf_counter()
+    replies = asyncio.run(serve())
+    elapsed = time.perf_counter() - started
+    assert replies == [f"Echo: Question {i}" for i in range(SESSIONS)]
+    # The calls overlapped rather than running one after another
+    assert fake_openai.max_in_flight > SESSIONS // 2
+    assert elapsed < SESSIONS * fake_openai.delay / 4
+    for i in range(SESSIONS):
+        history = agent.sessions.get(f"S{i}").conversation_history
+        assert [m["content"] for m in history if m["role"] == "user"] == [f"Question {i}"]
+        
+def test_streamed_tool_call_with_split_arguments(fake_openai):
+    arguments = {"product_name": "iPhone 15 Pro"}
+    
+    def script(messages, kwargs):
+        if messages[-1]["role"] == "user":
+            return {"role": "assistant", "content": None, "tool_calls": [tool_call("get_product_info", arguments)]}
+        return {"role": "assistant", "content": "The iPhone 15 Pro costs 8999."}
+    fake_openai.script = script
+    assert len(fake_openai.chunks(script([{"role": "user"}], {}))) > 3  # Arguments arrive in several chunks
+    agent = AsyncShopServiceAgent("test-key")
+    
+    async def collect():
+        return [text async for text in agent.athink_stream("How much is the iPhone 15 Pro?", session_id="STREAM")]
+        
+    pieces = asyncio.run(collect())
+    assert len(pieces) > 1
+    assert "".join(pieces) == "The iPhone 15 Pro costs 8999."
+    assert all(call["stream"] for call in fake_openai.calls)
+    history = agent.sessions.get("STREAM").conversation_history
+    assistant = next(m for m in history if m.get("tool_calls"))
+    assert json.loads(assistant["tool_calls"][0]["function"]["arguments"]) == arguments
+    tool_result = json.loads(next(m for m in history if m["role"] == "tool")["content"])
+    assert tool_result["price"] == 8999
+    
+@pytest.mark.parametrize("stream", [False, True])
+def test_semaphore_bounds_in_flight_calls(fake_openai, stream):
+    fake_openai.script = _echo
+    fake_openai.delay = 0.01
+    agent = AsyncShopServiceAgent("test-key", max_concurrency=5)
+    
+    async def turn(i: int) -> str:
+        if stream:
+            return "".join([text async for text in agent.athink_stream(f"Question {i}", session_id=f"S{i}")])
+        return await agent.athink(f"Question {i}", session_id=f"S{i}")
+        
+    async def serve():
+        return await asyncio.gather(*(turn(i) for i in range(50)))
+        
+    assert asyncio.run(serve()) == [f"Echo: Question {i}" for i in range(50)]
+    assert fake_openai.max_in_flight == 5
+    
+def test_aclose_releases_pools(fake_openai):
+    fake_openai.script = _echo
+    agent = AsyncShopServiceAgent("test-key")
+    
+    async def serve():
+        async with agent:
+            http_session = agent._http_session
+            assert openai.aiosession.get() is http_session
+            reply = await agent.athink("Hello", session_id="CLOSE")
+        assert openai.aiosession.get() is None
+        return http_session, reply
+        
+    http_session, reply = asyncio.run(serve())
+    assert reply == "Echo: Hello"
+    assert http_session.closed
+    assert agent._http_session is None
+    with pytest.raises(RuntimeError):
+        agent.tool_executor.submit(print)
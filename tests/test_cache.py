@@ -0,0 +1,74 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from agent.cache import ResponseCache
+
+def _message(i: int) -> dict:
+    return {"role": "assistant", "content": f"Reply {i}"}
+    
+def _disk_keys(path: str) -> list:
+    conn = sqlite3.connect(path)
+    try:
+        return [key for key, in conn.execute("SELECT key FROM responses ORDER BY created")]
+    finally:
+        conn.close()
+        
+def test_disk_tier_is_capped(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(max_entries=1, disk_path=path, max_disk_entries=3, prune_interval=0.05)
+    try:
+        for i in range(5):
+            cache.set(f"k{i}", _message(i))
+            time.sleep(0.002)  # Distinct creation times, so the oldest rows are well defined
+        cache.flush()
+        deadline = time.monotonic() + 5
+        while cache.stats()["disk_pruned"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert cache.stats()["disk_pruned"] == 2
+    finally:
+        cache.close()
+    assert _disk_keys(path) == ["k2", "k3", "k4"]
+    
+def test_aget_does_not_block_the_loop(tmp_path):
+    cache = ResponseCache(max_entries=1, disk_path=str(tmp_path / "cache.db"))
+    cache.set("disk", _message(0))
+    cache.set("memory", _message(1))  # Evicts "disk" from memory
+    cache.flush()
+    
+    async def lookup():
+        # A slow disk: the read waits for the lock the main thread holds
+        cache._disk_lock.acquire()
+        task = asyncio.ensure_future(cache.aget("disk"))
+        ticks = 0
+        for _ in range(5):
+            await asyncio.sleep(0.01)
+            ticks += 1
+        assert not task.done()
+        cache._disk_lock.release()
+        return ticks, await task
+        
+    try:
+        assert asyncio.run(lookup()) == (5, _message(0))
+        assert cache.stats()["disk_hits"] == 1
+    finally:
+        cache.close()
+        
+def test_close_writes_pending_entries(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(disk_path=path)
+    with cache._disk_lock:  # Hold the writer back, so the entries are still queued when close() starts
+        for i in range(3):
+            cache.set(f"k{i}", _message(i))
+        assert len(cache._pending) == 3
+        closer = threading.Thread(target=cache.close)
+        closer.start()
+        while not cache._closed:
+            time.sleep(0.001)
+    closer.join(5)
+    assert not closer.is_alive()
+    reopened = ResponseCache(disk_path=path)
+    try:
+        assert [reopened.get(f"k{i}") for i in range(3)] == [_message(i) for i in range(3)]
+    finally:
+        reopened.close()
@@ -0,0 +1,181 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+from agent.concurrency import OrderIdGenerator
+from agent.database import ShopDatabase
+from agent.sqlite_database import SQLiteShopDatabase
+
+PRODUCT = "iPhone 15 Pro"
+THREADS = 8
+CALLS = 300
+
+def _write(db, worker: int) -> list:
+    """
+    One thread's share of the stress test: orders for its own user, cart lines for a shared one.
+    """
+    order_ids = []
+    for i in range(CALLS):
+        order_ids.append(db.create_order(f"U{worker}", PRODUCT, 1, "Address", "13800000000"))
+        db.add_to_cart("SHARED", PRODUCT, 1, "256GB", "Black")
+        db.add_to_cart(f"U{worker}", PRODUCT, 1, "256GB", f"Color {i % 3}")
+    return order_ids
+    
+def _stress(db, workers: range) -> dict:
+    with ThreadPoolExecutor(len(workers)) as executor:
+        results = executor.map(_write, [db] * len(workers), workers)
+        return dict(zip(workers, results))
+        
+def _process_orders(path: str, worker: int, queue):
+    db = SQLiteShopDatabase(path)
+    try:
+        queue.put((worker, _write(db, worker)))
+    finally:
+        db.close()
+        
+class ConcurrentWritesTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "shop.db")
+        
+    def tearDown(self):
+        self.tmp.cleanup()
+        
+    def assert_orders(self, db, orders: dict):
+        order_ids = [order_id for ids in orders.values() for order_id in ids]
+        self.assertEqual(len(order_ids), len(orders) * CALLS)
+        self.assertEqual(len(set(order_ids)), len(order_ids))
+        for worker, ids in orders.items():
+            for order_id in ids:
+                self.assertEqual(db.get_order_info(order_id)["user_id"], f"U{worker}")
+                
+    def assert_carts(self, db, workers: range):
+        self.assertEqual(db.get_cart_items("SHARED"), [
+            {"product": PRODUCT, "quantity": len(workers) * CALLS, "spec": "256GB", "color": "Black"}
+        ])
+        for worker in workers:
+            items = db.get_cart_items(f"U{worker}")
+            self.assertEqual(sorted(item["color"] for item in items), ["Color 0", "Color 1", "Color 2"])
+            self.assertEqual(sum(item["quantity"] for item in items), CALLS)
+            
+    def test_in_memory_threads(self):
+        db = ShopDatabase()
+        workers = range(THREADS)
+        self.assert_orders(db, _stress(db, workers))
+        self.assert_carts(db, workers)
+        
+    def test_in_memory_cart_price_read_races_product_update(self):
+        db = ShopDatabase()
+        
+        class RacingProducts(dict):
+            """Lands a price update right after add_to_cart reads the product."""
+            updater = None
+            
+            def get(self, key, default=None):
+                info = super().get(key, default)
+                if key == PRODUCT and RacingProducts.updater is None:
+                    updater = threading.Thread(target=db.update_product, args=(PRODUCT,), kwargs={"price": 1.0})
+                    RacingProducts.updater = updater
+                    updater.start()
+                    # Without the cart lock around the read, the update finishes here; with it, it waits
+                    updater.join(0.2)
+                return info
+                
+        db.products_db = RacingProducts(db.products_db)
+        db.add_to_cart("RACE", PRODUCT, 1, "256GB", "Black")
+        RacingProducts.updater.join(5)
+        self.assertEqual(db.get_cart_totals("RACE")["subtotal"], 1.0)
+            
+    def test_sqlite_threads(self):
+        db = SQLiteShopDatabase(self.path)
+        try:
+            workers = range(THREADS)
+            self.assert_orders(db, _stress(db, workers))
+            self.assert_carts(db, workers)
+        finally:
+            db.close()
+            
+    def test_sqlite_instances(self):
+        first, second = SQLiteShopDatabase(self.path), SQLiteShopDatabase(self.path)
+        try:
+            self.assertNotEqual(first.order_ids.worker_id, second.order_ids.worker_id)
+            with ThreadPoolExecutor(2) as executor:
+                orders = executor.map(_stress, [first, second], [range(0, THREADS // 2), range(THREADS // 2, THREADS)])
+                orders = {worker: ids for result in orders for worker, ids in result.items()}
+            self.assert_orders(first, orders)
+            self.assert_carts(first, range(THREADS))
+        finally:
+            first.close()
+            second.close()
+            
+    def test_sqlite_reopen(self):
+        order_ids = []
+        for _ in range(3):
+            db = SQLiteShopDatabase(self.path)
+            try:
+                self.assertEqual(db.order_ids.worker_id, 0)
+                order_ids += [db.create_order("U1", PRODUCT, 1, "Address", "13800000000") for _ in range(5)]
+            finally:
+                db.close()
+        self.assertEqual(len(set(order_ids)), len(order_ids))
+        
+    def test_sqlite_processes(self):
+        SQLiteShopDatabase(self.path).close()  # Seed the file before the workers race to open it
+        context = multiprocessing.get_context("spawn")
+        queue = context.Queue()
+        processes = [context.Process(target=_process_orders, args=(self.path, worker, queue))
+                     for worker in range(4)]
+        for process in processes:
+            process.start()
+        orders = dict(queue.get(timeout=120) for _ in processes)
+        for process in processes:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+        db = SQLiteShopDatabase(self.path)
+        try:
+            self.assert_orders(db, orders)
+            self.assert_carts(db, range(4))
+        finally:
+            db.close()
+            
+    def test_sqlite_claimed_worker_id(self):
+        db = SQLiteShopDatabase(self.path, worker_id=7)
+        try:
+            with self.assertRaises(ValueError):
+                SQLiteShopDatabase(self.path, worker_id=7)
+        finally:
+            db.close()
+        SQLiteShopDatabase(self.path, worker_id=7).close()
+        
+class OrderIdTest(unittest.TestCase):
+    
+    def next_ids(self, clock: list) -> list:
+        generator = OrderIdGenerator()
+        with mock.patch("agent.concurrency.time.time", side_effect=clock):
+            return [generator.next_id() for _ in clock]
+            
+    def test_clock_repeats_and_steps_back(self):
+        second = 1790000000
+        ids = self.next_ids([second, second, second - 1, second, second + 1, second - 5])
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual(ids, sorted(ids))
+        
+    @unittest.skipUnless(hasattr(time, "tzset"), "needs time.tzset")
+    def test_dst_fall_back(self):
+        # 00:30 and 01:30 UTC on 25 October 2026 are both 02:30 local time in Berlin
+        first = 1792888200
+        try:
+            with mock.patch.dict(os.environ, {"TZ": "Europe/Berlin"}):
+                time.tzset()
+                ids = self.next_ids([first, first + 3600])
+        finally:
+            time.tzset()
+        self.assertEqual(ids, ["ORDER20261025003000000000", "ORDER20261025013000000000"])
+        
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,27 @@
+import os
+import shutil
+import pytest
+from agent.event_log import EventLog, read_events
+
+def test_events_round_trip(tmp_path):
+    with EventLog(str(tmp_path), fsync=False) as log:
+        seqs = [log.append({"type": "turn", "n": i}) for i in range(10)]
+        assert log.flush(seqs[-1], timeout=5)
+    assert [event["n"] for event in read_events(str(tmp_path))] == list(range(10))
+    
+def test_append_raises_after_a_failed_write(tmp_path):
+    directory = str(tmp_path / "log")
+    log = EventLog(directory, fsync=False)
+    # Replace the log directory with a file, so opening the first segment fails
+    shutil.rmtree(directory)
+    with open(directory, "w"):
+        pass
+    seq = log.append({"type": "turn"})
+    with pytest.raises(OSError):
+        log.flush(seq, timeout=5)
+    with pytest.raises(OSError):
+        log.append({"type": "turn"})
+    assert log.stats()["pending"] == 0
+    with pytest.raises(OSError):
+        log.close()
+    os.remove(directory)
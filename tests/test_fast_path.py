@@ -0,0 +1,34 @@
+from agent.agent import ShopServiceAgent
+from conftest import tool_call
+
+ORDER_ID = "ORDER2024030001"
+
+def _script(messages, kwargs):
+    if messages[-1]["role"] == "user":
+        return {"role": "assistant", "content": None,
+                "tool_calls": [tool_call("get_order_info", {"order_id": ORDER_ID})]}
+    return {"role": "assistant", "content": "Model reply."}
+    
+def test_status_question_is_answered_from_the_template(fake_openai):
+    fake_openai.script = _script
+    agent = ShopServiceAgent("test-key")
+    reply = agent.think(f"Where is my order {ORDER_ID}?", session_id="USER001")
+    assert reply.startswith(f"Dear customer, your order {ORDER_ID} for 1 x iPhone 15")
+    assert "SF1234567890" in reply
+    assert len(fake_openai.calls) == 1  # No follow-up completion
+    assert agent.fast_path.fired == 1
+    
+def test_change_request_falls_through_to_the_model(fake_openai):
+    fake_openai.script = _script
+    agent = ShopServiceAgent("test-key")
+    reply = agent.think(f"cancel my order {ORDER_ID}", session_id="USER001")
+    assert reply == "Model reply."
+    assert len(fake_openai.calls) == 2
+    assert (agent.fast_path.fired, agent.fast_path.fallbacks) == (0, 1)
+    
+def test_only_plain_order_states_are_lookups():
+    agent = ShopServiceAgent("test-key")
+    for text, lookup in [(f"Where is my order {ORDER_ID}?", True), (f"cancel my order {ORDER_ID}", False),
+                         (f"How much did order {ORDER_ID} cost?", False), (f"Change the address of {ORDER_ID}", False)]:
+        state = agent.rl_optimizer.get_message_state(text)
+        assert agent.fast_path.is_lookup(text, state) is lookup, text
@@ -0,0 +1,56 @@
+from concurrent.futures import ThreadPoolExecutor
+from agent.agent import ShopServiceAgent
+from agent.router import IntentRouter
+from agent.session import Session
+from conftest import tool_call
+
+ORDER_ID = "ORDER2024030001"
+TRACKING_NUMBER = "SF1234567890"
+USER_INPUT = f"Status of {ORDER_ID} and {TRACKING_NUMBER}"
+
+def _args_key(args: dict) -> tuple:
+    return tuple(sorted(args.items()))
+    
+def _call_tool(name: str, args: dict, session) -> dict:
+    # Like a delta tool: every lookup moves the session's cursor
+    if session is not None:
+        session.cursors[(name, _args_key(args))] = 5
+    return {"name": name}
+    
+def test_wasted_prediction_is_not_adopted():
+    router, session = IntentRouter(), Session("S1")
+    with ThreadPoolExecutor(2) as executor:
+        speculation = router.speculate(USER_INPUT, "long_query", executor, _call_tool, session,
+                                       frozenset({"get_logistics_info"}))
+        assert speculation.claim("get_order_info", {"order_id": ORDER_ID}).result() == {"name": "get_order_info"}
+        assert speculation.claim("get_order_info", {"order_id": ORDER_ID}) is None  # Claimed once
+        speculation.finish()
+        assert speculation.start("get_order_info", {"order_id": "ORDER2024030002"}) is None
+    # The logistics lookup ran and moved its stand-in's cursor, not the session's
+    assert session.cursors == {}
+    assert router.stats() == {"turns": 1, "predicted": 2, "hits": 1, "wasted": 1, "hit_rate": 0.5}
+    
+def test_claimed_prediction_is_adopted():
+    router, session = IntentRouter(), Session("S1")
+    with ThreadPoolExecutor(2) as executor:
+        speculation = router.speculate(USER_INPUT, "long_query", executor, _call_tool, session,
+                                       frozenset({"get_logistics_info"}))
+        args = {"tracking_number": TRACKING_NUMBER}
+        assert speculation.claim("get_logistics_info", args).result() == {"name": "get_logistics_info"}
+        speculation.finish()
+    assert session.cursors == {("get_logistics_info", _args_key(args)): 5}
+    assert router.stats() == {"turns": 1, "predicted": 2, "hits": 1, "wasted": 1, "hit_rate": 0.5}
+    
+def test_agent_leaves_cursors_of_unused_lookups_alone(fake_openai):
+    def script(messages, kwargs):
+        if messages[-1]["role"] == "user":
+            return {"role": "assistant", "content": None,
+                    "tool_calls": [tool_call("get_order_info", {"order_id": ORDER_ID})]}
+        return {"role": "assistant", "content": "Model reply."}
+    fake_openai.script = script
+    agent = ShopServiceAgent("test-key")
+    agent.think(USER_INPUT, session_id="USER001")
+    agent.tool_executor.shutdown(wait=True)
+    assert agent.sessions.get("USER001").cursors == {}
+    stats = agent.router.stats()
+    assert (stats["predicted"], stats["hits"], stats["wasted"]) == (2, 1, 1)
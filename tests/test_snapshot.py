@@ -0,0 +1,44 @@
+import pytest
+from agent.rl_optimizer import RLOptimizer
+from agent.snapshot import DeltaMerger, delta_paths
+
+STATE, LATER_STATE, ACTION, NEXT_STATE = "short_query_order", "long_query_price", "brief_order_info", "general_query"
+
+@pytest.fixture
+def workers(tmp_path):
+    path = str(tmp_path / "qtable.snap")
+    first, second = RLOptimizer(), RLOptimizer()
+    # Saves and reloads are driven by the test, the intervals only keep the threads idle
+    for worker_id, optimizer in (("a", first), ("b", second)):
+        optimizer.start_snapshots(path, interval=3600, worker_id=worker_id)
+    yield path, first, second
+    for optimizer in (first, second):
+        optimizer.snapshot_writer.stop()
+        
+def test_two_writers_merge(workers):
+    path, first, second = workers
+    merger = DeltaMerger(path, interval=3600)
+    for optimizer in (first, second):
+        optimizer.update(STATE, ACTION, 1.0, NEXT_STATE)
+        assert optimizer.snapshot_writer.save()
+    assert len(delta_paths(path)) == 2
+    assert merger.merge() == 2
+    assert delta_paths(path) == []
+    
+    # An update after the delta was taken but before the merged snapshot is swapped in
+    first.update(LATER_STATE, ACTION, 1.0, NEXT_STATE)
+    for optimizer in (first, second):
+        assert optimizer.reload_snapshot(path)
+        assert optimizer.q_table.get(STATE, ACTION) == pytest.approx(0.2)  # Both deltas, summed once
+    assert first.q_table.get(LATER_STATE, ACTION) == pytest.approx(0.1)
+    
+    # Only the carried-over update goes into the next round of deltas
+    assert first.snapshot_writer.save()
+    assert not second.snapshot_writer.save()
+    assert merger.merge() == 1
+    assert delta_paths(path) == []
+    for optimizer in (first, second):
+        assert optimizer.reload_snapshot(path)
+        assert optimizer.q_table.get(STATE, ACTION) == pytest.approx(0.2)
+        assert optimizer.q_table.get(LATER_STATE, ACTION) == pytest.approx(0.1)
+    assert (merger.merges, merger.deltas_merged) == (2, 3)
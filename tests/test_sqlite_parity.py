@@ -0,0 +1,50 @@
+import pytest
+from agent.database import ShopDatabase
+from agent.sqlite_database import SQLiteShopDatabase
+
+USER = "PARITY"
+
+@pytest.fixture
+def databases(tmp_path):
+    sqlite_db = SQLiteShopDatabase(str(tmp_path / "shop.db"))
+    yield ShopDatabase(), sqlite_db
+    sqlite_db.close()
+    
+def _fill_cart(db):
+    db.add_to_cart(USER, "iPhone 15 Pro", 2, "256GB", "Black")
+    db.add_to_cart(USER, "Xiaomi Band 8", 3, "Standard", "Black")
+    db.add_to_cart(USER, "AirPods Pro 2", 1, "Standard", "White")
+    db.add_to_cart(USER, "No Such Product", 4, "Standard", "Red")
+    db.update_product("Xiaomi Band 8", price=299.99)
+    db.remove_product("AirPods Pro 2")
+    
+def test_cart_totals_match(databases):
+    memory_db, sqlite_db = databases
+    for db in databases:
+        _fill_cart(db)
+    assert sqlite_db.get_cart_totals(USER) == memory_db.get_cart_totals(USER)
+    assert sqlite_db.get_cart_summary(USER) == memory_db.get_cart_summary(USER)
+    assert memory_db.get_cart_totals(USER)["items"] == 10
+    assert memory_db.get_cart_totals(USER)["subtotal"] == round(2 * 8999 + 3 * 299.99, 2)
+    assert sqlite_db.get_best_coupon(USER, "2024-01-01") == memory_db.get_best_coupon(USER, "2024-01-01")
+    
+def test_empty_cart_totals_match(databases):
+    memory_db, sqlite_db = databases
+    assert sqlite_db.get_cart_summary(USER) == memory_db.get_cart_summary(USER)
+    
+def test_text_index_refresh(tmp_path):
+    path = str(tmp_path / "shop.db")
+    first, second = SQLiteShopDatabase(path), SQLiteShopDatabase(path)
+    try:
+        def names():
+            return [match["product_name"] for match in first.find_products("Zephyr Kettle")]
+            
+        assert "Zephyr Kettle" not in names()
+        second.add_product("Zephyr Kettle", {"price": 199, "brand": "Zephyr", "category": "Kitchen",
+                                             "description": "Electric kettle"})
+        assert "Zephyr Kettle" not in names()  # The index is per instance
+        first.refresh_text_index()
+        assert names()[0] == "Zephyr Kettle"
+    finally:
+        first.close()
+        second.close()